@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+from memory.draft import rural_DraftState
+from ChiefEditor import ChiefEditor, add_executor_arguments, add_budget_arguments, budget_options
+from Budget_Controller import BudgetController
+from Call_Model import FairLimiter, set_global_limiter, current_village, usage_stats, model_prices
+from report_site import build_site
+from cost_estimator import estimate_villages, print_estimate
+from review_cascade import ReviewCascade
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    """
+    读取村庄清单。
+
+    清单为 JSON 文件，可以直接是村庄列表，也可以是如下结构：
+    {
+        "defaults": {"model": "grok-3-mini-beta"},
+        "prices": {"grok-3-mini-beta": [0.3, 0.5]},
+        "villages": [{"village_name": "金田村", "documents_path": "Resource"}]
+    }
+    每个村庄需包含 village_name 和 documents_path，model 缺省时使用 defaults 中的值；
+    可选的 budget 字段为 BudgetController 的参数，如 {"max_tokens": 2000000, "max_iterations": 5}；
+    可选的 use_prediction、outline_tasks、candidates 字段为 Executor 的生成方式，见 ChiefEditor；
+    可选的 cascade 字段为 review_cascade.ReviewCascade 的参数，如 {"cheap_models": ["grok-3-mini-fast"], "strong_model": "grok-3"}。
+
+    :param manifest_path: 清单文件路径
+    :return: 包含 villages 和 prices 的字典
+    """
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if isinstance(manifest, list):
+        manifest = {"villages": manifest}
+
+    defaults = manifest.get("defaults", {})
+    villages = []
+    for entry in manifest.get("villages", []):
+        village = {**defaults, **entry}
+        for field in ("village_name", "documents_path", "model"):
+            if field not in village:
+                raise ValueError(f"村庄清单缺少字段 {field}：{entry}")
+        villages.append(village)
+    return {"villages": villages, "prices": manifest.get("prices", {})}
+
+
+def apply_executor_arguments(villages: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    """
+    把命令行中指定的 Executor 生成方式和审核级联（见 ChiefEditor.add_executor_arguments）填入清单中没有设置的村庄。
+
+    :param villages: 村庄列表
+    :param args: 命令行参数
+    """
+    flags = {"use_prediction": args.prediction, "outline_tasks": args.outline_tasks, "candidates": args.candidates,
+             "cascade": {"cheap_models": args.cascade, "strong_model": args.cascade_strong} if args.cascade else None}
+    for village in villages:
+        for field, value in flags.items():
+            if value is not None:
+                village.setdefault(field, value)
+
+
+def apply_budget_arguments(villages: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    """
+    把命令行中指定的预算（见 ChiefEditor.add_budget_arguments）作为清单中没有设置 budget 的村庄的预算。
+
+    :param villages: 村庄列表
+    :param args: 命令行参数
+    """
+    budget = budget_options(args)
+    if budget:
+        for village in villages:
+            village.setdefault("budget", dict(budget))
+
+
+def editor_options(village: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    按村庄配置得到 ChiefEditor 的预算、Executor 生成方式和审核级联参数。
+
+    :param village: 村庄配置
+    :return: ChiefEditor 的关键字参数
+    """
+    return {
+        "budget": BudgetController(**village["budget"]) if village.get("budget") else None,
+        "use_prediction": bool(village.get("use_prediction", False)),
+        "outline_tasks": village.get("outline_tasks"),
+        "candidates": village.get("candidates", 1),
+        "cascade": ReviewCascade(**village["cascade"]) if village.get("cascade") else None,
+    }
+
+
+class BatchRunner:
+    """
+    批量运行多个村庄的规划工作流。
+
+    所有村庄共享同一个 FairLimiter：全局并发数和每分钟请求数对所有村庄统一生效，
+    槽位按村庄轮转分配，保证每个村庄都能持续推进。
+    """
+
+    def __init__(self, villages: List[Dict[str, Any]], max_concurrency: int = 20,
+                 requests_per_minute: int = None, max_parallel_villages: int = 10,
+                 output_dir: str = "Results"):
+        """
+        :param villages: 村庄列表，每项包含 village_name、documents_path、model
+        :param max_concurrency: 所有村庄共享的大模型最大并发数
+        :param requests_per_minute: 所有村庄共享的每分钟最大请求数
+        :param max_parallel_villages: 同时运行的村庄工作流数量
+        :param output_dir: 各村报告和汇总报告的保存目录
+        """
+        self.villages = villages
+        self.limiter = FairLimiter(max_concurrency, requests_per_minute)
+        self.village_semaphore = asyncio.Semaphore(max_parallel_villages)
+        self.output_dir = output_dir
+        self.results: List[Dict[str, Any]] = []
+
+    async def run_village(self, village: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        运行单个村庄的工作流，并记录其耗时和用量。
+
+        :param village: 村庄配置
+        :return: 该村庄的运行结果
+        """
+        async with self.village_semaphore:
+            name = village["village_name"]
+            # 当前任务及其子任务发出的所有请求都归属到该村庄
+            current_village.set(name)
+            print(f"开始生成 {name} 的规划\n")
+            start = time.perf_counter()
+            status, error = "完成", ""
+            try:
+                draft = rural_DraftState(
+                    village_name=name,
+                    documents_path=village["documents_path"],
+                    model=village["model"],
+                )
+                await ChiefEditor(draft, output_dir=self.output_dir, **editor_options(village)).run()
+            except Exception as e:
+                status, error = "失败", str(e)
+                print(f"{name} 规划失败：{e}")
+            elapsed = time.perf_counter() - start
+            print(f"{name} 规划{status}，耗时 {elapsed:.1f} 秒\n")
+            return {
+                "village_name": name,
+                "model": village["model"],
+                "status": status,
+                "error": error,
+                "wall_time": elapsed,
+                **usage_stats[name],
+            }
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        并发运行所有村庄，并生成汇总的吞吐量与费用报告。
+
+        :return: 汇总报告
+        """
+        set_global_limiter(self.limiter)
+        start = time.perf_counter()
+        try:
+            self.results = await asyncio.gather(*[self.run_village(v) for v in self.villages])
+        finally:
+            set_global_limiter(None)
+        elapsed = time.perf_counter() - start
+
+        completed = [r for r in self.results if r["status"] == "完成"]
+        total_tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in self.results)
+        report = {
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "villages": len(self.results),
+            "completed": len(completed),
+            "failed": len(self.results) - len(completed),
+            "wall_time": elapsed,
+            "villages_per_hour": len(completed) / elapsed * 3600 if elapsed else 0.0,
+            "calls": sum(r["calls"] for r in self.results),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in self.results),
+            "completion_tokens": sum(r["completion_tokens"] for r in self.results),
+            "tokens_per_second": total_tokens / elapsed if elapsed else 0.0,
+            "cost": sum(r["cost"] for r in self.results),
+            "per_village": self.results,
+        }
+        self.save_report(report)
+        return report
+
+    def save_report(self, report: Dict[str, Any]) -> str:
+        """
+        保存汇总报告为 JSON 文件并打印摘要。
+
+        :param report: 汇总报告
+        :return: 报告文件路径
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, f"batch_report_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(report_path, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        print(f"批量运行完成：{report['completed']}/{report['villages']} 个村庄，"
+              f"耗时 {report['wall_time']:.1f} 秒，{report['villages_per_hour']:.1f} 村/小时")
+        print(f"调用 {report['calls']} 次，输入 {report['prompt_tokens']} tokens，"
+              f"输出 {report['completion_tokens']} tokens，费用 {report['cost']:.4f}")
+        for r in report["per_village"]:
+            print(f"  {r['village_name']}：{r['status']}，{r['wall_time']:.1f} 秒，"
+                  f"{r['calls']} 次调用，费用 {r['cost']:.4f}")
+        print(f"汇总报告已保存：{report_path}")
+        return report_path
+
+
+async def main():
+    """
+    命令行入口：python Batch_Runner.py villages.json --concurrency 20 --rpm 600
+    加 --dry-run 时只构建提示词、估算用量和费用，不调用模型（见 cost_estimator）。
+    """
+    parser = argparse.ArgumentParser(description="批量生成多个村庄的乡村振兴规划")
+    parser.add_argument("manifest", help="村庄清单 JSON 文件")
+    parser.add_argument("--concurrency", type=int, default=20, help="所有村庄共享的大模型最大并发数")
+    parser.add_argument("--rpm", type=int, default=None, help="所有村庄共享的每分钟最大请求数")
+    parser.add_argument("--parallel-villages", type=int, default=10, help="同时运行的村庄数量")
+    parser.add_argument("--output-dir", default="Results", help="输出目录")
+    parser.add_argument("--site", action="store_true", help="运行结束后增量生成报告网站（见 report_site）")
+    parser.add_argument("--dry-run", action="store_true", help="不调用模型，只估算各村庄的 token 用量、费用和耗时")
+    parser.add_argument("--iterations", type=int, default=5, help="试运行估算时，村庄预算未限制轮数的规划-审核最大轮数")
+    add_budget_arguments(parser)
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    apply_budget_arguments(manifest["villages"], args)
+    apply_executor_arguments(manifest["villages"], args)
+    model_prices.update({model: tuple(price) for model, price in manifest["prices"].items()})
+    if args.dry_run:
+        estimate = await estimate_villages(manifest["villages"], args.iterations, reports_dir=args.output_dir,
+                                           max_concurrency=args.concurrency,
+                                           max_parallel_villages=args.parallel_villages)
+        print_estimate(estimate)
+        os.makedirs(args.output_dir, exist_ok=True)
+        estimate_path = os.path.join(args.output_dir, f"estimate_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(estimate_path, "w", encoding="utf-8") as file:
+            json.dump(estimate, file, ensure_ascii=False, indent=2)
+        print(f"估算结果已保存：{estimate_path}")
+        return
+    runner = BatchRunner(
+        manifest["villages"],
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        max_parallel_villages=args.parallel_villages,
+        output_dir=args.output_dir,
+    )
+    await runner.run()
+    if args.site:
+        build_site(args.output_dir)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+import time
+from collections import defaultdict
+from typing import Dict, Any, Optional, Set
+
+
+class BudgetController:
+    """
+    单次运行的 token / 费用 / 时间 / 迭代次数预算控制器。
+
+    call_model 每次返回后把用量记到当前预算上（见 Call_Model.current_budget），控制器实时判断预算状态：
+    - 正常：照常规划和审核；
+    - 降级（任一维度用量达到 degrade_ratio）：审核得分已接近合格的方向不再修改，改用 fallback_model；
+    - 耗尽：停止修改，工作流结束并输出当前最好的版本。
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None,
+                 max_wall_time: Optional[float] = None, max_iterations: Optional[int] = None,
+                 section_max_tokens: Optional[int] = None, section_max_iterations: Optional[int] = None,
+                 degrade_ratio: float = 0.8, fallback_model: Optional[str] = None, close_score: int = 70):
+        """
+        :param max_tokens: 整次运行的最大 token 数（输入 + 输出）
+        :param max_cost: 整次运行的最大费用，按 Call_Model.model_prices 计算
+        :param max_wall_time: 整次运行的最长耗时（秒）
+        :param max_iterations: 规划-审核循环的最大轮数
+        :param section_max_tokens: 单个方向的最大 token 数
+        :param section_max_iterations: 单个方向的最大修改次数
+        :param degrade_ratio: 用量达到该比例时进入降级状态
+        :param fallback_model: 降级后使用的较便宜模型，为 None 时不切换模型
+        :param close_score: 降级时审核得分达到该值的方向不再修改
+        """
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.max_wall_time = max_wall_time
+        self.max_iterations = max_iterations
+        self.section_max_tokens = section_max_tokens
+        self.section_max_iterations = section_max_iterations
+        self.degrade_ratio = degrade_ratio
+        self.fallback_model = fallback_model
+        self.close_score = close_score
+
+        self.started_at = time.monotonic()
+        self.tokens = 0
+        self.cost = 0.0
+        self.iterations = 0  # 已开始的轮数
+        self.completed_iterations = 0  # 已审核完的轮数
+        self.section_tokens: Dict[str, int] = defaultdict(int)
+        self.section_iterations: Dict[str, int] = defaultdict(int)
+        self.frozen: Set[str] = set()  # 因预算不再修改的方向
+
+    def start(self) -> None:
+        """开始计时。"""
+        self.started_at = time.monotonic()
+
+    def record(self, section: str, prompt_tokens: int, completion_tokens: int, cost: float) -> None:
+        """
+        记录一次大模型调用的用量。
+
+        :param section: 调用所属的方向，无法归属时为空字符串
+        :param prompt_tokens: 输入 token 数
+        :param completion_tokens: 输出 token 数
+        :param cost: 费用
+        """
+        tokens = prompt_tokens + completion_tokens
+        self.tokens += tokens
+        self.cost += cost
+        if section:
+            self.section_tokens[section] += tokens
+
+    def begin_iteration(self) -> None:
+        """开始新一轮规划。"""
+        self.iterations += 1
+
+    def end_iteration(self) -> None:
+        """
+        本轮审核完成。轮数预算按审核完的轮数计算：max_iterations=N 时前 N 轮都照常规划和修改，
+        第 N 轮审核后才算耗尽。
+        """
+        self.completed_iterations += 1
+
+    def record_revision(self, section: str) -> None:
+        """记录某个方向被修改了一次。"""
+        self.section_iterations[section] += 1
+
+    def round_limit(self) -> Optional[int]:
+        """工作流最多运行的规划-审核轮数，不限制轮数时返回 None。"""
+        return self.max_iterations
+
+    def section_round_limit(self) -> Optional[int]:
+        """
+        单个方向最多参与的规划-审核轮数：首次规划加上最多 section_max_iterations 次修改，
+        不超过 round_limit。两者都不限制时返回 None。
+        """
+        limits = [limit for limit in (self.max_iterations,
+                                      self.section_max_iterations + 1 if self.section_max_iterations else None)
+                  if limit]
+        return min(limits) if limits else None
+
+    def usage_ratio(self) -> float:
+        """各维度中最高的预算使用比例。"""
+        ratios = [0.0]
+        if self.max_tokens:
+            ratios.append(self.tokens / self.max_tokens)
+        if self.max_cost:
+            ratios.append(self.cost / self.max_cost)
+        if self.max_wall_time:
+            ratios.append((time.monotonic() - self.started_at) / self.max_wall_time)
+        if self.max_iterations:
+            ratios.append(self.completed_iterations / self.max_iterations)
+        return max(ratios)
+
+    def degraded(self) -> bool:
+        """预算是否已接近耗尽。"""
+        return self.usage_ratio() >= self.degrade_ratio
+
+    def exhausted(self) -> bool:
+        """预算是否已耗尽。"""
+        return self.usage_ratio() >= 1.0
+
+    def section_exhausted(self, section: str) -> bool:
+        """单个方向的预算是否已耗尽。"""
+        if self.section_max_tokens and self.section_tokens[section] >= self.section_max_tokens:
+            return True
+        if self.section_max_iterations and self.section_iterations[section] >= self.section_max_iterations:
+            return True
+        return False
+
+    def close_enough(self, section: str, draft: Dict[str, Any]) -> bool:
+        """
+        判断某个方向是否已足够接近合格，降级时不再修改。
+        最近一次审核得分不低于 close_score 的方向视为接近合格。
+
+        :param section: 方向名称
+        :param draft: rural_DraftState 实例
+        """
+        plan = draft.get("development_plan", {}).get(section)
+        review = draft.get("review", {}).get(section)
+        if not isinstance(plan, str) or not plan.strip() or not isinstance(review, dict):
+            return False
+        return (review.get("score") or 0) >= self.close_score
+
+    def should_revise(self, section: str, draft: Dict[str, Any]) -> bool:
+        """
+        判断是否继续修改某个方向。还没有正常文本的方向总是需要生成。
+
+        :param section: 方向名称
+        :param draft: rural_DraftState 实例
+        :return: 是否调用大模型修改
+        """
+        plan = draft.get("development_plan", {}).get(section)
+        if not isinstance(plan, str) or not plan.strip():
+            return True
+        if self.exhausted() or self.section_exhausted(section) or \
+                (self.degraded() and self.close_enough(section, draft)):
+            if section not in self.frozen:
+                print(f"预算控制：{section} 不再修改，保留当前版本\n")
+            self.frozen.add(section)
+            return False
+        return True
+
+    def model_for(self, model: str) -> str:
+        """降级后改用较便宜的模型。"""
+        if self.fallback_model and self.degraded():
+            return self.fallback_model
+        return model
+
+    def summary(self) -> Dict[str, Any]:
+        """预算使用情况。"""
+        return {
+            "tokens": self.tokens,
+            "cost": self.cost,
+            "wall_time": time.monotonic() - self.started_at,
+            "iterations": self.iterations,
+            "completed_iterations": self.completed_iterations,
+            "usage_ratio": self.usage_ratio(),
+            "state": "耗尽" if self.exhausted() else "降级" if self.degraded() else "正常",
+            "frozen_sections": sorted(self.frozen),
+            "section_tokens": dict(self.section_tokens),
+            "section_iterations": dict(self.section_iterations),
+        }
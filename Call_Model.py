@@ -1,29 +1,395 @@
 import asyncio
 import os
+import time
 from asyncio import Semaphore
-from typing import List
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError
+
+from tracing import span, start_span
 
 load_dotenv()
 
 # print(os.getenv("XAI_API_KEY"))
 # print(os.getenv("XAI_API_BASE"))
 
-async def call_model(sem: Semaphore, request: str, model:str) -> dict:
-    """Send a single request to xAI with semaphore control."""
+# 预测输出（predicted outputs）统计信息
+prediction_stats = {
+    "requests": 0,  # 携带预测输出的请求数
+    "accepted_prediction_tokens": 0,  # 被模型采纳的预测 token 数
+    "rejected_prediction_tokens": 0,  # 被模型拒绝的预测 token 数
+    "fallbacks": 0,  # 因服务端不支持而回退为普通请求的次数
+}
+
+# 输出被截断（finish_reason == "length"）后自动续写的统计信息
+continuation_stats = {
+    "truncated": 0,  # 首次请求即被截断的调用数
+    "continuations": 0,  # 续写请求数
+    "unfinished": 0,  # 续写次数用完仍未写完的调用数
+}
+
+# 单次调用最多续写的次数
+MAX_CONTINUATIONS = 3
+
+# 续写提示，与已输出的内容一起发给模型
+CONTINUE_PROMPT = "你的输出因长度限制被截断了。请从中断处直接继续输出，不要重复已输出的内容，也不要添加任何说明。"
+
+# 已确认不支持预测输出的模型，后续请求直接跳过 prediction 参数
+_prediction_unsupported = set()
+
+# 当前请求所属的村庄，批量运行时用于公平调度和按村统计用量
+current_village: ContextVar[str] = ContextVar("current_village", default="")
+
+# 按村庄统计的调用次数、token 用量、费用和耗时
+usage_stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+    "calls": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "cost": 0.0,
+    "latency": 0.0,
+    "continuations": 0,
+})
+
+# 模型单价：模型名称 -> (每百万输入 token 价格, 每百万输出 token 价格)，未登记的模型按 0 计费
+model_prices: Dict[str, Tuple[float, float]] = {}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    按 model_prices 估算一次调用的费用。
+
+    :param model: 模型名称
+    :param prompt_tokens: 输入 token 数
+    :param completion_tokens: 输出 token 数
+    :return: 费用
+    """
+    prompt_price, completion_price = model_prices.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+# 所有村庄共享的全局并发/限速器，由 set_global_limiter 设置
+_global_limiter = None
+
+# 当前运行的调用日志（memory.call_journal.CallJournal），断点续跑时用于跳过已完成的调用
+current_journal: ContextVar = ContextVar("current_journal", default=None)
+
+# 当前调用所在的图步骤，由 ChiefEditor 在进入节点时设置，作为调用日志键的一部分
+current_step: ContextVar[int] = ContextVar("current_step", default=0)
+
+# 当前请求所属的规划方向，用于按方向统计用量
+current_section: ContextVar[str] = ContextVar("current_section", default="")
+
+# 当前运行的预算控制器（Budget_Controller.BudgetController），未设置时不限制
+current_budget: ContextVar = ContextVar("current_budget", default=None)
+
+# 试运行记录器（cost_estimator.DryRun），设置后 call_model 不请求模型，只记录提示词并返回模拟输出
+current_dry_run: ContextVar = ContextVar("current_dry_run", default=None)
+
+
+class FairLimiter:
+    """
+    多个村庄共享的大模型并发与速率限制器。
+
+    槽位用满后，等待中的请求按村庄轮转分配，避免某个村庄的大量请求占满全部槽位。
+    用法与 asyncio.Semaphore 相同：async with limiter: ...
+    """
+
+    def __init__(self, max_concurrency: int = 20, requests_per_minute: Optional[int] = None):
+        """
+        :param max_concurrency: 全局最大并发请求数
+        :param requests_per_minute: 全局每分钟最大请求数，None 表示不限速
+        """
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.active = 0
+        self._waiters: Dict[str, deque] = {}
+        self._order: deque = deque()  # 有请求在等待的村庄，按轮转顺序排列
+        self._started: deque = deque()  # 最近一分钟内请求的开始时间
+
+    async def __aenter__(self):
+        owner = current_village.get()
+        if self.active < self.max_concurrency and not self._order:
+            self.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            if owner not in self._waiters:
+                self._waiters[owner] = deque()
+                self._order.append(owner)
+            self._waiters[owner].append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # 已经分到槽位但被取消时要把槽位让出去
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        try:
+            await self._throttle()
+        except BaseException:
+            self._release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release()
+
+    async def _throttle(self) -> None:
+        """按每分钟请求数限速。"""
+        if not self.requests_per_minute:
+            return
+        while True:
+            now = time.monotonic()
+            while self._started and now - self._started[0] >= 60:
+                self._started.popleft()
+            if len(self._started) < self.requests_per_minute:
+                self._started.append(now)
+                return
+            await asyncio.sleep(60 - (now - self._started[0]))
+
+    def _release(self) -> None:
+        """释放槽位：直接转交给轮转顺序中下一个村庄的等待请求。"""
+        while self._order:
+            owner = self._order.popleft()
+            queue = self._waiters[owner]
+            future = queue.popleft()
+            if queue:
+                self._order.append(owner)
+            else:
+                del self._waiters[owner]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+def set_global_limiter(limiter) -> None:
+    """
+    设置所有 call_model 调用共享的全局限制器（如 FairLimiter），传入 None 取消。
+
+    :param limiter: 支持 async with 的限制器
+    """
+    global _global_limiter
+    _global_limiter = limiter
+
+
+def _record_usage(response, model: str, latency: float) -> None:
+    """
+    按当前村庄累计调用次数、token 用量、费用和耗时。续写过的调用只记一次，用量为各段之和。
+
+    :param response: 模型返回结果
+    :param model: 模型名称
+    :param latency: 本次调用的请求耗时（秒，不含排队）
+    """
+    stats = usage_stats[current_village.get()]
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    stats["calls"] += 1
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    stats["cost"] += cost
+    stats["latency"] += latency
+
+    budget = current_budget.get()
+    if budget is not None:
+        budget.record(current_section.get(), prompt_tokens, completion_tokens, cost)
+
+
+def _journal_response(content: str) -> SimpleNamespace:
+    """
+    把调用日志中的结果包装成与模型返回结果相同的结构。
+
+    :param content: 已记录的模型输出
+    :return: 模拟的模型返回结果
+    """
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+        usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+    )
+
+
+def _record_prediction_usage(response) -> None:
+    """
+    记录一次预测输出请求中被采纳和被拒绝的 token 数。
+
+    :param response: 模型返回结果
+    """
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "completion_tokens_details", None)
+    prediction_stats["requests"] += 1
+    prediction_stats["accepted_prediction_tokens"] += getattr(details, "accepted_prediction_tokens", None) or 0
+    prediction_stats["rejected_prediction_tokens"] += getattr(details, "rejected_prediction_tokens", None) or 0
+
+
+async def call_model(sem: Semaphore, request: str, model:str, prediction: Optional[str] = None) -> dict:
+    """Send a single request to xAI with semaphore control.
+
+    输出因长度限制被截断（finish_reason == "length"）时自动续写并拼接，见 _continue。
+
+    各子代理的方法体内已持有自己的 self.semaphore，调用模型时须传入另一个独立的信号量（子代理的 llm_semaphore）：
+    若复用同一个信号量，外层任务占满全部槽位后，内层的模型调用永远等不到槽位，任务之间互相等待。
+
+    :param sem: 限制模型调用并发数的信号量
+    :param prediction: 预测输出内容（通常为上一版草稿），服务端不支持时自动回退为普通请求
+    """
+    dry_run = current_dry_run.get()
+    if dry_run is not None:
+        return _journal_response(dry_run.respond(request, model))
+
+    # 调用日志按请求的模型记录：续跑时预算可能已进入降级状态，按降级后的模型查找会错过已完成的调用
+    requested = model
+    budget = current_budget.get()
+    if budget is not None:
+        # 预算接近耗尽时改用较便宜的模型
+        model = budget.model_for(model)
+
+    with span("call_model", model=model, section=current_section.get(), prompt_chars=len(request)) as current:
+        journal = current_journal.get()
+        if journal is not None:
+            journal_key = journal.key(requested, request, current_step.get())
+            content = journal.get(journal_key)
+            if content is not None:
+                current.set(journal_hit=True)
+                return _journal_response(content)
+
+        messages = [{"role": "user", "content": request}]
+        response, latency = await _call_model(sem, messages, model, prediction)
+        if _finish_reason(response) == "length":
+            response, latency = await _continue(sem, messages, model, response, latency)
+        _record_usage(response, model, latency)
+        if journal is not None:
+            journal.put(journal_key, response.choices[0].message.content or "")
+        prompt_tokens, completion_tokens = _tokens(response)
+        current.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return response
+
+
+def _finish_reason(response) -> Optional[str]:
+    choices = getattr(response, "choices", None) or []
+    return getattr(choices[0], "finish_reason", None) if choices else None
+
+
+def _join_continuation(text: str, continuation: str, min_overlap: int = 8) -> str:
+    """
+    拼接续写内容。模型常会重复被截断处的最后几句，去掉续写开头与已有内容结尾重叠的部分。
+
+    :param text: 已有内容
+    :param continuation: 续写内容
+    :param min_overlap: 视为重复的最短重叠长度，过短的重叠可能是巧合
+    :return: 拼接后的内容
+    """
+    tail = text[-500:]
+    for size in range(min(len(tail), len(continuation)), min_overlap - 1, -1):
+        if tail.endswith(continuation[:size]):
+            return text + continuation[size:]
+    return text + continuation
+
+
+def _tokens(response) -> Tuple[int, int]:
+    """返回结果中的（输入 token 数、输出 token 数），没有用量信息时为 0。"""
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "prompt_tokens", None) or 0, getattr(usage, "completion_tokens", None) or 0
+
+
+async def _continue(sem: Semaphore, messages: List[Dict[str, str]], model: str, response,
+                    latency: float) -> Tuple[Any, float]:
+    """
+    输出因长度限制被截断时，把已输出的内容作为 assistant 消息发回，请模型接着写，最多续写 MAX_CONTINUATIONS 次。
+    只续写被截断的部分，不必为整段重新生成付费。
+
+    :param sem: 信号量
+    :param messages: 原始请求消息
+    :param model: 模型名称
+    :param response: 被截断的返回结果
+    :param latency: 被截断的请求的耗时（秒）
+    :return: (最后一次返回结果, 各段请求的总耗时)；content 为拼接后的完整内容，usage 为各段用量之和
+    """
+    stats = usage_stats[current_village.get()]
+    continuation_stats["truncated"] += 1
+    text = response.choices[0].message.content or ""
+    prompt_tokens, completion_tokens = _tokens(response)
+    for _ in range(MAX_CONTINUATIONS):
+        continuation_stats["continuations"] += 1
+        stats["continuations"] += 1
+        response, piece_latency = await _call_model(sem, messages + [
+            {"role": "assistant", "content": text},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ], model, None)
+        latency += piece_latency
+        piece_prompt, piece_completion = _tokens(response)
+        prompt_tokens += piece_prompt
+        completion_tokens += piece_completion
+        text = _join_continuation(text, response.choices[0].message.content or "")
+        if _finish_reason(response) != "length":
+            break
+    else:
+        continuation_stats["unfinished"] += 1
+        print(f"模型 {model} 续写 {MAX_CONTINUATIONS} 次后输出仍被截断")
+    response.choices[0].message.content = text
+    response.usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                     total_tokens=prompt_tokens + completion_tokens)
+    return response, latency
+
+
+def _rejects_prediction(error: BadRequestError) -> bool:
+    """
+    判断 400 错误是否因服务端不支持 prediction 参数：错误的 param、code 或说明中提到 prediction。
+
+    :param error: 请求返回的 400 错误
+    :return: 是否为不支持预测输出
+    """
+    fields = (getattr(error, "param", None), getattr(error, "code", None), getattr(error, "message", None))
+    return any("predict" in str(field).lower() for field in fields if field)
+
+
+async def _call_model(sem: Semaphore, messages: List[Dict[str, str]], model: str,
+                      prediction: Optional[str]) -> Tuple[Any, float]:
+    """
+    实际发送请求，见 call_model。用量由 call_model 在拼接续写内容后统一记录。
+
+    :return: (返回结果, 请求耗时（秒，不含排队）)
+    """
     # The 'async with sem' ensures only a limited number of requests run at once
-    async with sem:
+    # 批量运行时还要再经过所有村庄共享的全局限制器
+    # 等待信号量和全局限制器的时间单独记录，与服务端耗时区分开
+    queued = start_span("queue")
+    async with sem, (_global_limiter or nullcontext()):
+        queued.end()
         client = AsyncOpenAI(
-    api_key=os.getenv("XAI_API_KEY"),
-    base_url=os.getenv("XAI_API_BASE")
-)
-        return await client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": request}]
+            api_key=os.getenv("XAI_API_KEY"),
+            base_url=os.getenv("XAI_API_BASE")
         )
-    
+        with span("request", model=model, prediction=bool(prediction)):
+            start = time.perf_counter()
+            if prediction and model not in _prediction_unsupported:
+                try:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        prediction={"type": "content", "content": prediction},
+                    )
+                    _record_prediction_usage(response)
+                    return response, time.perf_counter() - start
+                except BadRequestError as e:
+                    # 只有服务端因 prediction 参数拒绝请求时才记住该模型并回退为普通请求，其他 400 错误照常抛出
+                    if not _rejects_prediction(e):
+                        raise
+                    print(f"模型 {model} 不支持预测输出，回退为普通请求：{e}")
+                    _prediction_unsupported.add(model)
+                    prediction_stats["fallbacks"] += 1
+
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages
+            )
+            return response, time.perf_counter() - start
+
 async def main() -> None:
     """Main function to handle requests and display responses."""
     prompt="你好"
@@ -33,10 +399,8 @@ async def main() -> None:
     # we can have 2 requests running at once, making it faster overall
     response = await call_model(Semaphore(1000), prompt, "grok-3-mini-beta")
     print(response.choices[0].message.content)
-    
+
 
 if __name__ == "__main__":
     os.system('cls')
     asyncio.run(main())
- 
-   
\ No newline at end of file
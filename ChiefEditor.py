@@ -1,12 +1,28 @@
+import argparse
 import os
-from typing import Dict, Callable, Any
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Callable, Any, List, Tuple
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableConfig
 import asyncio
 
 from memory.draft import rural_DraftState
-from save_to_local import save_dict_to_file
+from memory.call_journal import CallJournal
+from memory.blob_store import resolve, store_text
+from memory.draft_history import DraftHistory
+from Call_Model import current_journal, current_budget, current_step
+from Budget_Controller import BudgetController
+from review_schema import review_passed
+from report_writer import AtomicReportWriter, OrderedSectionWriter
+from report_exporters import export_report_async
+from process_pool import process_pool_user_async
+from tracing import Tracer, current_tracer, span
+from profiling import RunProfiler
 from Executor import Executor
 from Execute_Reviewer import Execute_Reviewer
+from review_cascade import ReviewCascade
 from Reportor import Reportor
 
 
@@ -35,14 +51,57 @@ class ChiefEditor:
     工作流管理器类，用于管理乡村振兴规划报告的生成流程。
     """
 
-    def __init__(self, draft: rural_DraftState):
+    def __init__(self, draft: rural_DraftState = None, output_dir: str = "Results",
+                 run_id: str = None, checkpoint_path: str = "checkpoints.sqlite",
+                 budget: BudgetController = None,
+                 export_formats: Tuple[str, ...] = ("markdown", "docx", "pdf", "html"),
+                 history_path: str = os.path.join(".cache", "draft_history.sqlite"),
+                 trace_path: str = None, profile_dir: str = None,
+                 use_prediction: bool = False, outline_tasks: List[str] = None, candidates: int = 1,
+                 cascade: ReviewCascade = None):
         """
         初始化工作流管理器。
 
-        :param draft: 当前的工作状态，包含报告的草稿、审核意见等信息。
+        :param draft: 当前的工作状态，包含报告的草稿、审核意见等信息。续跑时可为 None，从检查点恢复。
+        :param output_dir: 规划报告的保存目录
+        :param run_id: 运行 ID，用作检查点的键；为 None 时按村庄名称、时间和随机串生成
+        :param checkpoint_path: 检查点数据库路径，为 None 时不保存检查点
+        :param budget: 预算控制器，为 None 时不限制
+        :param export_formats: 综合报告的导出格式，见 report_exporters.EXPORTERS
+        :param history_path: 方案版本历史数据库路径，为 None 时不记录，见 memory.draft_history
+        :param trace_path: 追踪文件路径（Chrome 追踪格式），为 None 时不追踪，见 tracing
+        :param profile_dir: 性能分析结果目录（各节点的 collapsed stacks 和事件循环阻塞记录），为 None 时不分析，见 profiling
+        :param use_prediction: 修订时是否把上一版草稿作为预测输出传给模型，见 Executor
+        :param outline_tasks: 先生成提纲、再并行扩写的方向名称，见 Executor
+        :param candidates: 每个方向并发生成的候选稿数，见 Executor
+        :param cascade: 审核模型级联，为 None 时只用 draft["model"] 审核，见 review_cascade
         """
         self.draft = draft
-        self.draft["document"] = read_markdown_files(self.draft["documents_path"])
+        self.output_dir = output_dir
+        self.checkpoint_path = checkpoint_path
+        self.budget = budget
+        self.export_formats = export_formats
+        self.history_path = history_path
+        self.trace_path = trace_path
+        self.profile_dir = profile_dir
+        self.use_prediction = use_prediction
+        self.outline_tasks = outline_tasks
+        self.candidates = candidates
+        self.cascade = cascade
+        self._profiler: RunProfiler = None
+        self._node_runs: Dict[str, int] = {}
+        self.history: DraftHistory = None
+        self._iteration = None
+        self._plan_writer: OrderedSectionWriter = None
+        if draft is not None:
+            # 村庄资料存入大文本存储，工作状态和检查点中只保存句柄
+            self.draft["document"] = store_text(read_markdown_files(self.draft["documents_path"]))
+        if run_id is None:
+            if draft is None:
+                raise ValueError("续跑时必须指定 run_id")
+            # 带上随机部分：批量运行时同一村庄可能在同一秒内启动多次，共用同一个检查点数据库
+            run_id = f"{draft['village_name']}-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.run_id = run_id
 
     def initialize_agents(self) -> Dict[str, Callable[[rural_DraftState], rural_DraftState]]:
         """
@@ -51,8 +110,9 @@ class ChiefEditor:
         :return: 一个字典，包含初始化的子代理。
         """
         return {
-            "Executor": Executor(),
-            "Execute_Reviewer": Execute_Reviewer(),
+            "Executor": Executor(use_prediction=self.use_prediction, outline_tasks=self.outline_tasks,
+                                 candidates=self.candidates),
+            "Execute_Reviewer": Execute_Reviewer(cascade=self.cascade),
             "Reportor": Reportor(),
         }
 
@@ -64,55 +124,306 @@ class ChiefEditor:
         :return: 工作流图。
         """
         workflow = StateGraph(rural_DraftState)
-        workflow.add_node("Executor", agents["Executor"].parallel_plan)
-        workflow.add_node("Execute_Reviewer", agents["Execute_Reviewer"].parallel_review)
-        workflow.add_node("Reportor", agents["Reportor"].generate_report)
+        workflow.add_node("Executor", self._traced_node("Executor", agents["Executor"].parallel_plan))
+        workflow.add_node("Execute_Reviewer", self._traced_node("Execute_Reviewer", self._review_and_schedule(agents)))
+        workflow.add_node("Reportor", self._traced_node("Reportor", agents["Reportor"].generate_report))
 
         workflow.set_entry_point("Executor")
         workflow.add_edge("Executor", "Execute_Reviewer")
 
         workflow.add_conditional_edges(
             "Execute_Reviewer", 
-            lambda draft: "不通过" if draft["passed"] == "审核不通过" else "通过",
-            {"不通过":"Executor","通过":END},
+            self._route_review,
+            {"不通过":"Executor","通过":"Reportor"},
             )
-        # workflow.add_edge("Executor", "Reportor")
-        # workflow.add_edge("Reportor",END)
-            
+        workflow.add_edge("Reportor", END)
 
         return workflow
 
-    async def run(self):
+    def _traced_node(self, name: str, node: Callable) -> Callable:
+        """
+        为节点记录追踪区间，属性中的 iteration 为该节点第几次运行；开启性能分析时按节点归类采样和阻塞记录。
+        节点内的大模型调用按 LangGraph 的步骤编号记入调用日志，续跑时重新执行的步骤得到相同的日志键。
+
+        :param name: 节点名称
+        :param node: 节点函数
+        :return: 包装后的节点函数
+        """
+        async def run_node(draft: rural_DraftState, config: RunnableConfig) -> rural_DraftState:
+            self._node_runs[name] = self._node_runs.get(name, 0) + 1
+            current_step.set(config.get("metadata", {}).get("langgraph_step", 0))
+            if self._profiler is None:
+                with span(f"node.{name}", iteration=self._node_runs[name]):
+                    return await node(draft)
+            self._profiler.enter(name)
+            start = time.perf_counter()
+            try:
+                with span(f"node.{name}", iteration=self._node_runs[name]):
+                    return await node(draft)
+            finally:
+                self._profiler.add_node_time(name, time.perf_counter() - start)
+        return run_node
+
+    def _review_and_schedule(self, agents: Dict[str, Any]) -> Callable:
+        """
+        审核节点：审核后把已通过的方向交给 Reportor 在后台润色，与下一轮 Executor 的修改重叠进行，
+        最后的 Reportor 节点只需等待剩余任务并在本地拼接；同时把已通过的方向流式写入规划报告的临时文件。
+
+        :param agents: 初始化的子代理
+        :return: 审核节点函数
+        """
+        async def review(draft: rural_DraftState) -> rural_DraftState:
+            draft = await agents["Execute_Reviewer"].parallel_review(draft)
+            agents["Reportor"].schedule(draft)
+            writer = self._section_writer(draft)
+            for task, review in draft.get("review", {}).items():
+                if review_passed(review) and task in draft["development_plan"]:
+                    writer.add(task, resolve(draft["development_plan"][task]))
+            self._record_history(draft)
+            return draft
+        return review
+
+    def _record_history(self, draft: rural_DraftState) -> None:
+        """把本轮审核后变化的方案和审核结果记入版本历史。"""
+        if self.history is None:
+            return
+        if self._iteration is None:
+            self._iteration = self.history.next_iteration(self.run_id)
+        added = self.history.record_draft(self.run_id, self._iteration, resolve(draft.get("development_plan", {})),
+                                          draft.get("review", {}))
+        print(f"第 {self._iteration} 轮：{added} 个方向产生新版本\n")
+        self._iteration += 1
+
+    def _section_writer(self, draft: rural_DraftState) -> OrderedSectionWriter:
+        """
+        规划报告的流式写入器，第一次用到时创建（续跑时 self.draft 为 None，村庄名称取自工作状态）。
+
+        :param draft: 当前的工作状态
+        :return: 按方向顺序写入的写入器
+        """
+        if self._plan_writer is None:
+            writer = AtomicReportWriter(self.output_dir, f"{draft['village_name']}乡村振兴规划报告")
+            self._plan_writer = OrderedSectionWriter(writer, list(draft.get("development_plan", {})))
+        return self._plan_writer
+
+    def _route_review(self, draft: rural_DraftState) -> str:
+        """
+        审核后的路由：全部通过时结束；预算耗尽或未通过的方向都已因预算停止修改时，
+        也结束循环并输出当前最好的版本。
+
+        :param draft: 当前的工作状态
+        :return: “通过”或“不通过”
+        """
+        if draft["passed"] != "审核不通过":
+            return "通过"
+        if self.budget is not None:
+            failed = [task for task, review in draft.get("review", {}).items() if not review_passed(review)]
+            if self.budget.exhausted() or all(task in self.budget.frozen for task in failed):
+                print(f"预算控制：停止修改，输出当前版本（{self.budget.summary()['state']}）\n")
+                return "通过"
+        return "不通过"
+
+    async def run(self, resume: bool = False):
         """
         运行工作流。
 
-        初始化子代理，创建工作流图，编译工作流并调用。
+        初始化子代理，创建工作流图，编译工作流并调用。每个节点完成后按 run_id 保存检查点，
+        节点内每次大模型调用的结果记入调用日志；续跑时从最后完成的节点继续，已完成的调用不再重复请求。
+
+        :param resume: 是否从已有检查点续跑；没有检查点时从头开始
         """
+        tracer = Tracer() if self.trace_path is not None else None
+        token = current_tracer.set(tracer)
+        if self.profile_dir is not None:
+            self._profiler = RunProfiler(self.profile_dir)
+            self._profiler.start()
+        try:
+            # 导出用的进程池在最后一个运行结束时关闭（批量运行时多个村庄共用）
+            async with process_pool_user_async():
+                with span("ChiefEditor.run", run_id=self.run_id, resume=resume):
+                    return await self._run(resume)
+        finally:
+            current_tracer.reset(token)
+            if self._profiler is not None:
+                self._profiler.stop()
+                self._profiler.report()
+                self._profiler = None
+            if tracer is not None:
+                tracer.export_chrome(self.trace_path)
+                tracer.print_summary()
+                print(f"追踪文件已保存：{self.trace_path}（可在 chrome://tracing 或 https://ui.perfetto.dev 中打开）\n")
+
+    async def _run(self, resume: bool) -> rural_DraftState:
+        """运行工作流并保存、导出报告，见 run。"""
         agents = self.initialize_agents()  # 初始化子代理
         workflow = self._create_workflow(agents)  # 创建工作流
-        app = workflow.compile()  # 编译工作流
+        config = {"recursion_limit": 100, "configurable": {"thread_id": self.run_id}}
+
+        if self.history_path is not None:
+            self.history = DraftHistory(self.history_path)
+        budget_token = current_budget.set(self.budget)
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            result_draft = await self._invoke(workflow, config, resume)
+        except BaseException:
+            # 运行失败时取消后台的核心定位和润色任务，并丢弃临时文件，上一次的规划报告保持原样
+            agents["Reportor"].cancel()
+            if self._plan_writer is not None:
+                self._plan_writer.writer.abort()
+                self._plan_writer = None
+            raise
+        finally:
+            current_budget.reset(budget_token)
+            if self.history is not None:
+                print(f"方案版本历史：{self.history.stats(self.run_id)}\n")
+                self.history.close()
+                self.history, self._iteration = None, None
+        if self.budget is not None:
+            print(f"预算使用情况：{self.budget.summary()}\n")
 
-        result_draft = await app.ainvoke(self.draft,{"recursion_limit": 100})  # 调用工作流
-        
-        save_dict_to_file(result_draft["development_plan"], "Results", f"{result_draft["village_name"]}乡村振兴规划报告", "markdown")
+        # 已通过的方向在审核后已流式写入，这里补上其余方向，fsync 后原子替换 Results/ 中的报告
+        path = self._section_writer(result_draft).finish(resolve(result_draft["development_plan"]))
+        self._plan_writer = None
+        print(f"规划报告已保存：{path}")
+        # 综合报告只解析一次，各格式在进程池中并发导出
+        with span("export", formats=",".join(self.export_formats)):
+            await export_report_async(result_draft["comprehensive_report"], self.output_dir,
+                                      f"{result_draft["village_name"]}乡村振兴综合报告", self.export_formats)
         # os.system('cls')
         # print(result_draft)
         return result_draft
 
+    async def _invoke(self, workflow: StateGraph, config: Dict[str, Any], resume: bool) -> rural_DraftState:
+        """
+        编译并调用工作流，按需保存检查点和调用日志。
+
+        :param workflow: 工作流图
+        :param config: 调用配置
+        :param resume: 是否从已有检查点续跑
+        :return: 最终的工作状态
+        """
+        if self.checkpoint_path is None:
+            app = workflow.compile()  # 编译工作流
+            result_draft = await app.ainvoke(self.draft, config)  # 调用工作流
+        else:
+            try:
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            except ImportError as e:
+                raise ImportError("保存检查点需要安装 langgraph-checkpoint-sqlite") from e
+
+            journal = CallJournal(self.checkpoint_path, self.run_id)
+            token = current_journal.set(journal)
+            try:
+                async with AsyncSqliteSaver.from_conn_string(self.checkpoint_path) as checkpointer:
+                    app = workflow.compile(checkpointer=checkpointer)  # 编译工作流
+                    snapshot = await app.aget_state(config)
+                    if resume and snapshot.values:
+                        print(f"从检查点续跑 {self.run_id}，下一个节点：{snapshot.next or '无（已完成）'}\n")
+                        result_draft = await app.ainvoke(None, config) if snapshot.next else snapshot.values
+                    else:
+                        if self.draft is None:
+                            raise ValueError(f"没有找到运行 {self.run_id} 的检查点")
+                        print(f"开始运行 {self.run_id}\n")
+                        result_draft = await app.ainvoke(self.draft, config)  # 调用工作流
+            finally:
+                current_journal.reset(token)
+                journal.close()
+            if journal.hits:
+                print(f"续跑复用了 {journal.hits} 次已完成的大模型调用\n")
+        return result_draft
+
+
+def add_budget_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    添加预算（见 Budget_Controller）的命令行参数，未指定的维度不限制。
+
+    :param parser: 命令行解析器
+    """
+    parser.add_argument("--max-tokens", type=int, help="整次运行的最大 token 数")
+    parser.add_argument("--max-cost", type=float, help="整次运行的最大费用")
+    parser.add_argument("--max-minutes", type=float, help="整次运行的最长耗时（分钟）")
+    parser.add_argument("--max-iterations", type=int, help="规划-审核循环的最大轮数")
+    parser.add_argument("--section-max-tokens", type=int, help="单个方向的最大 token 数")
+    parser.add_argument("--section-max-iterations", type=int, help="单个方向的最大修改次数")
+    parser.add_argument("--fallback-model", help="预算接近耗尽时改用的较便宜模型")
+
+
+def budget_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    命令行中指定的预算，即 BudgetController 的关键字参数。
+
+    :param args: 包含 add_budget_arguments 参数的命令行参数
+    :return: 关键字参数，没有指定任何限制时返回空字典
+    """
+    limits = {
+        "max_tokens": args.max_tokens,
+        "max_cost": args.max_cost,
+        "max_wall_time": args.max_minutes * 60 if args.max_minutes else None,
+        "max_iterations": args.max_iterations,
+        "section_max_tokens": args.section_max_tokens,
+        "section_max_iterations": args.section_max_iterations,
+    }
+    limits = {key: value for key, value in limits.items() if value is not None}
+    if not limits:
+        return {}
+    if args.fallback_model:
+        limits["fallback_model"] = args.fallback_model
+    return limits
+
+
+def add_executor_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    添加 Executor 生成方式（预测输出、提纲扩写、多候选稿）和审核模型级联的命令行参数，
+    未指定时为 None，由调用方决定默认值。
+
+    :param parser: 命令行解析器
+    """
+    parser.add_argument("--prediction", action="store_true", default=None,
+                        help="修订时把上一版草稿作为预测输出传给模型（需服务端支持）")
+    parser.add_argument("--outline-tasks", nargs="+", metavar="SECTION", help="先生成提纲、再并行扩写的方向")
+    parser.add_argument("--candidates", type=int, help="每个方向并发生成的候选稿数，只把本地得分最高的一份送审")
+    parser.add_argument("--cascade", nargs="+", metavar="MODEL", help="先依次用这些较便宜的模型审核，结论不确定时再升级")
+    parser.add_argument("--cascade-strong", metavar="MODEL", help="审核级联最终裁决的强模型，默认为村庄的 model")
+
 
 async def main():
     """
     测试工作流。
 
     创建初始的工作状态，初始化工作流管理器并运行。
+    使用 --resume <run_id> 从检查点续跑中断的运行。
     """
+    parser = argparse.ArgumentParser(description="生成乡村振兴规划报告")
+    parser.add_argument("--resume", metavar="RUN_ID", help="从检查点续跑指定的运行")
+    parser.add_argument("--checkpoint", default="checkpoints.sqlite", help="检查点数据库路径")
+    add_budget_arguments(parser)
+    parser.add_argument("--trace", metavar="PATH", help="保存 Chrome 追踪格式的调用时间线")
+    parser.add_argument("--profile", metavar="DIR", help="开启采样分析和事件循环阻塞监测，结果保存到该目录")
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+    executor_options = {"use_prediction": bool(args.prediction), "outline_tasks": args.outline_tasks,
+                        "candidates": args.candidates or 1,
+                        "cascade": ReviewCascade(args.cascade, args.cascade_strong) if args.cascade else None}
+
+    options = budget_options(args)
+    budget = BudgetController(**options) if options else None
+
+    if args.resume:
+        workflow_manager = ChiefEditor(run_id=args.resume, checkpoint_path=args.checkpoint, budget=budget,
+                                       trace_path=args.trace, profile_dir=args.profile, **executor_options)
+        await workflow_manager.run(resume=True)
+        return
+
     draft = rural_DraftState(
         village_name="金田村",
         documents_path="resource",
         model="grok-3-mini-beta",
     )
 
-    workflow_manager = ChiefEditor(draft)  # 初始化工作流管理器
+    workflow_manager = ChiefEditor(draft, checkpoint_path=args.checkpoint, budget=budget, trace_path=args.trace,
+                                   profile_dir=args.profile, **executor_options)  # 初始化工作流管理器
+    print(f"运行 ID：{workflow_manager.run_id}（中断后可用 --resume {workflow_manager.run_id} 续跑）\n")
     await workflow_manager.run()  # 运行工作流
 
 
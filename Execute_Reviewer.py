@@ -1,21 +1,49 @@
 import asyncio
 from typing import Dict, Any, List, Tuple
+from collections import defaultdict
+import time
 from langchain_openai import ChatOpenAI
 import re
 import os
 
 from memory.draft import rural_DraftState
 from save_to_local import save_dict_to_file
-from Call_Model import call_model
+from Call_Model import call_model, current_section, current_budget, estimate_cost
+from review_linter import lint_section, lint_verdict
+from review_schema import REVIEW_FORMAT, REVIEW_PROMPT_VERSION, parse_review, review_passed
+from memory.review_cache import ReviewCache, content_hash
+from memory.blob_store import resolve
+from consistency_checker import find_conflicts, conflicts_by_section, format_conflicts
+from tracing import traced, annotate
 
 from dotenv import load_dotenv
 load_dotenv()
 
 class Execute_Reviewer:
-    def __init__(self, concurrency_limit=10):
+    def __init__(self, concurrency_limit=10, use_linter=True, max_parse_retries=2,
+                 cache_path=os.path.join(".cache", "review_cache.sqlite"), cascade=None):
+        """
+        :param concurrency_limit: 最大并发数
+        :param use_linter: 调用大模型审核前是否先做本地格式检查，检查不通过的方向直接退回
+        :param max_parse_retries: 审核结果不是合法 JSON 时的最大重试次数
+        :param cache_path: 审核结果缓存路径，为 None 时不缓存
+        :param cascade: 审核模型级联（review_cascade.ReviewCascade），为 None 时只用 draft["model"] 审核
+        """
         self.concurrency_limit = concurrency_limit
+        self.use_linter = use_linter
+        self.max_parse_retries = max_parse_retries
+        self.lint_saved_calls = 0  # 本地检查直接退回、省下的大模型审核次数
+        self.parse_failures = 0  # 重试后仍无法解析的审核结果数
+        self.iteration = 0  # 审核轮数
+        self.pass_rates: List[Dict[str, Any]] = []  # 每轮的通过情况
+        self.cache = ReviewCache(cache_path) if cache_path else None
+        self.section_conflicts: Dict[str, List[Dict[str, Any]]] = {}  # 本轮各方向的跨方向冲突
+        self.cascade = cascade
+        self.tier_stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))  # 各审核模型的用量
         self.semaphore = asyncio.Semaphore(concurrency_limit)
+        self.llm_semaphore = asyncio.Semaphore(concurrency_limit)  # 传给 call_model 的信号量，见其说明
 
+    @traced("Execute_Reviewer.review")
     async def review(self, task: str, draft: rural_DraftState) -> Dict[str, Any]:
         """
         审核单个任务的发展方案。
@@ -24,31 +52,87 @@ class Execute_Reviewer:
         :param draft: rural_DraftState 实例
         :return: 审核结果（JSON 格式）
         """
+        annotate(section=task)
         async with self.semaphore:
             # 初始化审核状态
             draft.setdefault("review", {})
             draft["review"].setdefault(task, "")
 
             # 如果已审核通过，直接返回结果
-            if "审核通过" in draft["review"][task]:
+            if review_passed(draft["review"][task]):
+                return draft["review"][task]
+
+            # 因预算不再修改的方向，方案没有变化，沿用上一次的审核意见
+            budget = current_budget.get()
+            if budget is not None and task in budget.frozen:
                 return draft["review"][task]
 
+            current_section.set(task)
             print(f"开始审核 {task}\n")
 
             # 初始化发展方案
             draft.setdefault("development_plan", {})
             draft["development_plan"].setdefault(task, "")
 
-            # 构建提示词
-            prompt = f'''
-    请审查{draft["village_name"]}村的{task}发展方案：{draft["development_plan"][task]}
+            # 先做本地格式检查，机械可查的问题不必花一次大模型调用
+            if self.use_linter:
+                issues = lint_section(resolve(draft["development_plan"][task]))
+                if issues:
+                    self.lint_saved_calls += 1
+                    print(f"{task} 本地检查未通过，跳过大模型审核\n")
+                    return lint_verdict(issues)
+
+            prompt, conflicts = self._build_prompt(task, draft)
+
+            # 同样的方案文本已经审核过，直接沿用结果
+            cache_key = None
+            if self.cache is not None:
+                if self.cascade is not None:
+                    model = self.cascade.signature(draft["model"])
+                else:
+                    model = budget.model_for(draft["model"]) if budget is not None else draft["model"]
+                cache_key = ReviewCache.make_key(
+                    [draft["village_name"], task, resolve(draft["development_plan"][task]), conflicts],
+                    content_hash(resolve(draft["document"])), REVIEW_PROMPT_VERSION, model,
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    print(f"{task} 方案未变化，沿用缓存的审核结果\n")
+                    return cached
+
+            # 调用大模型进行审核
+            verdict = await self._run_review(task, prompt, draft["model"], bool(conflicts))
+            if cache_key is not None and verdict.get("source") != "parse_error":
+                self.cache.put(cache_key, verdict)
+            print(f"{task} 审核完成\n")
+            return verdict
+
+    def _build_prompt(self, task: str, draft: rural_DraftState) -> Tuple[str, str]:
+        """
+        构建审核提示词。
+
+        :param task: 任务名称
+        :param draft: rural_DraftState 实例
+        :return: (提示词, 与其他方向冲突的原文摘录)
+        """
+        # 本地一致性检查发现的、与其他方向冲突的原文片段
+        conflicts = format_conflicts(self.section_conflicts.get(task, []))
+        if conflicts:
+            consistency = f"""- 本地一致性检查在各方向方案中发现以下可能的冲突（仅摘录冲突的原文片段）：
+{conflicts}
+    - 判断这些冲突是否真实存在；真实冲突须作为 high 级问题列出，并说明应以哪个取值为准。"""
+        else:
+            consistency = "- 本地一致性检查未发现该方案与其他方向在数值指标、目标年份、主导产业和区划归属上的冲突。"
+
+        prompt = f'''
+    请审查{draft["village_name"]}村的{task}发展方案：{resolve(draft["development_plan"][task])}
 
     【村庄基本信息】：
-    {draft["document"]}
+    {resolve(draft["document"])}
 
     【审查要求】：
     1. **一致性检查**：
-    - 确保该方案与其他方向的方案没有冲突。
+    {consistency}
     2. **数据支持**：
     - 每一点必须有真实数字作为支撑，并附带数字来源。
     - 若没有真实数字，该观点必须有推理过程以及来源。
@@ -56,26 +140,96 @@ class Execute_Reviewer:
     3. **格式要求**：
     - 报告必须是 Markdown 格式。
 
-    【输出要求】：
-    1. 若报告满足上述要求，则返回“报告审核通过”。
-    2. 若不满足要求，请详细列出每一点的修改建议，并告知写稿人如何修改：
-    - 确保与其他方向方案无冲突。
-    - 每一点必须有真实数字或推理过程。
-    - 标明编造内容。
-    - 确保报告为 Markdown 格式。
-    '''
+    ''' + REVIEW_FORMAT
+        return prompt, conflicts
 
-            # 调用大模型进行审核
-            response = await call_model(self.semaphore, prompt, draft["model"])
-            print(f"{task} 审核完成\n")
-            return response.choices[0].message.content
+    async def _run_review(self, task: str, prompt: str, model: str, has_conflicts: bool,
+                          stats: Dict[str, float] = None) -> Dict[str, Any]:
+        """
+        按级联配置审核：没有配置级联时直接用 model 审核；否则从最便宜的模型开始，
+        结论不确定时逐级升级，直到结论确定或用到最强的模型。
+
+        :param task: 任务名称
+        :param prompt: 审核提示词
+        :param model: 默认审核模型，即 draft["model"]
+        :param has_conflicts: 该方向是否存在跨方向冲突
+        :param stats: 额外累计本次审核用量的字典（基准测试用）
+        :return: 审核结果，model 字段记录给出结论的模型
+        """
+        tiers = self.cascade.tiers(model) if self.cascade is not None else [model]
+        for level, tier_model in enumerate(tiers):
+            verdict = await self._request_verdict(task, prompt, tier_model, stats)
+            verdict["model"] = tier_model
+            if level == len(tiers) - 1:
+                break
+            reason = self.cascade.escalation_reason(verdict, has_conflicts)
+            if reason is None:
+                break
+            self.cascade.record_escalation(tier_model, reason)
+            print(f"{task} 由 {tier_model} 升级审核：{reason}\n")
+        return verdict
+
+    async def _request_verdict(self, task: str, prompt: str, model: str,
+                               stats: Dict[str, float] = None) -> Dict[str, Any]:
+        """
+        请求大模型给出结构化审核结果，解析失败时最多重试 max_parse_retries 次。
+        仍然失败时判为不通过，并把原始输出作为修改意见，避免误判为通过。
+        每次调用的耗时、token 和费用按模型累计到 tier_stats。
+
+        :param task: 任务名称
+        :param prompt: 审核提示词
+        :param model: 模型名称
+        :param stats: 额外累计本次审核用量的字典
+        :return: 审核结果
+        """
+        request = prompt
+        for attempt in range(self.max_parse_retries + 1):
+            start = time.perf_counter()
+            response = await call_model(self.llm_semaphore, request, model)
+            self._record_tier(model, response, time.perf_counter() - start, stats)
+            text = response.choices[0].message.content
+            try:
+                return parse_review(text)
+            except ValueError as e:
+                print(f"{task} 审核结果格式错误（第 {attempt + 1} 次）：{e}\n")
+                request = f"{prompt}\n\n你上一次的输出无法解析：{e}\n请严格按【输出格式】只输出 JSON 对象。"
+        self.parse_failures += 1
+        return {
+            "verdict": "fail",
+            "score": 0,
+            "issues": [{"severity": "high", "location": "全文", "problem": "审核结果无法解析为 JSON",
+                        "suggestion": text}],
+            "source": "parse_error",
+        }
+
+    def _record_tier(self, model: str, response, latency: float, stats: Dict[str, float] = None) -> None:
+        """按审核模型累计调用次数、耗时、token 和费用。"""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        for target in (self.tier_stats[model], stats):
+            if target is None:
+                continue
+            target["calls"] += 1
+            target["latency"] += latency
+            target["prompt_tokens"] += prompt_tokens
+            target["completion_tokens"] += completion_tokens
+            target["cost"] += cost
 
     async def parallel_review(self, draft: rural_DraftState) -> Dict[str, Any]:
         print("开始并行审核\n")
+        saved_before = self.lint_saved_calls
 
         if "passed" not in draft:
             draft["passed"] = "审核不通过"
         
+        # 一次性抽取所有方向的数值与实体断言，找出跨方向冲突，审核时只带上与该方向有关的冲突片段
+        conflicts = find_conflicts(resolve(draft["development_plan"]))
+        self.section_conflicts = conflicts_by_section(conflicts)
+        if conflicts:
+            print(f"本地一致性检查发现 {len(conflicts)} 处跨方向冲突：{[c['key'] for c in conflicts]}\n")
+
         try:
             tasks = [self.review(task, draft) for task in draft["development_plan"]]
         except:
@@ -87,23 +241,41 @@ class Execute_Reviewer:
         if "review" not in draft:
             draft["review"] = {}
 
+        self.iteration += 1
         keys = list(draft["development_plan"].keys())
-        k = 0  # 用来作为draft["review"]的下标索引
-        a = 0  # 记录审核是否通过
-        for result in results:
-            if keys[k] not in draft["review"]:
-                draft["review"][keys[k]] = {}
-            draft["review"][keys[k]] = result
-            k += 1
-            
-            if "报告审核通过" in result:
-                print(f"通过{k}")
-                # pass
-            else:
-                a = 1  # 审核不通过a=1意味着要修改
-
-        if a == 0:
+        for key, result in zip(keys, results):
+            draft["review"][key] = result
+        passed = [key for key in keys if review_passed(draft["review"][key])]
+        if len(passed) == len(keys):
             draft["passed"] = "审核通过"
+        budget = current_budget.get()
+        if budget is not None:
+            budget.end_iteration()
+
+        # 记录本轮通过率
+        rate = {
+            "iteration": self.iteration,
+            "passed": len(passed),
+            "total": len(keys),
+            "pass_rate": len(passed) / len(keys) if keys else 1.0,
+            "mean_score": sum(draft["review"][key].get("score", 0) for key in keys
+                              if isinstance(draft["review"][key], dict)) / len(keys) if keys else 0.0,
+        }
+        self.pass_rates.append(rate)
+        print(f"第 {self.iteration} 轮审核：通过 {rate['passed']}/{rate['total']}（{rate['pass_rate']:.0%}），"
+              f"平均得分 {rate['mean_score']:.1f}\n")
+
+        if self.use_linter:
+            print(f"本地检查本轮省下 {self.lint_saved_calls - saved_before} 次大模型审核，"
+                  f"本次运行累计省下 {self.lint_saved_calls} 次\n")
+        if self.cascade is not None:
+            for model, stats in self.tier_stats.items():
+                print(f"审核模型 {model}：{int(stats['calls'])} 次调用，耗时 {stats['latency']:.1f} 秒，"
+                      f"费用 {stats['cost']:.4f}，升级 {dict(self.cascade.escalations.get(model, {}))}")
+            print()
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"审核缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，命中率 {stats['hit_rate']:.0%}\n")
         print(f"并行审核完成：{draft['passed']}\n")
         return draft  # 返回最终的 draft_state
     
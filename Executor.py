@@ -4,9 +4,14 @@ from langchain_openai import ChatOpenAI
 import re
 import os
 
-from memory.draft import rural_DraftState
+from memory.draft import rural_DraftState, PLANNING_TASKS
+from memory.blob_store import resolve, store_text
 from save_to_local import save_dict_to_file
-from Call_Model import call_model
+from Call_Model import call_model, prediction_stats, continuation_stats, current_section, current_budget
+from review_schema import review_passed, format_review
+from candidate_scorer import pick_best
+from report_assembler import strip_numbering
+from tracing import traced
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -17,27 +22,129 @@ class Executor:
     乡村发展规划智能体，用于并行规划乡村发展的多个方面。
     """
 
-    def __init__(self,concurrency_limit=10):
+    def __init__(self,concurrency_limit=10, use_prediction=False, outline_tasks=None, candidates=1, sections=None):
         """
         初始化乡村发展规划智能体。
+
+        :param concurrency_limit: 最大并发数
+        :param use_prediction: 修订时是否把上一版草稿作为预测输出（predicted outputs）传给模型
+        :param outline_tasks: 采用“先提纲、后并行扩写”两阶段生成的任务名称集合，默认全部单次生成
+        :param candidates: 每个方向并发生成的候选稿数，大于 1 时用本地信号打分，只把得分最高的一份送审
+        :param sections: 只规划这些方向（planning_tasks 中的名称），默认全部
         """
-        self.planning_tasks = {
-            "当前核心产业": "当前核心产业与上下游布局规划",
-            "未来核心产业": "未来核心产业发展与上下游布局规划",
-            "第一产业": "第一产业发展方案",
-            "第二产业": "第二产业发展方案",
-            "第三产业": "第三产业发展方案",
-            "基础设施": "基础设施建设发展方案",
-            "生态环境": "生态环境保护发展方案",
-            "品牌建设": "品牌建设发展方案",
-            "市场营销": "市场推广和营销发展方案",
-            "检测与评价": "检测和评估体系发展方案",
-            "政策与资金": "政策支持和资金保障发展方案"
-        }
+        self.planning_tasks = dict(PLANNING_TASKS)
 
         self.concurrency_limit = concurrency_limit
         self.semaphore = asyncio.Semaphore(concurrency_limit)
+        self.llm_semaphore = asyncio.Semaphore(concurrency_limit)  # 传给 call_model 的信号量，见其说明
+        self.use_prediction = use_prediction
+        self.outline_tasks = set(outline_tasks or [])
+        self.candidates = candidates
+        self.sections = set(sections) if sections is not None else None
+        self.candidate_stats = {"sections": 0, "candidates": 0, "rejected_lint": 0}  # 多候选生成的统计
+
+    async def _generate(self, task: str, prompt: str, draft: rural_DraftState) -> str:
+        """
+        调用大模型生成单个方向的规划。
+
+        修订已有方案时，上一版草稿与新方案大部分相同，开启 use_prediction 后会把它作为预测输出，
+        以缩短重新生成的时间。outline_tasks 中的任务改为先生成提纲、再并行扩写。
+
+        :param task: 规划任务名称
+        :param prompt: 提示词
+        :param draft: rural_DraftState 实例
+        :return: 规划文本
+        """
+        current_section.set(task)
+        budget = current_budget.get()
+        if budget is not None:
+            if not budget.should_revise(task, draft):
+                return draft["development_plan"][task]
+            if task in draft.get("development_plan", {}):
+                budget.record_revision(task)
+
+        if task in self.outline_tasks:
+            return await self._outline_and_expand(task, prompt, draft)
+
+        prediction = None
+        if self.use_prediction:
+            previous = resolve(draft.get("development_plan", {}).get(task))
+            # 只有上一版是正常文本时才作为预测输出，出错时保存的字典不使用
+            if isinstance(previous, str) and previous.strip():
+                prediction = previous
+        if self.candidates > 1:
+            return await self._best_of_candidates(task, prompt, draft, prediction)
+        response = await call_model(self.llm_semaphore, prompt, draft["model"], prediction=prediction)
+        return response.choices[0].message.content
+
+    async def _best_of_candidates(self, task: str, prompt: str, draft: rural_DraftState,
+                                  prediction: str = None) -> str:
+        """
+        并发生成 candidates 份候选稿，用本地信号（格式检查、数字与来源密度、跨方向冲突、长度）打分，
+        返回得分最高的一份。多花一些并行的 token，换取更少的串行审核轮数。
+
+        :param task: 规划任务名称
+        :param prompt: 提示词
+        :param draft: rural_DraftState 实例
+        :param prediction: 预测输出内容
+        :return: 得分最高的候选稿
+        """
+        responses = await asyncio.gather(*[
+            call_model(self.llm_semaphore, prompt, draft["model"], prediction=prediction)
+            for _ in range(self.candidates)
+        ])
+        candidates = [response.choices[0].message.content for response in responses]
+        best, scores = pick_best(task, candidates, resolve(draft.get("development_plan", {})))
+        self.candidate_stats["sections"] += 1
+        self.candidate_stats["candidates"] += len(candidates)
+        self.candidate_stats["rejected_lint"] += sum(1 for score in scores if score["lint_issues"])
+        print(f"{task} 生成 {len(candidates)} 份候选稿，本地得分 {[score['score'] for score in scores]}，选用第 {best + 1} 份\n")
+        return candidates[best]
+
+    async def _outline_and_expand(self, task: str, prompt: str, draft: rural_DraftState) -> str:
+        """
+        两阶段生成长篇规划：先用一次短调用生成提纲，再并行扩写每个提纲条目，最后按顺序在本地拼接。
+
+        长篇方案的耗时由最长的一个部分决定，而不是随总长度线性增长。
+        提纲解析失败（少于 2 条）时回退为单次生成。
 
+        :param task: 规划任务名称
+        :param prompt: 提示词（作为所有扩写调用的共享上下文）
+        :param draft: rural_DraftState 实例
+        :return: 拼接后的规划文本
+        """
+        outline_prompt = prompt + '''
+
+【当前步骤】
+先不要撰写正文，只输出该方案的提纲：3-8 个一级部分，每行一个，格式为“1. 部分标题”，不要输出其他内容。'''
+        response = await call_model(self.llm_semaphore, outline_prompt, draft["model"])
+        outline = parse_outline(response.choices[0].message.content)
+        if len(outline) < 2:
+            print(f"{task} 提纲解析失败，回退为单次生成\n")
+            response = await call_model(self.llm_semaphore, prompt, draft["model"])
+            return response.choices[0].message.content
+
+        print(f"{task} 提纲生成完成，共 {len(outline)} 部分，开始并行扩写\n")
+        outline_text = "\n".join(f"{i}. {title}" for i, title in enumerate(outline, 1))
+
+        async def expand(index: int, title: str) -> str:
+            expand_prompt = prompt + f'''
+
+【方案提纲】
+{outline_text}
+
+【当前步骤】
+只撰写第{index}部分“{title}”的完整内容，以“## {title}”作为开头，不要撰写其他部分，也不要重复提纲。'''
+            response = await call_model(self.llm_semaphore, expand_prompt, draft["model"])
+            content = response.choices[0].message.content.strip()
+            if not content.startswith("#"):
+                content = f"## {title}\n\n{content}"
+            return content
+
+        sections = await asyncio.gather(*[expand(i, title) for i, title in enumerate(outline, 1)])
+        return "\n\n".join(sections)
+
+    @traced("Executor.plan_current_core_industry", section="当前核心产业")
     async def plan_current_core_industry(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划当前核心产业的发展现状与上下游布局。
@@ -50,7 +157,7 @@ class Executor:
                 draft["review"] = {}
             if "当前核心产业" not in draft["review"]:
                 draft["review"]["当前核心产业"] = ""         
-            if "审核通过" in draft["review"]["当前核心产业"]:
+            if review_passed(draft["review"]["当前核心产业"]):
                 return draft["development_plan"]["当前核心产业"]
             print("开始规划当前核心产业的发展现状与上下游布局\n")
             prompt = f'''
@@ -69,9 +176,9 @@ class Executor:
 - 实施计划：明确时间表、责任主体和预期效果
 
 【上下文信息】
-村庄基本信息：{draft["document"]}
-历史规划：{draft["development_plan"]["当前核心产业"] if "development_plan" in draft else "无历史规划"}
-审核意见：{draft["review"]["当前核心产业"] if "review" in draft and "当前核心产业" in draft["review"] else "无审核意见"}
+村庄基本信息：{resolve(draft["document"])}
+历史规划：{resolve(draft["development_plan"]["当前核心产业"]) if "development_plan" in draft else "无历史规划"}
+审核意见：{format_review(draft["review"]["当前核心产业"]) if "review" in draft and "当前核心产业" in draft["review"] else "无审核意见"}
 
 【输出规范】
 - 使用分点结构，避免长段落
@@ -87,13 +194,14 @@ class Executor:
 
 请按照上述要求完成规划，并确保建议具有可落地性。'''
             try:
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("当前核心产业", prompt, draft)
                 print("当前核心产业规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划当前核心产业时出错：{e}")
                 return {"task": "current_core_industry", "error": str(e)}
 
+    @traced("Executor.plan_future_core_industry", section="未来核心产业")
     async def plan_future_core_industry(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划未来核心产业的发展方向与上下游布局。
@@ -108,7 +216,7 @@ class Executor:
             if "未来核心产业" not in draft["review"]:
                 draft["review"]["未来核心产业"] = ""
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["未来核心产业"]:
+            if review_passed(draft["review"]["未来核心产业"]):
                 return draft["development_plan"]["未来核心产业"]
             
             print("开始规划未来核心产业的发展方向与上下游布局\n")
@@ -156,21 +264,22 @@ class Executor:
     输出的时候不要把报告审查结果加进去
 
     【上下文信息】
-    村庄基本信息：{draft["document"]}
-    历史规划：{draft["development_plan"]["未来核心产业"] if "development_plan" in draft else "无历史规划"}
-    审核意见：{draft["review"]["未来核心产业"] if "review" in draft and "未来核心产业" in draft["review"] else "无审核意见"}
+    村庄基本信息：{resolve(draft["document"])}
+    历史规划：{resolve(draft["development_plan"]["未来核心产业"]) if "development_plan" in draft else "无历史规划"}
+    审核意见：{format_review(draft["review"]["未来核心产业"]) if "review" in draft and "未来核心产业" in draft["review"] else "无审核意见"}
 
     请按照上述要求完成规划，并确保建议具有可落地性。'''
             
             try:
                 # 调用模型
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("未来核心产业", prompt, draft)
                 print("未来核心产业规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划未来核心产业时出错：{e}")
                 return {"task": "future_core_industry", "error": str(e)}
 
+    @traced("Executor.plan_primary_industry", section="第一产业")
     async def plan_primary_industry(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划第一产业发展方案。
@@ -186,7 +295,7 @@ class Executor:
                 draft["review"]["第一产业"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["第一产业"]:
+            if review_passed(draft["review"]["第一产业"]):
                 return draft["development_plan"]["第一产业"]
 
             print("开始规划第一产业发展方案\n")
@@ -213,9 +322,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["第一产业"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["第一产业"] if "review" in draft and "第一产业" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["第一产业"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["第一产业"]) if "review" in draft and "第一产业" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -228,13 +337,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("第一产业", prompt, draft)
                 print("第一产业发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划第一产业发展方案时出错：{e}")
                 return {"task": "primary_industry", "error": str(e)}
 
+    @traced("Executor.plan_secondary_industry", section="第二产业")
     async def plan_secondary_industry(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划第二产业发展方案。
@@ -250,7 +360,7 @@ class Executor:
                 draft["review"]["第二产业"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["第二产业"]:
+            if review_passed(draft["review"]["第二产业"]):
                 return draft["development_plan"]["第二产业"]
 
             print("开始规划第二产业发展方案\n")
@@ -277,9 +387,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["第二产业"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["第二产业"] if "review" in draft and "第二产业" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["第二产业"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["第二产业"]) if "review" in draft and "第二产业" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -292,13 +402,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("第二产业", prompt, draft)
                 print("第二产业发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划第二产业发展方案时出错：{e}")
                 return {"task": "secondary_industry", "error": str(e)}
 
+    @traced("Executor.plan_tertiary_industry", section="第三产业")
     async def plan_tertiary_industry(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划第三产业发展方案。
@@ -314,7 +425,7 @@ class Executor:
                 draft["review"]["第三产业"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["第三产业"]:
+            if review_passed(draft["review"]["第三产业"]):
                 return draft["development_plan"]["第三产业"]
 
             print("开始规划第三产业发展方案\n")
@@ -341,9 +452,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["第三产业"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["第三产业"] if "review" in draft and "第三产业" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["第三产业"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["第三产业"]) if "review" in draft and "第三产业" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -356,13 +467,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("第三产业", prompt, draft)
                 print("第三产业发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划第三产业发展方案时出错：{e}")
                 return {"task": "tertiary_industry", "error": str(e)}
 
+    @traced("Executor.plan_infrastructure", section="基础设施")
     async def plan_infrastructure(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划基础设施建设发展方案。
@@ -378,7 +490,7 @@ class Executor:
                 draft["review"]["基础设施"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["基础设施"]:
+            if review_passed(draft["review"]["基础设施"]):
                 return draft["development_plan"]["基础设施"]
 
             print("开始规划基础设施建设发展方案\n")
@@ -405,9 +517,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["基础设施"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["基础设施"] if "review" in draft and "基础设施" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["基础设施"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["基础设施"]) if "review" in draft and "基础设施" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -420,13 +532,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("基础设施", prompt, draft)
                 print("基础设施建设发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划基础设施建设发展方案时出错：{e}")
                 return {"task": "infrastructure", "error": str(e)}
 
+    @traced("Executor.plan_ecological_protection", section="生态环境")
     async def plan_ecological_protection(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划生态环境保护发展方案。
@@ -442,7 +555,7 @@ class Executor:
                 draft["review"]["生态环境"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["生态环境"]:
+            if review_passed(draft["review"]["生态环境"]):
                 return draft["development_plan"]["生态环境"]
 
             print("开始规划生态环境保护发展方案\n")
@@ -469,9 +582,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["生态环境"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["生态环境"] if "review" in draft and "生态环境" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["生态环境"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["生态环境"]) if "review" in draft and "生态环境" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -484,13 +597,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("生态环境", prompt, draft)
                 print("生态环境保护发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划生态环境保护发展方案时出错：{e}")
                 return {"task": "ecological_protection", "error": str(e)}
 
+    @traced("Executor.plan_brand_building", section="品牌建设")
     async def plan_brand_building(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划品牌建设发展方案。
@@ -506,7 +620,7 @@ class Executor:
                 draft["review"]["品牌建设"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["品牌建设"]:
+            if review_passed(draft["review"]["品牌建设"]):
                 return draft["development_plan"]["品牌建设"]
 
             print("开始规划品牌建设发展方案\n")
@@ -533,9 +647,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["品牌建设"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["品牌建设"] if "review" in draft and "品牌建设" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["品牌建设"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["品牌建设"]) if "review" in draft and "品牌建设" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -548,13 +662,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("品牌建设", prompt, draft)
                 print("品牌建设发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划品牌建设发展方案时出错：{e}")
                 return {"task": "brand_building", "error": str(e)}
 
+    @traced("Executor.plan_marketing", section="市场营销")
     async def plan_marketing(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划市场推广和营销发展方案。
@@ -570,7 +685,7 @@ class Executor:
                 draft["review"]["市场营销"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["市场营销"]:
+            if review_passed(draft["review"]["市场营销"]):
                 return draft["development_plan"]["市场营销"]
 
             print("开始规划市场推广和营销发展方案\n")
@@ -597,9 +712,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["市场营销"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["市场营销"] if "review" in draft and "市场营销" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["市场营销"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["市场营销"]) if "review" in draft and "市场营销" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -612,13 +727,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("市场营销", prompt, draft)
                 print("市场推广和营销发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划市场推广和营销发展方案时出错：{e}")
                 return {"task": "marketing", "error": str(e)}
 
+    @traced("Executor.plan_monitoring", section="检测与评价")
     async def plan_monitoring(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划检测和评估体系发展方案。
@@ -634,7 +750,7 @@ class Executor:
                 draft["review"]["检测与评价"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["检测与评价"]:
+            if review_passed(draft["review"]["检测与评价"]):
                 return draft["development_plan"]["检测与评价"]
 
             print("开始规划检测和评估体系发展方案\n")
@@ -661,9 +777,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["检测与评价"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["检测与评价"] if "review" in draft and "检测与评价" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["检测与评价"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["检测与评价"]) if "review" in draft and "检测与评价" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -676,13 +792,14 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("检测与评价", prompt, draft)
                 print("检测和评估体系发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划检测和评估体系发展方案时出错：{e}")
                 return {"task": "monitoring", "error": str(e)}
 
+    @traced("Executor.plan_policy_support", section="政策与资金")
     async def plan_policy_support(self, draft: rural_DraftState) -> Dict[str, Any]:
         """
         规划政策支持和资金保障发展方案。
@@ -698,7 +815,7 @@ class Executor:
                 draft["review"]["政策与资金"] = ""
 
             # 检查是否已审核通过
-            if "审核通过" in draft["review"]["政策与资金"]:
+            if review_passed(draft["review"]["政策与资金"]):
                 return draft["development_plan"]["政策与资金"]
 
             print("开始规划政策支持和资金保障发展方案\n")
@@ -725,9 +842,9 @@ class Executor:
     - 提出潜在风险及其应对措施。
 
     【上下文信息】
-    - 村庄基本信息：{draft["document"]}
-    - 上一版发展规划：{draft["development_plan"]["政策与资金"] if "development_plan" in draft else "无历史规划"}
-    - 审核意见：{draft["review"]["政策与资金"] if "review" in draft and "政策与资金" in draft["review"] else "无审核意见"}
+    - 村庄基本信息：{resolve(draft["document"])}
+    - 上一版发展规划：{resolve(draft["development_plan"]["政策与资金"]) if "development_plan" in draft else "无历史规划"}
+    - 审核意见：{format_review(draft["review"]["政策与资金"]) if "review" in draft and "政策与资金" in draft["review"] else "无审核意见"}
 
     【输出规范】
     - 使用分点结构，避免长段落。
@@ -740,9 +857,9 @@ class Executor:
 
             try:
                 # 调用大模型生成规划
-                response = await call_model(self.semaphore, prompt, draft["model"])
+                content = await self._generate("政策与资金", prompt, draft)
                 print("政策支持和资金保障发展方案规划完成\n")
-                return response.choices[0].message.content
+                return content
             except Exception as e:
                 print(f"规划政策支持和资金保障发展方案时出错：{e}")
                 return {"task": "policy_support", "error": str(e)}
@@ -756,23 +873,30 @@ class Executor:
         """
         print("开始并行规划乡村发展的多个方面\n")
 
+        budget = current_budget.get()
+        if budget is not None:
+            budget.begin_iteration()
+
         # if "review" in draft:
         #     for review in draft["review"]:
                 # print(f"{review}：\n{draft["review"][review]}\n")
 
-        tasks = [
-            self.plan_current_core_industry(draft),
-            self.plan_future_core_industry(draft),
-            self.plan_primary_industry(draft),
-            self.plan_secondary_industry(draft),
-            self.plan_tertiary_industry(draft),
-            self.plan_infrastructure(draft),
-            self.plan_ecological_protection(draft),
-            self.plan_brand_building(draft),
-            self.plan_marketing(draft),
-            self.plan_monitoring(draft),
-            # self.plan_policy_support(draft)
-        ]
+        planners = {
+            "当前核心产业": self.plan_current_core_industry,
+            "未来核心产业": self.plan_future_core_industry,
+            "第一产业": self.plan_primary_industry,
+            "第二产业": self.plan_secondary_industry,
+            "第三产业": self.plan_tertiary_industry,
+            "基础设施": self.plan_infrastructure,
+            "生态环境": self.plan_ecological_protection,
+            "品牌建设": self.plan_brand_building,
+            "市场营销": self.plan_marketing,
+            "检测与评价": self.plan_monitoring,
+            # "政策与资金": self.plan_policy_support,
+        }
+        if self.sections is not None:
+            planners = {key: planner for key, planner in planners.items() if key in self.sections}
+        tasks = [planner(draft) for planner in planners.values()]
 
         results = await asyncio.gather(*tasks)
 
@@ -782,21 +906,58 @@ class Executor:
             draft["development_plan"] = {}
         
         # 将字典的键转换为列表
-        keys = list(self.planning_tasks.keys())
+        keys = list(planners.keys())
         k=0
         for result in results:
             try:
                 if keys[k] not in draft["development_plan"]:
                     draft["development_plan"][keys[k]] = {}
-                draft["development_plan"][keys[k]] = result
+                # 方案全文存入大文本存储，工作状态中只保存句柄
+                draft["development_plan"][keys[k]] = store_text(result)
                 k+=1
             except:
                 print(result,"\n",type(result))
 
 
+        if self.use_prediction:
+            print(f"预测输出统计：{prediction_stats}\n")
+        if self.candidates > 1:
+            print(f"多候选生成统计：{self.candidate_stats}\n")
+        if continuation_stats["truncated"]:
+            print(f"截断续写统计：{continuation_stats}\n")
         print("并行规划完成\n")
         return draft  # 返回最终的 draft_state
 
+# 提纲最多保留的条目数，与提纲提示词中的“3-8 个一级部分”一致，避免模型多写的条目变成大量扩写调用
+MAX_OUTLINE_ITEMS = 8
+
+_OUTLINE_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+# 顶格的编号条目：“1. 标题”“1、标题”“1）标题”“**1. 标题**”；“1.1 小节”不算
+_OUTLINE_ITEM = re.compile(r"^(?:\*\*)?(\d+)\s*[.．、)）](?!\d)\s*(.+?)\s*$")
+
+
+def parse_outline(text: str) -> List[str]:
+    """
+    解析模型返回的提纲。至少有两个 Markdown 标题时取最高一级的标题；
+    否则取顶格、编号从 1 起连续的“1. 标题”“1、标题”条目，缩进的子条目和正文中重新编号的列表都不算。
+    最多保留 MAX_OUTLINE_ITEMS 条。
+
+    :param text: 提纲文本
+    :return: 按顺序排列的提纲标题列表
+    """
+    lines = text.splitlines()
+    headings = [match for match in map(_OUTLINE_HEADING.match, lines) if match]
+    top = min((len(match.group(1)) for match in headings), default=0)
+    outline = [strip_numbering(match.group(2).strip("* ")) for match in headings if len(match.group(1)) == top]
+    if len(outline) < 2:
+        outline = []
+        for line in lines:
+            match = _OUTLINE_ITEM.match(line)
+            if match and int(match.group(1)) == len(outline) + 1:
+                outline.append(match.group(2).strip("*# "))
+    return [title for title in outline if title][:MAX_OUTLINE_ITEMS]
+
+
 def read_markdown_files(directory_path: str) -> Dict[str, str]:
     """
     读取指定路径下的所有 Markdown 文件，并将内容存储在字典中。
@@ -832,4 +993,4 @@ if __name__ == "__main__":
     # 并行规划乡村发展
     result_draft = asyncio.run(development_agent.parallel_plan(draft=draft))
 
-    save_dict_to_file(result_draft["development_plan"], "Results", f"{result_draft["village_name"]}乡村振兴规划报告", "markdown")
\ No newline at end of file
+    save_dict_to_file(resolve(result_draft["development_plan"]), "Results", f"{result_draft["village_name"]}乡村振兴规划报告", "markdown")
\ No newline at end of file
@@ -6,31 +6,68 @@ import os
 
 from memory.draft import rural_DraftState
 from save_to_local import save_dict_to_file
-from Call_Model import call_model
+from report_exporters import export_report
+from Call_Model import call_model, current_section
+from memory.review_cache import ReviewCache, content_hash
+from memory.blob_store import resolve
+from review_schema import review_passed
+from report_assembler import assemble_report
 
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# 决定核心定位的方向，这些方向全部通过审核后即可开始提取核心定位
+CORE_SECTIONS = ("当前核心产业", "未来核心产业")
+
+# 润色提示词版本，修改润色提示词时需递增，使旧的润色缓存失效
+POLISH_PROMPT_VERSION = "1"
+
+
 class Reportor:
-    def __init__(self, concurrency_limit=10):
+    def __init__(self, concurrency_limit=10, cache_path=os.path.join(".cache", "polish_cache.sqlite")):
+        """
+        :param concurrency_limit: 最大并发数
+        :param cache_path: 润色结果缓存路径，为 None 时不缓存；方案未变化的方向直接沿用上一次的润色结果
+        """
         self.concurrency_limit = concurrency_limit
         self.semaphore = asyncio.Semaphore(concurrency_limit)
+        self.llm_semaphore = asyncio.Semaphore(concurrency_limit)  # 传给 call_model 的信号量，见其说明
+        # 润色结果与审核结果一样按内容哈希存取，复用同一种键值缓存
+        self.cache = ReviewCache(cache_path) if cache_path else None
+        self.polished_calls = 0  # 本次实际调用大模型润色的方向数
+        self._positioning = None  # 核心定位的 Future，核心方向通过审核后开始提取
+        self._positioning_task: asyncio.Task = None  # 提取核心定位的后台任务
+        self._polishing: Dict[str, Tuple[str, asyncio.Task]] = {}  # 方向 -> (方案哈希, 后台润色任务)
 
-    async def extract_core_positioning(self, draft: rural_DraftState) -> str:
+    async def extract_core_positioning(self, draft: rural_DraftState, sections: List[str] = None) -> str:
         """
-        从已有规划报告中提取乡村的核心定位。
+        从已有规划报告中提取乡村的核心定位。规划内容未变化时沿用缓存。
 
         :param draft: rural_DraftState 实例
+        :param sections: 提取所依据的方向，为 None 时使用全部方向
         :return: 核心定位描述
         """
+        plans = resolve(draft["development_plan"])
+        if sections is not None:
+            plans = {task: plans[task] for task in sections}
         async with self.semaphore:
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ReviewCache.make_key(
+                    [draft["village_name"], "核心定位", plans],
+                    "", POLISH_PROMPT_VERSION, draft["model"],
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached["text"]
+
             print(f"开始提取核心定位\n")
 
             # 构建提示词
             prompt = f'''
     请根据以下规划报告内容，提炼出{draft["village_name"]}村的核心定位：
-    {draft["development_plan"]}
+    {plans}
 
 乡村发展定位是指基于乡村的资源禀赋、地理位置、产业特色、文化传统、生态环境等综合因素，明确乡村在区域经济社会发展中的角色和功能，确定其未来发展的核心方向和目标。发展定位通常涵盖以下几个方面：
 
@@ -43,55 +80,182 @@ class Reportor:
     '''
 
             # 调用大模型提取核心定位
-            response = await call_model(self.semaphore, prompt, draft["model"])
+            response = await call_model(self.llm_semaphore, prompt, draft["model"])
             core_positioning = response.choices[0].message.content.strip()
             # print(f"核心定位提取完成：{core_positioning}\n")
+            if cache_key is not None:
+                self.cache.put(cache_key, {"text": core_positioning})
             return core_positioning
 
-    async def generate_report(self, draft: rural_DraftState) -> Dict[str, Any]:
+    async def polish_section(self, task: str, draft: rural_DraftState, core_positioning: str) -> str:
         """
-        根据已有规划报告，生成综合报告。
+        排版润色单个方向的方案，核心定位作为共享上下文。方案未变化时沿用上一次的润色结果。
 
+        :param task: 方向名称
         :param draft: rural_DraftState 实例
-        :return: 综合报告（字典格式）
+        :param core_positioning: 核心定位
+        :return: 润色后的正文
         """
         async with self.semaphore:
-            print(f"开始生成综合报告\n")
+            plan = resolve(draft["development_plan"][task])
+            # 核心定位只影响措辞，不计入缓存键，某个方向的修改不会导致其他方向全部重新润色
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ReviewCache.make_key(
+                    [draft["village_name"], task, plan], "", POLISH_PROMPT_VERSION, draft["model"],
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    print(f"{task} 方案未变化，沿用上一次的润色结果\n")
+                    return cached["text"]
 
-            # 提取核心定位
-            core_positioning = await self.extract_core_positioning(draft)
-
-            # 构建提示词
+            print(f"开始润色 {task}\n")
+            current_section.set(task)
             prompt = f'''
-    请把下面关于{draft["village_name"]}的乡村振兴规划：
-    {draft["development_plan"]}
-排版美化成一份完整的乡村振兴规划报告
-    
+    请把下面{draft["village_name"]}村乡村振兴规划中“{task}”一章的内容排版美化：
+    {plan}
+
     【核心定位】：
     {core_positioning}
 
     【输出要求】：
-    把核心发展定位提炼出来作为标题
-全面综合地撰写报告
+    1. 围绕核心定位组织本章内容，但只写本章，不要写其他章节，不要写报告标题、目录和总结。
     2. 报告应符合官方公文格式，使用正式语言。
-    3. 每一部分内容都应该详细，逻辑清晰，有理有据，标注数据来源
-    4. 输出格式为 Markdown。
+    3. 保留原文中的全部数据、数据来源和推理过程，不得编造新的数据。
+    4. 每一部分内容都应该详细，逻辑清晰，有理有据，标注数据来源。
+    5. 输出格式为 Markdown，小节标题使用 ### 及以下级别，标题不要编号。
     '''
+            response = await call_model(self.llm_semaphore, prompt, draft["model"])
+            polished = response.choices[0].message.content.strip()
+            self.polished_calls += 1
+            if cache_key is not None:
+                self.cache.put(cache_key, {"text": polished})
+            print(f"{task} 润色完成\n")
+            return polished
+
+    def schedule(self, draft: rural_DraftState, force: bool = False) -> None:
+        """
+        每轮审核后调用：在后台为已通过审核的方向开始润色，与其他方向的修改并行进行。
+
+        核心产业方向（CORE_SECTIONS）全部通过后开始提取核心定位，润色任务等核心定位就绪后再调用大模型。
+        方案文本已调度过的方向不会重复润色。必须在事件循环内调用。
+
+        :param draft: rural_DraftState 实例
+        :param force: 为 True 时不看审核结果，调度全部有正常文本的方向
+        """
+        plans = draft.get("development_plan", {})
+        reviews = draft.get("review", {})
+        ready = [task for task, plan in plans.items()
+                 if isinstance(plan, str) and plan.strip() and (force or review_passed(reviews.get(task)))]
+
+        if self._positioning is None:
+            self._positioning = asyncio.get_running_loop().create_future()
+        core = [task for task in CORE_SECTIONS if task in plans] or list(plans)
+        if self._positioning_task is None and (force or all(task in ready for task in core)):
+            snapshot = self._snapshot(draft, core)
+            self._positioning_task = asyncio.create_task(self._extract_into_future(snapshot, core))
+
+        for task in ready:
+            plan_hash = content_hash(plans[task])
+            scheduled = self._polishing.get(task)
+            if scheduled is not None and scheduled[0] == plan_hash:
+                continue
+            snapshot = self._snapshot(draft, [task])
+            self._polishing[task] = (plan_hash, asyncio.create_task(self._polish_when_ready(task, snapshot)))
+
+    @staticmethod
+    def _snapshot(draft: rural_DraftState, sections: List[str]) -> Dict[str, Any]:
+        """后台任务只持有所需方向的副本，不受后续节点修改 draft 的影响。"""
+        return {
+            "village_name": draft["village_name"],
+            "model": draft["model"],
+            "development_plan": {task: draft["development_plan"][task] for task in sections},
+        }
+
+    async def _extract_into_future(self, snapshot: Dict[str, Any], sections: List[str]) -> None:
+        try:
+            self._positioning.set_result(await self.extract_core_positioning(snapshot, sections))
+        except Exception as e:
+            self._positioning.set_exception(e)
+
+    async def _polish_when_ready(self, task: str, snapshot: Dict[str, Any]) -> str:
+        core_positioning = await self._positioning
+        return await self.polish_section(task, snapshot, core_positioning)
+
+    def cancel(self) -> None:
+        """取消尚未完成的核心定位和润色任务（工作流中途失败时调用），下一次从头调度。"""
+        pending = [task for _, task in self._polishing.values()]
+        if self._positioning_task is not None:
+            pending.append(self._positioning_task)
+        for task in pending:
+            if not task.done():
+                task.cancel()
+        if self._positioning is not None and not self._positioning.done():
+            self._positioning.cancel()
+        self._positioning = None
+        self._positioning_task = None
+        self._polishing = {}
+        self.polished_calls = 0
+
+    async def generate_report(self, draft: rural_DraftState) -> Dict[str, Any]:
+        """
+        根据已有规划报告，生成综合报告。
+
+        以核心定位为共享上下文并行润色各方向；在工作流中，大部分方向已在审核通过后由 schedule 提前开始润色，
+        这里只等待剩余的后台任务。标题、目录、章节编号和标题层级在本地拼接时统一处理。
+
+        :param draft: rural_DraftState 实例
+        :return: 综合报告（字典格式）
+        """
+        print(f"开始生成综合报告\n")
+        # 预算停止修改等原因未通过审核的方向也写入报告
+        self.schedule(draft, force=True)
+        done = sum(task.done() for _, task in self._polishing.values())
+        print(f"{done}/{len(self._polishing)} 个方向已在审核期间润色完成\n")
+
+        tasks = list(self._polishing)
+        try:
+            results = await asyncio.gather(*[self._polishing[task][1] for task in tasks], return_exceptions=True)
+            # 提取任务自身不抛出异常，结果或错误都写入 Future
+            await self._positioning_task
+        except BaseException:
+            self.cancel()
+            raise
+        polished = {}
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception):
+                # 润色失败的方向保留原方案，不影响整份报告
+                print(f"{task} 润色失败，使用原方案：{result}\n")
+                result = resolve(draft["development_plan"][task])
+            polished[task] = result
+        try:
+            core_positioning = self._positioning.result()
+        except Exception as e:
+            print(f"核心定位提取失败：{e}\n")
+            core_positioning = ""
+        # 方案是出错信息或为空的方向无法润色，报告中保留占位章节并写明原因，不让章节悄悄缺失
+        placeholders = {}
+        for task, plan in draft["development_plan"].items():
+            if task not in polished:
+                reason = plan.get("error", "方案格式错误") if isinstance(plan, dict) else "方案为空"
+                print(f"{task} 没有可用的方案，报告中保留占位章节：{reason}\n")
+                placeholders[task] = f"> 本章未能生成规划方案：{reason}"
+        print(f"综合报告润色完成：{self.polished_calls} 个方向调用大模型润色，{len(tasks) - self.polished_calls} 个沿用上一次的结果，"
+              f"{len(placeholders)} 个方向没有可用的方案\n")
+
+        # 本次报告已完成，下一次从头调度
+        self._positioning = None
+        self._positioning_task = None
+        self._polishing = {}
+        self.polished_calls = 0
 
-            # 调用大模型生成综合报告
-            response = await call_model(self.semaphore, prompt, draft["model"])
-            comprehensive_report = response.choices[0].message.content
-            # print(f"综合报告生成完成\n")
-            
-            # 更新 draft
-            if "comprehensive_report" not in draft:
-                draft["comprehensive_report"] = {}
-            if "core_positioning" not in draft:
-                draft["core_positioning"] = {}
-            draft["comprehensive_report"] = comprehensive_report
-            draft["core_positioning"] = core_positioning
-            # print(draft["comprehensive_report"])
-            return draft
+        # 更新 draft，拼接是纯本地操作
+        draft["polished_sections"] = polished
+        draft["core_positioning"] = core_positioning
+        draft["comprehensive_report"] = assemble_report(
+            draft["village_name"], core_positioning, {**polished, **placeholders}, list(draft["development_plan"].keys())
+        )
+        return draft
 
 
 def read_markdown_files(directory_path: str) -> Dict[str, str]:
@@ -134,4 +298,4 @@ if __name__ == "__main__":
     # 生成综合报告
     comprehensive_draft = asyncio.run(report_generator.generate_report(draft=draft))
 
-    save_dict_to_file(comprehensive_draft, "Results", f"{comprehensive_draft["village_name"]}乡村振兴规划报告", "markdown",keys=["comprehensive_report"])
\ No newline at end of file
+    export_report(comprehensive_draft["comprehensive_report"], "Results", f"{comprehensive_draft["village_name"]}乡村振兴综合报告")
\ No newline at end of file
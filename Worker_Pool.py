@@ -0,0 +1,493 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+from memory.draft import rural_DraftState
+from Call_Model import set_global_limiter, current_village, usage_stats, model_prices
+from Batch_Runner import load_manifest, apply_budget_arguments, apply_executor_arguments, editor_options
+from ChiefEditor import add_budget_arguments, add_executor_arguments
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """
+    打开队列数据库。多个进程同时读写，使用 WAL 模式并设置忙等待超时。
+    连接可能在线程池中使用，调用方需自行加锁保证同一时间只有一个线程访问。
+
+    :param db_path: 数据库路径
+    :return: 数据库连接
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _pid_alive(pid: int) -> bool:
+    """判断本机进程是否仍在运行。"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    基于 SQLite 的持久化村庄任务队列。
+
+    工作进程通过租约领取任务，并定期心跳续租；进程崩溃后租约过期（或协调进程发现其已退出），
+    任务会重新排队，由其他工作进程重试，超过最大尝试次数后标记为失败。
+    """
+
+    def __init__(self, db_path: str = "jobs.sqlite"):
+        """
+        :param db_path: 队列数据库路径
+        """
+        self.db_path = db_path
+        self.conn = _connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                village_name TEXT NOT NULL,
+                run_id TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+        """)
+        # 旧版本创建的队列没有 run_id 列
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        if "run_id" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN run_id TEXT")
+
+    def enqueue(self, village: Dict[str, Any], max_attempts: int = 3) -> int:
+        """
+        添加一个村庄任务，并为其分配运行 ID。
+        运行 ID 包含随机部分，队列数据库重建后任务编号重新从 1 开始，也不会与共用检查点中旧任务的记录混在一起。
+
+        :param village: 村庄配置，包含 village_name、documents_path、model
+        :param max_attempts: 最大尝试次数
+        :return: 任务 ID
+        """
+        now = time.time()
+        run_id = f"{village['village_name']}-{uuid.uuid4().hex}"
+        cursor = self.conn.execute(
+            """INSERT INTO jobs (village_name, run_id, payload, max_attempts, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (village["village_name"], run_id, json.dumps(village, ensure_ascii=False), max_attempts, now, now),
+        )
+        return cursor.lastrowid
+
+    def _expire(self, now: float, condition: str, params: tuple = ()) -> int:
+        """把满足条件的已租任务重新排队，尝试次数用尽的标记为失败。"""
+        cursor = self.conn.execute(
+            f"""UPDATE jobs SET
+                    status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                    error = COALESCE(error, '') || '租约失效：' || COALESCE(lease_owner, '') || '\n',
+                    lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE status = 'leased' AND ({condition})""",
+            (now, *params),
+        )
+        return cursor.rowcount
+
+    def lease(self, worker_id: str, lease_seconds: float = 120) -> Optional[Dict[str, Any]]:
+        """
+        领取一个任务。先回收已过期的租约，再按入队顺序领取最早的排队任务。
+
+        :param worker_id: 工作进程标识
+        :param lease_seconds: 租约时长（秒）
+        :return: 任务信息，没有可领取的任务时返回 None
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(now, "lease_expires < ?", (now,))
+            row = self.conn.execute(
+                "SELECT id, payload, attempts, run_id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                """UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                       lease_expires = ?, updated_at = ? WHERE id = ?""",
+                (worker_id, now + lease_seconds, now, row[0]),
+            )
+            run_id = row[3]
+            if run_id is None:
+                # 旧版本入队的任务，领取时补上运行 ID，之后的重试沿用
+                run_id = f"{json.loads(row[1])['village_name']}-{uuid.uuid4().hex}"
+                self.conn.execute("UPDATE jobs SET run_id = ? WHERE id = ?", (run_id, row[0]))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return {"id": row[0], "run_id": run_id, "village": json.loads(row[1]), "attempt": row[2] + 1}
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 120) -> bool:
+        """
+        续租。
+
+        :return: 是否仍持有该任务的租约
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + lease_seconds, now, job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """标记任务完成。租约已被回收时返回 False。"""
+        cursor = self.conn.execute(
+            """UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL,
+                   updated_at = ? WHERE id = ? AND lease_owner = ?""",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> None:
+        """任务出错：尝试次数未用尽时重新排队，否则标记为失败。"""
+        self.conn.execute(
+            """UPDATE jobs SET
+                   status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                   error = COALESCE(error, '') || ? || '\n', lease_owner = NULL, lease_expires = NULL,
+                   updated_at = ?
+               WHERE id = ? AND lease_owner = ?""",
+            (error, time.time(), job_id, worker_id),
+        )
+
+    def requeue_dead_workers(self) -> int:
+        """
+        回收已退出进程持有的租约，不必等待租约过期。工作进程标识的格式为 “worker-<pid>”。
+
+        :return: 回收的任务数
+        """
+        owners = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT lease_owner FROM jobs WHERE status = 'leased'")]
+        dead = [owner for owner in owners if not _pid_alive(int(owner.rsplit("-", 1)[1]))]
+        if not dead:
+            return 0
+        placeholders = ",".join("?" * len(dead))
+        return self._expire(time.time(), f"lease_owner IN ({placeholders})", tuple(dead))
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数。"""
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def results(self) -> List[Dict[str, Any]]:
+        """所有任务的状态与结果。"""
+        rows = self.conn.execute(
+            "SELECT id, village_name, status, attempts, result, error, run_id FROM jobs ORDER BY id").fetchall()
+        return [
+            {"id": r[0], "village_name": r[1], "status": r[2], "attempts": r[3],
+             "result": json.loads(r[4]) if r[4] else None, "error": r[5], "run_id": r[6]}
+            for r in rows
+        ]
+
+
+class LLMBudget:
+    """
+    跨进程共享的大模型并发与速率额度，存放在队列数据库中。
+
+    每个槽位记录持有者进程和过期时间；进程崩溃后槽位到期自动释放，协调进程也会主动回收。
+    用法与 asyncio.Semaphore 相同，可直接通过 set_global_limiter 接入 call_model。
+    每次 async with 占用的槽位记在当前任务的上下文中，退出时只释放自己占用的那一个，
+    同一进程中并发的多个调用不会互相释放对方的槽位。
+    """
+
+    def __init__(self, db_path: str = "jobs.sqlite", slot_ttl: float = 600, poll_interval: float = 0.2):
+        """
+        :param db_path: 队列数据库路径
+        :param slot_ttl: 槽位最长持有时间（秒），应大于单次模型调用的最长耗时
+        :param poll_interval: 无空闲槽位时的轮询间隔（秒）
+        """
+        self.db_path = db_path
+        self.slot_ttl = slot_ttl
+        self.poll_interval = poll_interval
+        self.conn = _connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_slots (slot INTEGER PRIMARY KEY, holder TEXT, expires REAL);
+            CREATE TABLE IF NOT EXISTS llm_budget (key TEXT PRIMARY KEY, value REAL);
+            CREATE TABLE IF NOT EXISTS llm_requests (ts REAL NOT NULL);
+        """)
+        # 当前任务（及其嵌套的 async with）占用的槽位，asyncio 的每个任务各有一份上下文
+        self._held: ContextVar[Tuple[int, ...]] = ContextVar(f"llm_budget_held_{id(self)}", default=())
+        self._lock = threading.Lock()
+
+    def configure(self, max_concurrency: int, requests_per_minute: Optional[int] = None) -> None:
+        """
+        由协调进程设置全局额度：重建槽位表并记录每分钟请求上限。
+
+        :param max_concurrency: 所有进程共享的最大并发数
+        :param requests_per_minute: 所有进程共享的每分钟最大请求数
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("DELETE FROM llm_slots")
+        self.conn.executemany("INSERT INTO llm_slots (slot) VALUES (?)", [(i,) for i in range(max_concurrency)])
+        self.conn.execute("INSERT OR REPLACE INTO llm_budget VALUES ('requests_per_minute', ?)",
+                          (requests_per_minute or 0,))
+        self.conn.execute("COMMIT")
+
+    def _try_acquire(self, holder: str) -> Optional[int]:
+        """尝试占用一个空闲或已过期的槽位，并检查每分钟请求数。"""
+        with self._lock:
+            return self._try_acquire_locked(holder)
+
+    def _try_acquire_locked(self, holder: str) -> Optional[int]:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rpm = self.conn.execute(
+                "SELECT value FROM llm_budget WHERE key = 'requests_per_minute'").fetchone()
+            if rpm and rpm[0]:
+                self.conn.execute("DELETE FROM llm_requests WHERE ts < ?", (now - 60,))
+                if self.conn.execute("SELECT COUNT(*) FROM llm_requests").fetchone()[0] >= rpm[0]:
+                    self.conn.execute("COMMIT")
+                    return None
+            row = self.conn.execute(
+                "SELECT slot FROM llm_slots WHERE holder IS NULL OR expires < ? LIMIT 1", (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute("UPDATE llm_slots SET holder = ?, expires = ? WHERE slot = ?",
+                              (holder, now + self.slot_ttl, row[0]))
+            self.conn.execute("INSERT INTO llm_requests VALUES (?)", (now,))
+            self.conn.execute("COMMIT")
+            return row[0]
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _release(self, slot: int, holder: str) -> None:
+        with self._lock:
+            self.conn.execute("UPDATE llm_slots SET holder = NULL, expires = NULL WHERE slot = ? AND holder = ?",
+                              (slot, holder))
+
+    def release_dead_holders(self) -> int:
+        """回收已退出进程持有的槽位。槽位持有者的格式为 “worker-<pid>”。"""
+        holders = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT holder FROM llm_slots WHERE holder IS NOT NULL")]
+        released = 0
+        for holder in holders:
+            if not _pid_alive(int(holder.rsplit("-", 1)[1])):
+                released += self.conn.execute(
+                    "UPDATE llm_slots SET holder = NULL, expires = NULL WHERE holder = ?", (holder,)).rowcount
+        return released
+
+    async def __aenter__(self):
+        holder = f"worker-{os.getpid()}"
+        while True:
+            # SQLite 操作会阻塞，放到线程中执行，避免拖慢事件循环里的其他请求
+            slot = await asyncio.to_thread(self._try_acquire, holder)
+            if slot is not None:
+                self._held.set(self._held.get() + (slot,))
+                return self
+            await asyncio.sleep(self.poll_interval)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        held = self._held.get()
+        self._held.set(held[:-1])
+        await asyncio.to_thread(self._release, held[-1], f"worker-{os.getpid()}")
+
+
+async def _run_job(job: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """在当前进程的事件循环中运行一个村庄任务。"""
+    from ChiefEditor import ChiefEditor
+
+    village = job["village"]
+    name = village["village_name"]
+    current_village.set(name)
+    start = time.perf_counter()
+    draft = rural_DraftState(
+        village_name=name,
+        documents_path=village["documents_path"],
+        model=village["model"],
+    )
+    # 重试的任务沿用入队时记录的运行 ID，从上次崩溃前的检查点续跑
+    editor = ChiefEditor(draft, output_dir=output_dir, run_id=job["run_id"], **editor_options(village))
+    await editor.run(resume=job["attempt"] > 1)
+    return {"wall_time": time.perf_counter() - start, "pid": os.getpid(), **usage_stats[name]}
+
+
+async def _worker_loop(db_path: str, output_dir: str, lease_seconds: float, prices: Dict[str, Any]) -> None:
+    """
+    工作进程主循环：领取任务、心跳续租、运行工作流、回写结果，队列清空后退出。
+    队列的 SQLite 操作都放到线程中执行，避免阻塞同一事件循环中正在运行的工作流。
+    """
+    worker_id = f"worker-{os.getpid()}"
+    queue = JobQueue(db_path)
+    model_prices.update({model: tuple(price) for model, price in prices.items()})
+    set_global_limiter(LLMBudget(db_path))
+
+    while True:
+        job = await asyncio.to_thread(queue.lease, worker_id, lease_seconds)
+        if job is None:
+            counts = await asyncio.to_thread(queue.counts)
+            if not counts.get("queued") and not counts.get("leased"):
+                break
+            await asyncio.sleep(1)
+            continue
+
+        print(f"[{worker_id}] 开始任务 {job['id']}：{job['village']['village_name']}（第 {job['attempt']} 次）")
+        task = asyncio.create_task(_run_job(job, output_dir))
+
+        # 心跳续租；租约被回收（例如被判定超时）时取消任务，交给其他进程重试
+        while not task.done():
+            await asyncio.wait({task}, timeout=lease_seconds / 3)
+            if not task.done() and not await asyncio.to_thread(queue.heartbeat, job["id"], worker_id, lease_seconds):
+                print(f"[{worker_id}] 任务 {job['id']} 租约已失效，放弃执行")
+                task.cancel()
+
+        if task.cancelled():
+            continue
+        if task.exception() is not None:
+            print(f"[{worker_id}] 任务 {job['id']} 失败：{task.exception()}")
+            await asyncio.to_thread(queue.fail, job["id"], worker_id, repr(task.exception()))
+        else:
+            await asyncio.to_thread(queue.complete, job["id"], worker_id, task.result())
+            print(f"[{worker_id}] 任务 {job['id']} 完成")
+
+
+def worker_main(db_path: str, output_dir: str, lease_seconds: float, prices: Dict[str, Any]) -> None:
+    """工作进程入口，每个进程运行各自的事件循环。"""
+    asyncio.run(_worker_loop(db_path, output_dir, lease_seconds, prices))
+
+
+class Coordinator:
+    """
+    协调进程：设置跨进程共享的大模型额度，启动 N 个工作进程，
+    并定期回收崩溃进程持有的任务租约和大模型槽位。
+    """
+
+    def __init__(self, db_path: str = "jobs.sqlite", workers: int = 4, max_concurrency: int = 20,
+                 requests_per_minute: Optional[int] = None, lease_seconds: float = 120,
+                 output_dir: str = "Results", prices: Optional[Dict[str, Any]] = None):
+        """
+        :param db_path: 队列数据库路径
+        :param workers: 工作进程数
+        :param max_concurrency: 所有进程共享的大模型最大并发数
+        :param requests_per_minute: 所有进程共享的每分钟最大请求数
+        :param lease_seconds: 任务租约时长（秒）
+        :param output_dir: 报告保存目录
+        :param prices: 模型单价，格式同 Call_Model.model_prices
+        """
+        self.db_path = db_path
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.output_dir = output_dir
+        self.prices = prices or {}
+        self.queue = JobQueue(db_path)
+        self.budget = LLMBudget(db_path)
+        self.budget.configure(max_concurrency, requests_per_minute)
+
+    def run(self, poll_interval: float = 5) -> List[Dict[str, Any]]:
+        """
+        运行到队列中所有任务完成或失败为止。
+
+        :param poll_interval: 巡检间隔（秒）
+        :return: 所有任务的状态与结果
+        """
+        context = multiprocessing.get_context("spawn")
+        processes = []
+
+        def spawn():
+            process = context.Process(
+                target=worker_main,
+                args=(self.db_path, self.output_dir, self.lease_seconds, self.prices),
+            )
+            process.start()
+            processes.append(process)
+
+        for _ in range(self.workers):
+            spawn()
+
+        while True:
+            time.sleep(poll_interval)
+            requeued = self.queue.requeue_dead_workers()
+            released = self.budget.release_dead_holders()
+            if requeued or released:
+                print(f"回收崩溃进程：重新排队 {requeued} 个任务，释放 {released} 个大模型槽位")
+
+            counts = self.queue.counts()
+            print(f"任务进度：{counts}")
+            if not counts.get("queued") and not counts.get("leased"):
+                break
+            # 保持工作进程数量，替换已退出的进程
+            processes[:] = [p for p in processes if p.is_alive()]
+            for _ in range(self.workers - len(processes)):
+                spawn()
+
+        for process in processes:
+            process.join()
+        return self.queue.results()
+
+
+def main():
+    """
+    命令行入口：
+        python Worker_Pool.py enqueue villages.json
+        python Worker_Pool.py run --workers 4 --concurrency 20 --rpm 600 --manifest villages.json
+        python Worker_Pool.py status
+    """
+    parser = argparse.ArgumentParser(description="多进程村庄规划任务队列")
+    parser.add_argument("command", choices=["enqueue", "run", "status"])
+    parser.add_argument("manifest", nargs="?", help="村庄清单 JSON 文件（enqueue 时必填）")
+    parser.add_argument("--db", default="jobs.sqlite", help="队列数据库路径")
+    parser.add_argument("--workers", type=int, default=4, help="工作进程数")
+    parser.add_argument("--concurrency", type=int, default=20, help="所有进程共享的大模型最大并发数")
+    parser.add_argument("--rpm", type=int, default=None, help="所有进程共享的每分钟最大请求数")
+    parser.add_argument("--lease", type=float, default=120, help="任务租约时长（秒）")
+    parser.add_argument("--max-attempts", type=int, default=3, help="单个任务最大尝试次数")
+    parser.add_argument("--output-dir", default="Results", help="输出目录")
+    parser.add_argument("--prices", help="读取模型单价的村庄清单 JSON 文件")
+    add_budget_arguments(parser)
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == "enqueue":
+        manifest = load_manifest(args.manifest)
+        # 预算和生成方式随任务一起入队，工作进程按入队时的设置运行
+        apply_budget_arguments(manifest["villages"], args)
+        apply_executor_arguments(manifest["villages"], args)
+        for village in manifest["villages"]:
+            job_id = queue.enqueue(village, max_attempts=args.max_attempts)
+            print(f"已入队任务 {job_id}：{village['village_name']}")
+    elif args.command == "run":
+        prices = load_manifest(args.prices)["prices"] if args.prices else {}
+        results = Coordinator(
+            db_path=args.db,
+            workers=args.workers,
+            max_concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            lease_seconds=args.lease,
+            output_dir=args.output_dir,
+            prices=prices,
+        ).run()
+        for r in results:
+            print(f"{r['id']} {r['village_name']}：{r['status']}（尝试 {r['attempts']} 次）")
+    else:
+        print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
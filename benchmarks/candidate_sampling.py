@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+from benchmarks.mock_llm import MockLLM, start_mock_server
+from Call_Model import usage_stats
+from ChiefEditor import ChiefEditor
+from Executor import Executor
+from Execute_Reviewer import Execute_Reviewer
+from Reportor import Reportor
+from memory.draft import rural_DraftState
+
+
+class _BenchmarkEditor(ChiefEditor):
+    """按基准参数创建子代理，并关闭所有缓存，每次运行都从头请求。"""
+
+    def __init__(self, draft: rural_DraftState, candidates: int, **kwargs):
+        super().__init__(draft, **kwargs)
+        self.candidates = candidates
+
+    def initialize_agents(self):
+        self.agents = {
+            "Executor": Executor(candidates=self.candidates),
+            "Execute_Reviewer": Execute_Reviewer(cache_path=None),
+            "Reportor": Reportor(cache_path=None),
+        }
+        return self.agents
+
+
+async def run_once(candidates: int, seed: int, latency: float, documents_path: str) -> Dict[str, Any]:
+    """
+    在模拟服务上完整运行一次工作流。
+
+    :param candidates: 每个方向的候选稿数
+    :param seed: 模拟服务的随机种子
+    :param latency: 模拟服务每次调用的固定延迟
+    :param documents_path: 村庄资料目录
+    :return: 墙钟时间、审核轮数、调用次数和 token 用量
+    """
+    llm = MockLLM(base_latency=latency, seed=seed)
+    server, url = start_mock_server(llm)
+    os.environ["XAI_API_BASE"], os.environ["XAI_API_KEY"] = url, "mock"
+    usage_stats.clear()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            draft = rural_DraftState(village_name="金田村", documents_path=documents_path, model="mock")
+            editor = _BenchmarkEditor(draft, candidates, output_dir=output_dir, checkpoint_path=None)
+            start = time.perf_counter()
+            await editor.run()
+            wall_time = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    usage = usage_stats[""]
+    return {
+        "candidates": candidates,
+        "seed": seed,
+        "wall_time": wall_time,
+        "review_iterations": editor.agents["Execute_Reviewer"].iteration,
+        "calls": llm.stats()["calls"],
+        "calls_by_kind": {k: v for k, v in llm.stats().items() if k not in ("calls", "prompt_chars", "completion_chars")},
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+    }
+
+
+async def main():
+    """
+    多候选生成与逐轮修改的墙钟时间对比：
+        python -m benchmarks.candidate_sampling --candidates 1 3 --seeds 0 1 2
+    """
+    parser = argparse.ArgumentParser(description="多候选生成基准测试（模拟服务）")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟服务每次调用的固定延迟（秒）")
+    parser.add_argument("--documents", default="Resource", help="村庄资料目录")
+    parser.add_argument("--output", default=os.path.join("Results", "benchmark_candidates.json"))
+    args = parser.parse_args()
+
+    rows = []
+    for candidates in args.candidates:
+        for seed in args.seeds:
+            rows.append(await run_once(candidates, seed, args.latency, args.documents))
+
+    print(f"{'候选数':>6} {'平均耗时(秒)':>12} {'平均审核轮数':>12} {'平均调用次数':>12} {'平均输出token':>14}")
+    summary = []
+    for candidates in args.candidates:
+        group = [row for row in rows if row["candidates"] == candidates]
+        mean = {key: sum(row[key] for row in group) / len(group)
+                for key in ("wall_time", "review_iterations", "calls", "completion_tokens")}
+        summary.append({"candidates": candidates, **mean})
+        print(f"{candidates:>6} {mean['wall_time']:>12.2f} {mean['review_iterations']:>12.1f} "
+              f"{mean['calls']:>12.1f} {mean['completion_tokens']:>14.0f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"summary": summary, "runs": rows}, file, ensure_ascii=False, indent=2)
+    print(f"基准结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
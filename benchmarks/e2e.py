@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.mock_llm import MockLLM, start_mock_server
+
+
+# 一个测试用例由这几个参数确定，结果文件之间按它们对应
+CASE_KEYS = ("corpus_scale", "sections", "concurrency", "iterations")
+
+# 对比时检查的指标，增幅超过容差即视为回归
+COMPARED_METRICS = ("wall_time", "calls", "prompt_tokens", "completion_tokens", "peak_rss_bytes", "max_lag")
+
+
+def scale_corpus(source_dir: str, target_dir: str, scale: float) -> int:
+    """
+    把村庄资料按 scale 倍写入 target_dir：整数部分整份重复，小数部分截取每个文件的前一段。
+
+    :param source_dir: 村庄资料目录
+    :param target_dir: 输出目录
+    :param scale: 倍数
+    :return: 输出的总字数
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    total = 0
+    for filename in sorted(os.listdir(source_dir)):
+        if not filename.endswith(".md"):
+            continue
+        with open(os.path.join(source_dir, filename), "r", encoding="utf-8") as file:
+            content = file.read()
+        whole, fraction = int(scale), scale - int(scale)
+        text = "\n\n".join([content] * whole)
+        if fraction:
+            text = (text + "\n\n" if text else "") + content[:int(len(content) * fraction)]
+        with open(os.path.join(target_dir, filename), "w", encoding="utf-8") as file:
+            file.write(text)
+        total += len(text)
+    return total
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """当前进程的常驻内存峰值（字节），平台不支持时返回 None。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def run_case(case: Dict[str, Any], documents_path: str, export_formats: List[str],
+                   lag_threshold: float) -> Dict[str, Any]:
+    """
+    在当前进程中完整运行一次工作流（规划、审核循环、综合报告和导出），模拟服务的地址取自 XAI_API_BASE。
+    检查点、方案版本历史和大文本存储都写在临时目录中，审核和润色缓存关闭，每次运行都从头请求。
+
+    :param case: 测试用例，见 CASE_KEYS
+    :param documents_path: 村庄资料目录
+    :param export_formats: 综合报告的导出格式
+    :param lag_threshold: 记录为事件循环阻塞的最小时长（秒）
+    :return: 墙钟时间、审核轮数、token 用量、内存峰值和事件循环阻塞情况
+    """
+    from Call_Model import usage_stats
+    from ChiefEditor import ChiefEditor
+    from Executor import Executor
+    from Execute_Reviewer import Execute_Reviewer
+    from Reportor import Reportor
+    from memory.blob_store import BlobStore, set_blob_store
+    from memory.draft import rural_DraftState
+    from profiling import LoopLagMonitor
+
+    sections = list(Executor().planning_tasks)[:case["sections"]]
+    concurrency = case["concurrency"]
+
+    class _BenchmarkEditor(ChiefEditor):
+        """按测试用例创建子代理，并关闭审核和润色缓存。"""
+
+        def initialize_agents(self):
+            self.agents = {
+                "Executor": Executor(concurrency_limit=concurrency, sections=sections),
+                "Execute_Reviewer": Execute_Reviewer(concurrency_limit=concurrency, cache_path=None),
+                "Reportor": Reportor(concurrency_limit=concurrency, cache_path=None),
+            }
+            return self.agents
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        corpus_chars = scale_corpus(documents_path, corpus_dir, case["corpus_scale"])
+        set_blob_store(BlobStore(os.path.join(work_dir, "blobs.sqlite")))
+        draft = rural_DraftState(village_name="金田村", documents_path=corpus_dir, model="mock")
+        editor = _BenchmarkEditor(draft, output_dir=os.path.join(work_dir, "Results"),
+                                  checkpoint_path=os.path.join(work_dir, "checkpoints.sqlite"),
+                                  history_path=os.path.join(work_dir, "draft_history.sqlite"),
+                                  export_formats=tuple(export_formats))
+        monitor = LoopLagMonitor(lag_threshold)
+        monitor.start()
+        start = time.perf_counter()
+        try:
+            await editor.run()
+        finally:
+            wall_time = time.perf_counter() - start
+            monitor.stop()
+            set_blob_store(None)
+
+    usage = usage_stats[""]
+    return {
+        "wall_time": wall_time,
+        "corpus_chars": corpus_chars,
+        "review_iterations": editor.agents["Execute_Reviewer"].iteration,
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "peak_rss_bytes": peak_rss_bytes(),
+        "max_lag": monitor.max_lag,
+        "lag_events": len(monitor.events),
+        "lag_total": sum(event["duration"] for event in monitor.events),
+    }
+
+
+def run_case_subprocess(case: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    在独立的子进程中运行一个测试用例，模拟服务运行在本进程中。
+    每个用例的内存峰值和全局统计互不影响，模拟服务也不占用被测事件循环所在的进程。
+
+    :param case: 测试用例，见 CASE_KEYS
+    :param args: 命令行参数
+    :return: 运行结果，包括模拟服务统计的各类调用次数
+    """
+    # 每个方向前 iterations - 1 次审核不通过，审核轮数即为 iterations
+    llm = MockLLM(base_latency=args.latency, chars_per_second=args.chars_per_second,
+                  plan_length=args.plan_length, fail_reviews=case["iterations"] - 1)
+    server, url = start_mock_server(llm)
+    env = {**os.environ, "XAI_API_BASE": url, "XAI_API_KEY": "mock"}
+    with tempfile.TemporaryDirectory() as result_dir:
+        result_path = os.path.join(result_dir, "result.json")
+        command = [sys.executable, "-m", "benchmarks.e2e", "--run-case", json.dumps(case),
+                   "--result", result_path, "--documents", args.documents,
+                   "--formats", *args.formats, "--lag-threshold", str(args.lag_threshold)]
+        try:
+            completed = subprocess.run(command, env=env, stdout=None if args.verbose else subprocess.DEVNULL,
+                                       stderr=subprocess.PIPE, text=True, encoding="utf-8")
+        finally:
+            server.shutdown()
+        if completed.returncode != 0:
+            raise RuntimeError(f"用例 {case} 运行失败：\n{completed.stderr}")
+        with open(result_path, "r", encoding="utf-8") as file:
+            result = json.load(file)
+    stats = llm.stats()
+    result["calls"] = stats["calls"]
+    result["calls_by_kind"] = {k: v for k, v in stats.items() if k not in ("calls", "prompt_chars", "completion_chars")}
+    return {**case, **result}
+
+
+def summarize(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    按测试用例汇总多次重复：墙钟时间和事件循环阻塞取中位数，内存峰值取最大值，调用次数和 token 取平均。
+
+    :param runs: 每次运行的结果
+    :return: 每个用例一条汇总
+    """
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for run in runs:
+        groups.setdefault(tuple(run[key] for key in CASE_KEYS), []).append(run)
+    summary = []
+    for key, group in groups.items():
+        rss = [run["peak_rss_bytes"] for run in group if run["peak_rss_bytes"] is not None]
+        summary.append({
+            **dict(zip(CASE_KEYS, key)),
+            "repeats": len(group),
+            "wall_time": statistics.median(run["wall_time"] for run in group),
+            "wall_time_min": min(run["wall_time"] for run in group),
+            "review_iterations": statistics.mean(run["review_iterations"] for run in group),
+            "calls": statistics.mean(run["calls"] for run in group),
+            "prompt_tokens": statistics.mean(run["prompt_tokens"] for run in group),
+            "completion_tokens": statistics.mean(run["completion_tokens"] for run in group),
+            "peak_rss_bytes": max(rss) if rss else None,
+            "max_lag": statistics.median(run["max_lag"] for run in group),
+            "lag_events": statistics.mean(run["lag_events"] for run in group),
+        })
+    return summary
+
+
+def environment() -> Dict[str, Any]:
+    """结果文件中记录的运行环境：提交、是否有未提交的修改、Python 版本和平台。"""
+    def git(*command: str) -> str:
+        try:
+            return subprocess.run(["git", *command], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    与基线结果逐个用例对比，指标变化超过容差的记为回归。
+
+    :param baseline: 基线结果文件的内容
+    :param current: 本次结果文件的内容
+    :param tolerance: 容差（相对变化）
+    :return: 回归列表
+    """
+    previous = {tuple(row[key] for key in CASE_KEYS): row for row in baseline["summary"]}
+    regressions = []
+    print(f"\n与基线 {baseline['environment']['commit'][:10] or '未知提交'} 对比（容差 {tolerance:.0%}）：")
+    for row in current["summary"]:
+        key = tuple(row[k] for k in CASE_KEYS)
+        old = previous.get(key)
+        if old is None:
+            print(f"  {dict(zip(CASE_KEYS, key))}：基线中没有该用例")
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), row.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = ""
+            if change > tolerance:
+                flag = "（回归）"
+                regressions.append({**dict(zip(CASE_KEYS, key)), "metric": metric,
+                                    "before": before, "after": after, "change": change})
+            changes.append(f"{metric} {change:+.1%}{flag}")
+        print(f"  {dict(zip(CASE_KEYS, key))}：{'，'.join(changes)}")
+    print(f"共 {len(regressions)} 项回归\n")
+    return regressions
+
+
+def main() -> int:
+    """
+    端到端基准测试：在本地模拟服务上完整运行工作流，按资料规模、方向数、并发数和审核轮数的组合逐一测量
+    墙钟时间、大模型调用次数、token 用量、内存峰值和事件循环阻塞，结果连同提交信息保存为 JSON，
+    可用 --compare 与其他提交的结果对比：
+        python -m benchmarks.e2e --corpus-scale 1 4 --sections 5 10 --iterations 1 3
+        python -m benchmarks.e2e --compare Results/benchmarks/e2e-<基线提交>.json
+    """
+    parser = argparse.ArgumentParser(description="端到端基准测试（模拟服务）")
+    parser.add_argument("--corpus-scale", type=float, nargs="+", default=[1, 4], help="村庄资料的倍数")
+    parser.add_argument("--sections", type=int, nargs="+", default=[5, 10], help="规划方向数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10], help="各子代理的最大并发数")
+    parser.add_argument("--iterations", type=int, nargs="+", default=[1, 3], help="规划-审核轮数")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例重复次数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务每次调用的固定延迟（秒）")
+    parser.add_argument("--chars-per-second", type=float, default=20000, help="模拟服务的输出速度（字/秒）")
+    parser.add_argument("--plan-length", type=int, default=1500, help="模拟方案的长度（字）")
+    parser.add_argument("--formats", nargs="+", default=["markdown", "docx", "pdf", "html"], help="导出格式")
+    parser.add_argument("--lag-threshold", type=float, default=0.05, help="记录为事件循环阻塞的最小时长（秒）")
+    parser.add_argument("--documents", default="Resource", help="村庄资料目录")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 Results/benchmarks/e2e-<提交>.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="与该结果文件对比，有回归时返回非零退出码")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="对比时的容差（相对变化）")
+    parser.add_argument("--verbose", action="store_true", help="显示工作流的输出")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        # 子进程：运行单个用例并保存结果
+        result = asyncio.run(run_case(json.loads(args.run_case), args.documents, args.formats, args.lag_threshold))
+        with open(args.result, "w", encoding="utf-8") as file:
+            json.dump(result, file)
+        return 0
+
+    cases = [dict(zip(CASE_KEYS, values)) for values in
+             itertools.product(args.corpus_scale, args.sections, args.concurrency, args.iterations)]
+    print(f"共 {len(cases)} 个用例，每个重复 {args.repeat} 次\n")
+    print(f"{'资料倍数':>8} {'方向数':>6} {'并发':>4} {'轮数':>4} {'耗时(秒)':>9} {'调用':>5} "
+          f"{'输入token':>10} {'输出token':>10} {'内存峰值(MB)':>12} {'最长阻塞(ms)':>12}")
+    runs = []
+    for case in cases:
+        for _ in range(args.repeat):
+            run = run_case_subprocess(case, args)
+            runs.append(run)
+            rss = f"{run['peak_rss_bytes'] / 2 ** 20:.0f}" if run["peak_rss_bytes"] is not None else "-"
+            print(f"{case['corpus_scale']:>8g} {case['sections']:>6} {case['concurrency']:>4} "
+                  f"{run['review_iterations']:>4} {run['wall_time']:>9.2f} {run['calls']:>5} "
+                  f"{run['prompt_tokens']:>10} {run['completion_tokens']:>10} {rss:>12} {run['max_lag'] * 1000:>12.0f}")
+
+    env = environment()
+    result = {
+        "environment": env,
+        "mock": {"latency": args.latency, "chars_per_second": args.chars_per_second,
+                 "plan_length": args.plan_length, "formats": args.formats},
+        "summary": summarize(runs),
+        "runs": runs,
+    }
+    output = args.output or os.path.join("Results", "benchmarks", f"e2e-{env['commit'][:10] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    print(f"\n基准结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(baseline, result, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+_REVIEWED_PLAN = re.compile(r"发展方案：(.*?)【村庄基本信息】", re.S)
+_REVIEWED_SECTION = re.compile(r"请审查.*?村的(.+?)发展方案：")
+_NUMERIC_BULLET = re.compile(r"^- .*\d", re.M)
+_BULLET = re.compile(r"^- ", re.M)
+_CHINESE_DIGITS = "零一二三四五六七八九"
+
+
+class MockLLM:
+    """
+    本地模拟的大模型，按提示词类型返回结构正确的输出，用于基准测试，不产生任何费用。
+
+    - 规划：随机生成质量不一的方案，质量 q 决定含数字和来源的分点比例；
+    - 审核：按方案中含数字分点的比例判定，达到 pass_threshold 即通过，与本地打分信号相关；
+      指定 fail_reviews 时改为按固定日程判定，每个方向前 fail_reviews 次审核不通过，便于控制审核轮数；
+    - 核心定位、润色、提纲、扩写：返回固定格式的内容。
+
+    延迟为 base_latency 加上按 chars_per_second 计算的输出时间。
+    """
+
+    def __init__(self, base_latency: float = 0.2, chars_per_second: float = 4000, pass_threshold: float = 0.7,
+                 plan_length: int = 1500, seed: int = 0, fail_reviews: Optional[int] = None):
+        """
+        :param base_latency: 每次调用的固定延迟（秒）
+        :param chars_per_second: 输出速度（字/秒）
+        :param pass_threshold: 审核通过所需的含数字分点比例
+        :param plan_length: 规划正文的大致长度（字）
+        :param seed: 随机种子
+        :param fail_reviews: 每个方向前几次审核判为不通过，为 None 时按方案质量判定
+        """
+        self.base_latency = base_latency
+        self.chars_per_second = chars_per_second
+        self.pass_threshold = pass_threshold
+        self.plan_length = plan_length
+        self.fail_reviews = fail_reviews
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls: Counter = Counter()  # 按提示词类型统计的调用次数
+        self.reviews: Counter = Counter()  # 各方向已审核的次数
+        self.prompt_chars = 0
+        self.completion_chars = 0
+
+    def classify(self, prompt: str) -> str:
+        """按提示词内容判断调用类型。"""
+        if "请审查" in prompt:
+            return "review"
+        if "提炼出" in prompt:
+            return "positioning"
+        if "排版美化" in prompt:
+            return "polish"
+        if "只输出该方案的提纲" in prompt:
+            return "outline"
+        return "plan"
+
+    def complete(self, messages: List[Dict[str, str]]) -> Tuple[str, str]:
+        """
+        生成一次回复。
+
+        :param messages: 请求消息
+        :return: (回复内容, 调用类型)
+        """
+        prompt = messages[0]["content"]
+        kind = self.classify(prompt)
+        if kind == "review":
+            text = self._review(prompt)
+        elif kind == "positioning":
+            text = "以生态茶园为基础、茶旅融合为特色的乡村振兴示范村。"
+        elif kind == "polish":
+            text = prompt.split("排版美化：", 1)[1].split("【核心定位】", 1)[0].strip()
+        elif kind == "outline":
+            text = "1. 发展现状\n2. 发展目标\n3. 重点任务\n4. 保障措施"
+        else:
+            text = self._plan()
+        with self.lock:
+            self.calls[kind] += 1
+            self.prompt_chars += sum(len(m["content"]) for m in messages)
+            self.completion_chars += len(text)
+        return text, kind
+
+    def latency(self, text: str) -> float:
+        """本次回复的模拟延迟（秒）。"""
+        return self.base_latency + len(text) / self.chars_per_second
+
+    def _plan(self) -> str:
+        with self.lock:
+            # 按日程判定审核时方案总是完整的，不会被本地格式检查额外退回
+            quality = self.rng.random() if self.fail_reviews is None else 1.0
+        bullets = 12
+        numeric = round(quality * bullets)
+        lines = ["## 发展现状与目标"]
+        for i in range(bullets):
+            if i < numeric:
+                # 各分点的取值只与序号有关，不同方向之间不会产生数值冲突
+                lines.append(f"- 第{_CHINESE_DIGITS[i % 10]}项重点指标达到 {100 * (i + 1)} 万元（来源：现状调研报告）")
+            else:
+                lines.append("- 持续推进相关工作，完善配套机制，逐步提升发展水平")
+        lines.append("## 实施路径")
+        filler = "围绕资源禀赋和产业基础，分阶段推进各项任务，强化组织保障和资金支持。"
+        body = "\n".join(lines) + "\n"
+        while len(body) < self.plan_length:
+            body += filler
+        return body
+
+    def _review(self, prompt: str) -> str:
+        match = _REVIEWED_PLAN.search(prompt)
+        plan = match.group(1) if match else ""
+        bullets = len(_BULLET.findall(plan)) or 1
+        ratio = len(_NUMERIC_BULLET.findall(plan)) / bullets
+        if self.fail_reviews is None:
+            passed = ratio >= self.pass_threshold
+        else:
+            section = _REVIEWED_SECTION.search(prompt)
+            with self.lock:
+                key = section.group(1) if section else ""
+                passed = self.reviews[key] >= self.fail_reviews
+                self.reviews[key] += 1
+        if passed:
+            verdict = {"verdict": "pass", "score": int(60 + 40 * ratio), "confidence": 0.9, "issues": []}
+        else:
+            verdict = {
+                "verdict": "fail",
+                "score": int(60 * ratio),
+                "confidence": 0.9,
+                "issues": [{"severity": "high", "location": "发展现状与目标", "problem": "多数分点缺少数字支撑",
+                            "suggestion": "为每个分点补充真实数字及来源"}],
+            }
+        return json.dumps(verdict, ensure_ascii=False)
+
+    def stats(self) -> Dict[str, int]:
+        """调用次数与输入输出字数。"""
+        return {"calls": sum(self.calls.values()), **dict(self.calls),
+                "prompt_chars": self.prompt_chars, "completion_chars": self.completion_chars}
+
+
+def _handler(llm: MockLLM):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            text, _ = llm.complete(request["messages"])
+            time.sleep(llm.latency(text))
+            prompt_tokens = sum(len(m["content"]) for m in request["messages"])
+            body = json.dumps({
+                "id": f"mock-{time.time_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text),
+                          "total_tokens": prompt_tokens + len(text)},
+            }, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_server(llm: MockLLM, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动兼容 OpenAI Chat Completions 接口的模拟服务。
+    把 XAI_API_BASE 设为返回的地址即可让 call_model 请求它。
+
+    :param llm: 模拟的大模型
+    :param host: 监听地址
+    :param port: 端口，0 表示随机分配
+    :return: (服务对象, 接口地址)
+    """
+    server = ThreadingHTTPServer((host, port), _handler(llm))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    """
+    命令行入口：启动模拟服务供手动运行工作流。
+        python -m benchmarks.mock_llm --port 8000
+    """
+    parser = argparse.ArgumentParser(description="本地模拟大模型服务")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="每次调用的固定延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, url = start_mock_server(MockLLM(base_latency=args.latency, seed=args.seed), port=args.port)
+    print(f"模拟服务已启动：{url}（设置 XAI_API_BASE={url}）")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from pdf_renderer import render_markdown_pdf_async
+from process_pool import process_pool_user_async
+
+
+async def main():
+    """
+    PDF 排版基准测试：在工作进程中反复排版同一份报告，统计每秒页数。
+    第一次包含字体加载，之后的运行复用工作进程中已加载的字体。
+        python -m benchmarks.pdf_render Results/金田村乡村振兴规划报告.md --runs 5
+    """
+    parser = argparse.ArgumentParser(description="PDF 排版基准测试")
+    parser.add_argument("report", nargs="?", default=os.path.join("Results", "金田村乡村振兴规划报告.md"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="结果 JSON 保存路径")
+    args = parser.parse_args()
+
+    with open(args.report, "r", encoding="utf-8") as file:
+        text = file.read()
+
+    runs = []
+    async with process_pool_user_async():
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(args.runs):
+                path = os.path.join(directory, f"report{i}.pdf")
+                start = time.perf_counter()
+                pages = await render_markdown_pdf_async(text, path, "基准测试")
+                elapsed = time.perf_counter() - start
+                runs.append({"pages": pages, "seconds": elapsed, "pages_per_second": pages / elapsed,
+                             "bytes": os.path.getsize(path)})
+                print(f"第 {i + 1} 次：{pages} 页，{elapsed:.2f} 秒，{pages / elapsed:.1f} 页/秒")
+
+    warm = runs[1:] or runs
+    result = {
+        "report": args.report,
+        "report_bytes": len(text.encode("utf-8")),
+        "first_run_pages_per_second": runs[0]["pages_per_second"],
+        "warm_pages_per_second": sum(r["pages"] for r in warm) / sum(r["seconds"] for r in warm),
+        "runs": runs,
+    }
+    print(f"首次 {result['first_run_pages_per_second']:.1f} 页/秒，字体已加载后 {result['warm_pages_per_second']:.1f} 页/秒")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from ChiefEditor import read_markdown_files
+from memory.blob_store import BlobStore, set_blob_store, store_text
+from review_cascade import read_plan_markdown
+
+
+def _simulate(document: Dict[str, str], plans: Dict[str, str], iterations: int, handles: bool) -> Dict[str, Any]:
+    """
+    模拟一次运行中工作状态在各节点之间的传递：每轮 Executor 修改仍未通过的方向，Execute_Reviewer 写入审核结果，
+    每次节点切换都像检查点那样序列化并保存一次工作状态。
+
+    :param document: 村庄资料
+    :param plans: 各方向方案
+    :param iterations: 规划-审核轮数
+    :param handles: 大文本是否换成句柄
+    :return: 每次切换的平均序列化大小和耗时、检查点总大小、内存峰值
+    """
+    serializer = JsonPlusSerializer()
+    store = BlobStore(":memory:")
+    set_blob_store(store)
+    keep = (lambda value: store_text(value)) if handles else (lambda value: value)
+
+    tracemalloc.start()
+    draft = {"village_name": "金田村", "model": "mock", "document": keep(dict(document)),
+             "development_plan": {}, "review": {}, "passed": "审核不通过"}
+    checkpoints, dump_seconds, load_seconds = [], 0.0, 0.0
+    sections = list(plans)
+    for iteration in range(iterations):
+        # 每轮约一半未通过的方向需要修改，最后一轮全部通过
+        failing = sections if iteration == 0 else sections[:len(sections) // (2 ** iteration)]
+        for task in failing:
+            draft["development_plan"][task] = keep(f"{plans[task]}\n\n（第 {iteration + 1} 轮修改）")
+        for node in ("Executor", "Execute_Reviewer"):
+            if node == "Execute_Reviewer":
+                for task in sections:
+                    passed = task not in failing or iteration == iterations - 1
+                    draft["review"][task] = {"verdict": "pass" if passed else "fail", "score": 90 if passed else 60,
+                                             "confidence": 0.8, "issues": [] if passed else [
+                                                 {"severity": "high", "location": task, "problem": "缺少数据来源",
+                                                  "suggestion": "补充调研数据"}]}
+            start = time.perf_counter()
+            data = serializer.dumps_typed(draft)
+            dump_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            serializer.loads_typed(data)
+            load_seconds += time.perf_counter() - start
+            checkpoints.append(data[1])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    transitions = len(checkpoints)
+    result = {
+        "mode": "handles" if handles else "inline",
+        "transitions": transitions,
+        "bytes_per_transition": sum(len(c) for c in checkpoints) / transitions,
+        "dump_ms_per_transition": dump_seconds / transitions * 1000,
+        "load_ms_per_transition": load_seconds / transitions * 1000,
+        "checkpoint_bytes": sum(len(c) for c in checkpoints),
+        "blob_store": store.stats(),
+        "peak_memory_bytes": peak,
+    }
+    set_blob_store(None)
+    return result
+
+
+def main():
+    """
+    工作状态大小基准测试：对比大文本内联保存与只保存句柄时，每次节点切换的序列化大小、耗时和内存峰值。
+    序列化使用 LangGraph 检查点的 JsonPlusSerializer。
+        python -m benchmarks.state_size --iterations 4
+    """
+    parser = argparse.ArgumentParser(description="工作状态大小基准测试")
+    parser.add_argument("--documents", default="Resource", help="村庄资料目录")
+    parser.add_argument("--plan", default=os.path.join("Results", "金田村乡村振兴规划报告.md"), help="规划报告")
+    parser.add_argument("--iterations", type=int, default=4, help="规划-审核轮数")
+    parser.add_argument("--output", help="结果 JSON 保存路径")
+    args = parser.parse_args()
+
+    document = read_markdown_files(args.documents)
+    plans = read_plan_markdown(args.plan)
+    results = [_simulate(document, plans, args.iterations, handles) for handles in (False, True)]
+    for r in results:
+        print(f"{r['mode']:>8}：每次切换 {r['bytes_per_transition'] / 1024:.1f} KB，"
+              f"序列化 {r['dump_ms_per_transition']:.2f} ms，反序列化 {r['load_ms_per_transition']:.2f} ms，"
+              f"{r['transitions']} 次切换共 {r['checkpoint_bytes'] / 1024:.0f} KB，"
+              f"大文本存储 {r['blob_store']['stored_bytes'] / 1024:.0f} KB，内存峰值 {r['peak_memory_bytes'] / 1024:.0f} KB")
+    inline, handles = results
+    print(f"每次切换的序列化大小降为 {handles['bytes_per_transition'] / inline['bytes_per_transition']:.1%}，"
+          f"耗时降为 {handles['dump_ms_per_transition'] / inline['dump_ms_per_transition']:.1%}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
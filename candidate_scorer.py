@@ -0,0 +1,57 @@
+from typing import Any, Dict, List, Tuple
+
+from review_linter import lint_section, evidence_counts
+from consistency_checker import find_conflicts
+
+
+def score_candidate(task: str, text: Any, plans: Dict[str, Any],
+                    min_length: int = 800, max_length: int = 12000) -> Dict[str, Any]:
+    """
+    用本地的廉价信号给单个候选稿打分，不调用大模型。
+
+    - 本地格式检查（review_linter）每个不合格项扣 30 分；
+    - 与其他方向的冲突（consistency_checker）每个扣 15 分；
+    - 长度不在 [min_length, max_length] 内扣 20 分；
+    - 每千字的数字个数和来源标注个数加分，分别最多加 20 分和 10 分。
+
+    :param task: 方向名称
+    :param text: 候选稿
+    :param plans: 各方向当前的方案，用于检查冲突
+    :param min_length: 正文最短长度
+    :param max_length: 正文最长长度
+    :return: {"score": 得分, "lint_issues", "conflicts", "length", "numbers", "sources"}
+    """
+    lint_issues = lint_section(text)
+    if not isinstance(text, str):
+        return {"score": -100, "lint_issues": len(lint_issues), "conflicts": 0, "length": 0, "numbers": 0, "sources": 0}
+
+    others = {key: plan for key, plan in plans.items() if key != task}
+    conflicts = [c for c in find_conflicts({**others, task: text}) if task in c["sections"]]
+    counts = evidence_counts(text)
+    kilo_chars = max(len(text), 1) / 1000
+
+    score = 100 - 30 * len(lint_issues) - 15 * len(conflicts)
+    if not min_length <= len(text) <= max_length:
+        score -= 20
+    score += min(counts["numbers"] / kilo_chars, 20) + min(counts["sources"] / kilo_chars * 2, 10)
+    return {
+        "score": round(score, 1),
+        "lint_issues": len(lint_issues),
+        "conflicts": len(conflicts),
+        "length": len(text),
+        **counts,
+    }
+
+
+def pick_best(task: str, candidates: List[Any], plans: Dict[str, Any]) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    从多个候选稿中选出本地得分最高的一份，得分相同时取先返回的。
+
+    :param task: 方向名称
+    :param candidates: 候选稿列表
+    :param plans: 各方向当前的方案
+    :return: (最佳候选稿的下标, 各候选稿的得分)
+    """
+    scores = [score_candidate(task, text, plans) for text in candidates]
+    best = max(range(len(candidates)), key=lambda i: (scores[i]["score"], -i))
+    return best, scores
@@ -0,0 +1,261 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# 单位换算：单位 -> (量纲, 换算到基准单位的倍数)
+UNITS = {
+    "平方公里": ("面积/亩", 1500), "万亩": ("面积/亩", 10000), "亩": ("面积/亩", 1), "公顷": ("面积/亩", 15),
+    "亿元": ("金额/万元", 10000), "万元": ("金额/万元", 1), "元": ("金额/万元", 0.0001),
+    "万人次": ("人次", 10000), "人次": ("人次", 1), "万人": ("人数", 10000), "人": ("人数", 1), "户": ("户数", 1),
+    "%": ("百分比", 1),
+}
+_UNIT_PATTERN = "|".join(sorted(map(re.escape, UNITS), key=len, reverse=True))
+
+# 可比对的村级指标：指标名称 -> (原文中的写法, 量纲)。
+# 只比对描述村庄本身现状的指标，各方向引用时应当一致；成本、阶段投资、增长率等随方案和阶段变化的数字不比对
+VILLAGE_METRICS = {
+    "人口": ("户籍人口|常住人口|总人口|人口", "人数"),
+    "户数": ("总户数|户数", "户数"),
+    "村域面积": ("村域面积|辖区面积|总面积", "面积/亩"),
+    "耕地面积": ("耕地面积", "面积/亩"),
+    "山林面积": ("山林面积|林地面积", "面积/亩"),
+    "森林覆盖率": ("森林覆盖率", "百分比"),
+    "人均收入": ("人均可支配收入|人均纯收入|人均年收入|人均收入", "金额/万元"),
+    "村集体收入": ("村集体经济收入|村集体年收入|村集体收入", "金额/万元"),
+    "游客量": ("年接待游客量|年接待游客|接待游客量|接待游客|游客接待量|年游客量|游客量", "人次"),
+}
+_METRIC_NAMES = {alias: name for name, (aliases, _) in VILLAGE_METRICS.items() for alias in aliases.split("|")}
+
+# 属于某个产业或项目的指标：指标名称 -> (原文中的写法, 量纲)。
+# 各方向只有在说同一个对象时才可比，比对键包含指标前紧挨着的对象名称，如“茶叶年产值”“加工厂总投资”；
+# 前面没有对象名称的“年产值超1000万元”“总投资50万元”可能指任何方案或阶段，不比对
+ITEM_METRICS = {
+    "产值": ("年产值|总产值|产值", "金额/万元"),
+    "总投资": ("总投资额|总投资|投资总额|总预算|预算总额", "金额/万元"),
+}
+_ITEM_METRIC_NAMES = {alias: name for name, (aliases, _) in ITEM_METRICS.items() for alias in aliases.split("|")}
+# 对象名称前常见的时间和主语写法，比对前去掉，“目前茶叶”“金田村茶叶”都归为“茶叶”
+_ITEM_PREFIX = re.compile(r"^(?:目前|当前|现阶段|现有|其中|全村|本村|该村|(?!乡村)[一-龥]{1,3}村(?!民))+")
+# 对象名称中出现这些词时，说的是目标或变化量（“实现年产值”“带动产值”），不比对
+_ITEM_TREND = re.compile(r"实现|达到|带动|提升|提高|增加|增长|新增|预计|预期|力争|争取|突破|目标|计划|规划")
+
+# 指标与数字之间允许的陈述现状的连接词
+_STATUS = r"(?:约为|约|为|共有|共|有|达|高达|超过|超|：|:)?"
+
+# 村级指标：“金田村耕地面积为1091.5亩”“全村户籍人口3200人”“村民人均收入1.2万元”“森林覆盖率超80%”。
+# 指标前只能是主语（全村、本村、某某村、村民）或句首，“带动村集体收入约1万元”“覆盖耕地面积200亩”等不算；
+# 指标与数字之间只允许陈述现状的连接词，“增长10%”“达到500万元”“稳定在85%”等目标和变化量不算
+_NUMERIC = re.compile(
+    r"(?<![一-龥A-Za-z0-9])(?P<subject>全村|本村|该村|[一-龥]{1,4}村)?(?:村民|农民|居民)?"
+    r"(?P<metric>" + "|".join(sorted(_METRIC_NAMES, key=len, reverse=True)) + r")\s*" + _STATUS + r"\s*"
+    r"(?P<value>\d+(?:,\d{3})*(?:\.\d+)?)\s*(?P<unit>" + _UNIT_PATTERN + ")"
+)
+# 产业或项目指标：“茶叶年产值约300万元”“灵芝加工厂总投资500万元”，对象名称从分句开头算起
+_ITEM_NUMERIC = re.compile(
+    r"(?<![一-龥A-Za-z0-9])(?P<item>[一-龥]{2,10}?)"
+    r"(?P<metric>" + "|".join(sorted(_ITEM_METRIC_NAMES, key=len, reverse=True)) + r")\s*" + _STATUS + r"\s*"
+    r"(?P<value>\d+(?:,\d{3})*(?:\.\d+)?)\s*(?P<unit>" + _UNIT_PATTERN + ")"
+)
+# 目标年份：“2027年建成茶叶加工厂”
+_YEAR = re.compile(
+    r"(?P<year>20\d{2})\s*年(?:前|底|内|年底)?\s*(?:全面|基本|初步)?(?:建成|完成|实现|达到|投产|启动|形成)"
+    r"(?P<event>[一-龥A-Za-z]{2,12})"
+)
+# 角色性实体：“主导产业为茶叶”“区域公用品牌：“金田红””
+_ROLE = re.compile(
+    r"(?P<role>主导产业|核心产业|核心产品|主打产品|特色产品|区域公用品牌|品牌名称)\s*(?:为|是|定为|确定为|：|:)\s*"
+    r"[“\"「《]?(?P<entity>[一-龥A-Za-z0-9]{2,12})"
+)
+# 行政区划归属：“位于梅州市”“隶属于某某镇”
+_PLACE = re.compile(
+    r"(?P<relation>位于|地处|隶属于|隶属|属于)\s*(?P<place>[一-龥]{2,10}?(?:省|市|县|区|镇|乡))"
+)
+
+# 数值相差在该比例以内视为一致
+RELATIVE_TOLERANCE = 0.05
+
+
+def _excerpt(text: str, start: int, end: int, width: int = 40) -> str:
+    """截取命中位置所在行的上下文。"""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line_end = len(text) if line_end == -1 else line_end
+    left = max(line_start, start - width)
+    right = min(line_end, end + width)
+    return text[left:right].strip(" -*#>\t")
+
+
+def extract_claims(section: str, text: Any) -> List[Dict[str, Any]]:
+    """
+    从单个方向的方案中抽取可比对的断言：村级指标（见 VILLAGE_METRICS）、产业或项目指标（见 ITEM_METRICS）、
+    目标年份、角色性实体（主导产业、品牌等）和行政区划归属。
+
+    :param section: 方向名称
+    :param text: 方案文本，非文本（如出错信息）时返回空列表
+    :return: 断言列表，每项包含 key（比对键）、value（归一化后的值）、display（原文写法）、section、excerpt
+    """
+    if not isinstance(text, str):
+        return []
+
+    claims = []
+    for match in _NUMERIC.finditer(text):
+        metric = _METRIC_NAMES[match.group("metric")]
+        dimension, factor = UNITS[match.group("unit")]
+        if dimension != VILLAGE_METRICS[metric][1]:
+            continue
+        value = float(match.group("value").replace(",", "")) * factor
+        claims.append({
+            "key": f"{metric}（{dimension}）",
+            "value": value,
+            "display": f"{match.group('value')}{match.group('unit')}",
+            "section": section,
+            "excerpt": _excerpt(text, match.start(), match.end()),
+        })
+    for match in _ITEM_NUMERIC.finditer(text):
+        item = _item_name(match.group("item"))
+        metric = _ITEM_METRIC_NAMES[match.group("metric")]
+        dimension, factor = UNITS[match.group("unit")]
+        if item is None or dimension != ITEM_METRICS[metric][1]:
+            continue
+        claims.append({
+            "key": f"{item}{metric}（{dimension}）",
+            "value": float(match.group("value").replace(",", "")) * factor,
+            "display": f"{match.group('value')}{match.group('unit')}",
+            "section": section,
+            "excerpt": _excerpt(text, match.start(), match.end()),
+        })
+    for match in _YEAR.finditer(text):
+        claims.append({
+            "key": f"{match.group('event')}（目标年份）",
+            "value": int(match.group("year")),
+            "display": f"{match.group('year')}年",
+            "section": section,
+            "excerpt": _excerpt(text, match.start(), match.end()),
+        })
+    for match in _ROLE.finditer(text):
+        claims.append({
+            "key": match.group("role"),
+            "value": match.group("entity"),
+            "display": match.group("entity"),
+            "section": section,
+            "excerpt": _excerpt(text, match.start(), match.end()),
+        })
+    for match in _PLACE.finditer(text):
+        place = match.group("place")
+        claims.append({
+            "key": f"所属{place[-1]}",
+            "value": place,
+            "display": place,
+            "section": section,
+            "excerpt": _excerpt(text, match.start(), match.end()),
+        })
+    return claims
+
+
+def _item_name(item: str) -> Optional[str]:
+    """
+    规范化产业或项目指标的对象名称：去掉时间和主语前缀以及结尾的“产业”“项目”等。
+
+    :param item: 指标前的原文
+    :return: 对象名称，全村合计时为“全村”；说的是目标或变化量、或去掉前缀后不足两个字时返回 None
+    """
+    if _ITEM_TREND.search(item):
+        return None
+    name = re.sub(r"(?:产业|项目|的)$", "", _ITEM_PREFIX.sub("", item))
+    if not name and item.endswith("村"):
+        return "全村"
+    return name if len(name) >= 2 else None
+
+
+def build_claim_table(plans: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    汇总所有方向的断言，按比对键分组。
+
+    :param plans: 各方向的发展方案，即 draft["development_plan"]
+    :return: 比对键 -> 断言列表
+    """
+    table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for section, text in plans.items():
+        for claim in extract_claims(section, text):
+            table[claim["key"]].append(claim)
+    return table
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= RELATIVE_TOLERANCE * max(abs(a), abs(b))
+    return a == b
+
+
+def find_conflicts(plans: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    找出不同方向对同一指标或实体给出不同取值的冲突。
+
+    每个比对键内先把取值归并成若干组（数值在 RELATIVE_TOLERANCE 以内视为同一组），
+    只有至少两个方向落在不同组时才算冲突；同一方向内的不同取值（如现状与目标）不算冲突。
+    每个断言只与各组代表值比较，总耗时与方向数、断言数成线性关系。
+
+    :param plans: 各方向的发展方案
+    :return: 冲突列表，每项包含 key、groups（取值 -> 断言列表）和涉及的 sections
+    """
+    conflicts = []
+    for key, claims in build_claim_table(plans).items():
+        if len({claim["section"] for claim in claims}) < 2:
+            continue
+        groups: List[Tuple[Any, List[Dict[str, Any]]]] = []
+        for claim in claims:
+            for value, members in groups:
+                if _same_value(value, claim["value"]):
+                    members.append(claim)
+                    break
+            else:
+                groups.append((claim["value"], [claim]))
+        if len(groups) < 2:
+            continue
+
+        # 同一方向的全部取值都落在同一组以外的其他组时才是跨方向冲突
+        sections_by_group = [{claim["section"] for claim in members} for _, members in groups]
+        cross = any(
+            sections_by_group[i] - sections_by_group[j] and sections_by_group[j] - sections_by_group[i]
+            for i in range(len(groups)) for j in range(i + 1, len(groups))
+        )
+        if not cross:
+            continue
+        conflicts.append({
+            "key": key,
+            "groups": {members[0]["display"]: members for _, members in groups},
+            "sections": sorted({claim["section"] for claim in claims}),
+        })
+    return conflicts
+
+
+def conflicts_by_section(conflicts: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    按方向整理冲突，便于审核每个方向时只带上与它有关的冲突。
+
+    :param conflicts: find_conflicts 的结果
+    :return: 方向名称 -> 冲突列表
+    """
+    result: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for conflict in conflicts:
+        for section in conflict["sections"]:
+            result[section].append(conflict)
+    return dict(result)
+
+
+def format_conflicts(conflicts: List[Dict[str, Any]], max_excerpts: int = 3) -> str:
+    """
+    把冲突整理成提示词中的摘录，只包含冲突的原文片段。
+
+    :param conflicts: 与某个方向有关的冲突
+    :param max_excerpts: 每个取值最多摘录的原文片段数
+    :return: 冲突摘录文本，没有冲突时返回空字符串
+    """
+    lines = []
+    for i, conflict in enumerate(conflicts, 1):
+        lines.append(f"{i}. {conflict['key']}：")
+        for display, members in conflict["groups"].items():
+            for claim in members[:max_excerpts]:
+                lines.append(f"   - 【{claim['section']}】{display}：……{claim['excerpt']}……")
+    return "\n".join(lines)
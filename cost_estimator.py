@@ -0,0 +1,480 @@
+import argparse
+import asyncio
+import glob
+import io
+import json
+import math
+import os
+import re
+from contextlib import redirect_stdout
+from typing import Any, Dict, List, Optional, Tuple
+
+from memory.draft import rural_DraftState
+from memory.blob_store import BlobStore, set_blob_store
+from memory.draft_history import DraftHistory
+from ChiefEditor import read_markdown_files
+from Budget_Controller import BudgetController
+from Call_Model import current_dry_run, current_section, estimate_cost, model_prices
+from Executor import Executor
+from Execute_Reviewer import Execute_Reviewer
+from Reportor import Reportor
+
+
+# 没有历史记录时使用的默认值
+DEFAULT_PASS_RATE = 0.5  # 单个方向每次审核的通过率
+DEFAULT_PLAN_TOKENS = 3000  # 单个方向一稿方案的输出 token 数
+DEFAULT_REVIEW_TOKENS = 400  # 一次审核结果的输出 token 数
+DEFAULT_TOKENS_PER_SECOND = 50.0  # 模型输出速度
+POSITIONING_TOKENS = 200  # 核心定位的输出 token 数
+
+# 某个方向的历史样本少于该数量时，改用全部方向合计的历史数据
+MIN_SAMPLES = 3
+
+# 核心定位调用不属于任何方向，用这个名称归类
+POSITIONING = "核心定位"
+
+# 汉字、全角字符和中文标点
+_CJK = re.compile(r"[\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef\u3000-\u303f]")
+
+
+class TokenCounter:
+    """
+    本地计算 token 数。安装了 tiktoken 且能加载编码时按编码计数；
+    否则按字符估算：汉字及全角标点每字计 1 个 token，其他字符每 4 个计 1 个（对中文略偏高，估算偏保守）。
+    """
+
+    def __init__(self, encoding: str = "o200k_base"):
+        """
+        :param encoding: tiktoken 编码名称
+        """
+        self.name = "按字符估算"
+        self._encoding = None
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+            self.name = f"tiktoken {encoding}"
+        except Exception:
+            # 未安装 tiktoken，或离线时无法下载编码文件
+            pass
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        cjk = len(_CJK.findall(text))
+        return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class HistoricalStats:
+    """
+    从方案版本历史（memory.draft_history）和批量运行汇总报告（Batch_Runner 保存的 batch_report_*.json）中
+    统计各方向的审核通过率、方案和审核结果的长度，以及模型的输出速度；缺少历史数据时使用默认值。
+    """
+
+    def __init__(self, counter: TokenCounter, history_path: Optional[str] = None, reports_dir: Optional[str] = None):
+        """
+        :param counter: token 计数器
+        :param history_path: 方案版本历史数据库路径，为 None 或不存在时不使用
+        :param reports_dir: 批量运行汇总报告所在目录，为 None 时不使用
+        """
+        self.counter = counter
+        self.samples: Dict[str, Dict[str, List[Any]]] = {}
+        if history_path is not None and os.path.exists(history_path):
+            history = DraftHistory(history_path)
+            try:
+                self.samples = history.section_samples()
+            finally:
+                history.close()
+
+        self.tokens_per_second = DEFAULT_TOKENS_PER_SECOND
+        self.latency_source = "默认值"
+        if reports_dir is not None:
+            calls = latency = completion = 0
+            for path in glob.glob(os.path.join(reports_dir, "batch_report_*.json")):
+                with open(path, "r", encoding="utf-8") as file:
+                    for village in json.load(file).get("per_village", []):
+                        calls += village.get("calls", 0)
+                        latency += village.get("latency", 0.0)
+                        completion += village.get("completion_tokens", 0)
+            if latency > 0 and completion > 0:
+                self.tokens_per_second = completion / latency
+                self.latency_source = f"{calls} 次历史调用"
+
+        reviews = [review for entry in self.samples.values() for review in entry["reviews"]]
+        self._pooled_pass_rate = _pass_rate(reviews) if len(reviews) >= MIN_SAMPLES else DEFAULT_PASS_RATE
+        drafts = [self.counter.count(text) for entry in self.samples.values() for text in entry["first_drafts"]]
+        self._pooled_plan_tokens = sum(drafts) / len(drafts) if drafts else DEFAULT_PLAN_TOKENS
+        # 只有经过大模型审核的结果带有 model 字段，本地格式检查退回的不算
+        verdicts = [self.counter.count(json.dumps(_verdict_fields(review), ensure_ascii=False))
+                    for review in reviews if isinstance(review, dict) and "model" in review]
+        self.review_tokens = sum(verdicts) / len(verdicts) if verdicts else DEFAULT_REVIEW_TOKENS
+
+    def pass_rate(self, section: str) -> float:
+        """某个方向每次审核的通过率。"""
+        reviews = self.samples.get(section, {}).get("reviews", [])
+        return _pass_rate(reviews) if len(reviews) >= MIN_SAMPLES else self._pooled_pass_rate
+
+    def plan_tokens(self, section: str) -> float:
+        """某个方向一稿方案的输出 token 数。"""
+        drafts = self.samples.get(section, {}).get("first_drafts", [])
+        if len(drafts) < MIN_SAMPLES:
+            return self._pooled_plan_tokens
+        return sum(self.counter.count(text) for text in drafts) / len(drafts)
+
+    def plan_text(self, section: str) -> str:
+        """试运行中代替模型输出的方案：有历史记录时用最近一次的第一版，否则生成长度相当的占位文本。"""
+        drafts = self.samples.get(section, {}).get("first_drafts", [])
+        if drafts:
+            return drafts[-1]
+        line = f"- {section}第一项重点指标达到 100 万元（来源：现状调研报告）\n"
+        return f"## {section}\n" + line * math.ceil(self._pooled_plan_tokens / self.counter.count(line))
+
+    def failed_review(self, section: str) -> Dict[str, Any]:
+        """试运行中代替模型输出的不通过审核结果，有历史记录时用最近一次的真实审核意见，使修改提示词的长度更接近实际。"""
+        for review in reversed(self.samples.get(section, {}).get("reviews", [])):
+            if isinstance(review, dict) and review.get("verdict") == "fail" and review.get("issues"):
+                return _verdict_fields(review)
+        return {"verdict": "fail", "score": 60, "confidence": 0.8, "issues": [
+            {"severity": "high", "location": section, "problem": "部分分点缺少数字支撑和数据来源",
+             "suggestion": "为每个分点补充真实数字及来源，没有数字的给出推理过程"}]}
+
+    def seconds(self, completion_tokens: float) -> float:
+        """输出这么多 token 所需的时间（秒）。"""
+        return completion_tokens / self.tokens_per_second
+
+
+def _verdict_fields(review: Dict[str, Any]) -> Dict[str, Any]:
+    """审核结果中由模型输出的字段。"""
+    return {key: review.get(key) for key in ("verdict", "score", "confidence", "issues")}
+
+
+def _pass_rate(reviews: List[Any]) -> float:
+    passed = sum(1 for review in reviews if isinstance(review, dict) and review.get("verdict") == "pass")
+    return passed / len(reviews) if reviews else DEFAULT_PASS_RATE
+
+
+class DryRun:
+    """
+    试运行记录器：设为 Call_Model.current_dry_run 后，call_model 不请求模型，而是把提示词交给 respond，
+    按调用所属的阶段和方向记录输入 token 数，并返回结构正确的模拟输出，使工作流可以继续构建后续的提示词。
+    """
+
+    def __init__(self, stats: HistoricalStats):
+        """
+        :param stats: 历史统计
+        """
+        self.stats = stats
+        self.stage = "plan"  # 当前阶段：plan（规划）、review（审核）、report（综合报告）
+        self.iteration = 1
+        self.verdict = "fail"  # 审核阶段返回的结论
+        self.calls: List[Dict[str, Any]] = []
+
+    def respond(self, request: str, model: str) -> str:
+        """
+        记录一次调用并返回模拟输出。
+
+        :param request: 提示词
+        :param model: 模型名称
+        :return: 模拟的模型输出
+        """
+        section = current_section.get()
+        if self.stage == "plan":
+            text, completion = self.stats.plan_text(section), self.stats.plan_tokens(section)
+        elif self.stage == "review":
+            verdict = {"verdict": "pass", "score": 90, "confidence": 0.9, "issues": []} \
+                if self.verdict == "pass" else self.stats.failed_review(section)
+            text, completion = json.dumps(verdict, ensure_ascii=False), self.stats.review_tokens
+        elif section:
+            text, completion = self.stats.plan_text(section), self.stats.plan_tokens(section)
+        else:
+            section = POSITIONING
+            text, completion = "以特色产业为基础、产业融合为方向的乡村振兴示范村。", POSITIONING_TOKENS
+        self.calls.append({
+            "stage": self.stage,
+            "iteration": self.iteration,
+            "section": section,
+            "model": model,
+            "prompt_tokens": self.stats.counter.count(request),
+            "completion_tokens": completion,
+        })
+        return text
+
+    def _total(self, field: Optional[str], stage: str, iteration: Optional[int]) -> Dict[str, int]:
+        """按方向合计某一阶段（某一轮）调用的某个字段，field 为 None 时计调用次数。"""
+        totals: Dict[str, int] = {}
+        for call in self.calls:
+            if call["stage"] == stage and iteration in (None, call["iteration"]):
+                totals[call["section"]] = totals.get(call["section"], 0) + (call[field] if field else 1)
+        return totals
+
+    def prompt_tokens(self, stage: str, iteration: Optional[int] = None) -> Dict[str, int]:
+        """某一阶段（某一轮）各方向的输入 token 数。"""
+        return self._total("prompt_tokens", stage, iteration)
+
+    def completion_tokens(self, stage: str, iteration: Optional[int] = None) -> Dict[str, int]:
+        """某一阶段（某一轮）各方向的输出 token 数。"""
+        return self._total("completion_tokens", stage, iteration)
+
+    def call_counts(self, stage: str, iteration: Optional[int] = None) -> Dict[str, int]:
+        """某一阶段（某一轮）各方向的调用次数；多候选稿、提纲扩写时每个方向每轮有多次规划调用。"""
+        return self._total(None, stage, iteration)
+
+
+async def build_prompts(village: Dict[str, Any], stats: HistoricalStats) -> DryRun:
+    """
+    试运行一个村庄的工作流，构建将要发送的全部提示词而不调用模型：
+    第 1 轮全部方向的规划（Executor.plan_*）和审核（Execute_Reviewer.review）、
+    审核不通过后第 2 轮的修改和复审（提示词中带有上一稿和审核意见），以及综合报告的核心定位和各方向润色（Reportor）。
+    审核缓存和润色缓存关闭；本地格式检查关闭，每次审核都按调用大模型计算。
+    村庄配置了 outline_tasks、candidates 时 Executor 按相同的生成方式构建提示词。
+
+    :param village: 村庄配置，包含 village_name、documents_path、model
+    :param stats: 历史统计
+    :return: 记录了全部调用的试运行记录器
+    """
+    draft = rural_DraftState(
+        village_name=village["village_name"],
+        documents_path=village["documents_path"],
+        model=village["model"],
+        document=read_markdown_files(village["documents_path"]),
+    )
+    executor = Executor(outline_tasks=village.get("outline_tasks"), candidates=village.get("candidates", 1))
+    reviewer = Execute_Reviewer(use_linter=False, cache_path=None)
+    reportor = Reportor(cache_path=None)
+
+    dry_run = DryRun(stats)
+    token = current_dry_run.set(dry_run)
+    try:
+        # 各代理照常打印进度，试运行时不需要
+        with redirect_stdout(io.StringIO()):
+            for iteration, verdict in ((1, "fail"), (2, "pass")):
+                dry_run.iteration = iteration
+                dry_run.stage = "plan"
+                draft = await executor.parallel_plan(draft)
+                dry_run.stage, dry_run.verdict = "review", verdict
+                draft = await reviewer.parallel_review(draft)
+            dry_run.stage = "report"
+            await reportor.generate_report(draft)
+    finally:
+        current_dry_run.reset(token)
+    return dry_run
+
+
+def round_limits(village: Dict[str, Any], iterations: int) -> Tuple[int, int]:
+    """
+    按村庄的预算配置得到工作流和单个方向最多运行的轮数，与实际运行时的 BudgetController 判断一致。
+
+    :param village: 村庄配置，可选的 budget 字段为 BudgetController 的参数
+    :param iterations: 预算不限制轮数时使用的最大轮数
+    :return: （工作流最多轮数，单个方向最多轮数）
+    """
+    budget = BudgetController(**(village.get("budget") or {}))
+    rounds = budget.round_limit() or iterations
+    return rounds, min(rounds, budget.section_round_limit() or rounds)
+
+
+def project(village: Dict[str, Any], dry_run: DryRun, stats: HistoricalStats, iterations: int) -> Dict[str, Any]:
+    """
+    按历史通过率推算规划-审核循环的用量、费用和耗时，最多轮数见 round_limits。
+
+    通过率为 p 的方向第 k 轮仍需修改的概率为 (1-p)^(k-1)，预计轮数为各轮概率之和；
+    第 1 轮用首次规划和审核的提示词，之后各轮用修改和复审的提示词。最坏情况按每个方向都用满最多轮数计算。
+    耗时按每轮各方向并行、由最慢的方向决定估算，综合报告的润色与审核重叠的部分不扣除，估算偏保守。
+
+    :param village: 村庄配置
+    :param dry_run: 试运行记录器
+    :param stats: 历史统计
+    :param iterations: 预算不限制轮数时使用的最大轮数
+    :return: 各方向和整个村庄的预计用量
+    """
+    iterations, section_iterations = round_limits(village, iterations)
+    model = village["model"]
+    plan_1, plan_2 = dry_run.prompt_tokens("plan", 1), dry_run.prompt_tokens("plan", 2)
+    review_1, review_2 = dry_run.prompt_tokens("review", 1), dry_run.prompt_tokens("review", 2)
+    polish = dry_run.prompt_tokens("report")
+    # 每轮规划的调用次数和输出量按试运行记录计算，多候选稿、提纲扩写时多于一次
+    plan_calls_1, plan_calls_2 = dry_run.call_counts("plan", 1), dry_run.call_counts("plan", 2)
+    plan_output_1, plan_output_2 = dry_run.completion_tokens("plan", 1), dry_run.completion_tokens("plan", 2)
+
+    sections = {}
+    for section in plan_1:
+        pass_rate = stats.pass_rate(section)
+        rounds = sum((1 - pass_rate) ** k for k in range(section_iterations))
+        plan_tokens = stats.plan_tokens(section)
+        polish_prompt = polish.get(section, 0)
+
+        def usage(n: float) -> Dict[str, float]:
+            prompt = (plan_1[section] + review_1[section] + (n - 1) * (plan_2[section] + review_2[section])
+                      + polish_prompt)
+            completion = (plan_output_1[section] + (n - 1) * plan_output_2[section] + n * stats.review_tokens
+                          + plan_tokens)
+            calls = plan_calls_1[section] + (n - 1) * plan_calls_2[section] + n + 1
+            return {"calls": calls, "prompt_tokens": prompt, "completion_tokens": completion,
+                    "cost": estimate_cost(model, prompt, completion)}
+
+        sections[section] = {
+            "pass_rate": pass_rate,
+            "rounds": rounds,
+            "plan_prompt_tokens": plan_1[section],
+            "revision_prompt_tokens": plan_2[section],
+            "review_prompt_tokens": review_1[section],
+            "polish_prompt_tokens": polish_prompt,
+            "plan_tokens": plan_tokens,
+            "expected": usage(rounds),
+            "worst": usage(section_iterations),
+        }
+
+    positioning_prompt = polish.get(POSITIONING, 0)
+    positioning = {"calls": 1, "prompt_tokens": positioning_prompt, "completion_tokens": POSITIONING_TOKENS,
+                   "cost": estimate_cost(model, positioning_prompt, POSITIONING_TOKENS)}
+
+    # 工作流在全部方向通过（或因预算停止修改）、或用满轮数时结束：第 k+1 轮发生的概率为 1 - ∏(1 - (1-p)^k)，
+    # 方向用满自己的轮数后按不再修改计
+    fail_rates = [1 - s["pass_rate"] for s in sections.values()]
+    workflow_rounds = sum(1 - math.prod(1 - (q ** k if k < section_iterations else 0) for q in fail_rates)
+                          for k in range(iterations))
+    round_seconds = stats.seconds(max((s["plan_tokens"] for s in sections.values()), default=0)
+                                  + stats.review_tokens)
+    report_seconds = stats.seconds(POSITIONING_TOKENS + max((s["plan_tokens"] for s in sections.values()), default=0))
+
+    def total(case: str, rounds: float) -> Dict[str, float]:
+        result = {key: sum(s[case][key] for s in sections.values()) + positioning[key]
+                  for key in ("calls", "prompt_tokens", "completion_tokens", "cost")}
+        result["rounds"] = rounds
+        result["wall_time"] = rounds * round_seconds + report_seconds
+        return result
+
+    return {
+        "village_name": village["village_name"],
+        "model": model,
+        "iterations": iterations,
+        "section_iterations": section_iterations,
+        "sections": sections,
+        "positioning": positioning,
+        "expected": total("expected", workflow_rounds),
+        "worst": total("worst", section_iterations),
+    }
+
+
+async def estimate_villages(villages: List[Dict[str, Any]], iterations: int = 5,
+                      history_path: Optional[str] = os.path.join(".cache", "draft_history.sqlite"),
+                      reports_dir: Optional[str] = "Results", max_concurrency: int = 20,
+                      max_parallel_villages: int = 10) -> Dict[str, Any]:
+    """
+    估算一批村庄的 token 用量、费用和耗时，不调用模型。费用按 Call_Model.model_prices 计算。
+
+    :param villages: 村庄列表，格式同 Batch_Runner.load_manifest；最多轮数按村庄预算计算，见 round_limits
+    :param iterations: 预算不限制轮数时规划-审核的最大轮数
+    :param history_path: 方案版本历史数据库路径
+    :param reports_dir: 批量运行汇总报告所在目录
+    :param max_concurrency: 所有村庄共享的大模型最大并发数
+    :param max_parallel_villages: 同时运行的村庄数量
+    :return: 各村庄的估算结果和合计
+    """
+    counter = TokenCounter()
+    stats = HistoricalStats(counter, history_path, reports_dir)
+    results = []
+    # 试运行中的模拟方案只保存在内存中
+    set_blob_store(BlobStore(":memory:"))
+    try:
+        for village in villages:
+            dry_run = await build_prompts(village, stats)
+            results.append(project(village, dry_run, stats, iterations))
+    finally:
+        set_blob_store(None)
+
+    totals = {}
+    for case in ("expected", "worst"):
+        totals[case] = {key: sum(r[case][key] for r in results)
+                        for key in ("calls", "prompt_tokens", "completion_tokens", "cost")}
+        # 批量运行的耗时取两者中较大的：各村庄按并行数分批运行的时间，和全部调用在全局并发下排队的时间
+        call_seconds = stats.seconds(totals[case]["completion_tokens"])
+        village_seconds = sum(r[case]["wall_time"] for r in results) / max_parallel_villages
+        totals[case]["wall_time"] = max(call_seconds / max_concurrency, village_seconds,
+                                        max((r[case]["wall_time"] for r in results), default=0.0))
+    return {
+        "tokenizer": counter.name,
+        "tokens_per_second": stats.tokens_per_second,
+        "latency_source": stats.latency_source,
+        "history_sections": len(stats.samples),
+        "villages": results,
+        "total": totals,
+    }
+
+
+def print_estimate(estimate: Dict[str, Any]) -> None:
+    """打印各村庄、各方向的估算结果。"""
+    print(f"token 计数：{estimate['tokenizer']}；输出速度 {estimate['tokens_per_second']:.0f} token/秒"
+          f"（{estimate['latency_source']}）；有历史记录的方向 {estimate['history_sections']} 个\n")
+    for village in estimate["villages"]:
+        limit = f"最多 {village['iterations']} 轮"
+        if village["section_iterations"] < village["iterations"]:
+            limit += f"，单个方向最多 {village['section_iterations']} 轮"
+        print(f"{village['village_name']}（{village['model']}，{limit}）")
+        print(f"  {'方向':<8} {'通过率':>6} {'预计轮数':>8} {'首轮输入':>9} {'修改输入':>9} "
+              f"{'预计输入':>10} {'预计输出':>9} {'预计费用':>9}")
+        for section, s in list(village["sections"].items()) + [(POSITIONING, None)]:
+            if s is None:
+                p = village["positioning"]
+                print(f"  {section:<8} {'':>6} {'':>8} {p['prompt_tokens']:>9} {'':>9} "
+                      f"{p['prompt_tokens']:>10.0f} {p['completion_tokens']:>9.0f} {p['cost']:>9.4f}")
+                continue
+            e = s["expected"]
+            print(f"  {section:<8} {s['pass_rate']:>6.0%} {s['rounds']:>8.2f} {s['plan_prompt_tokens']:>9} "
+                  f"{s['revision_prompt_tokens']:>9} {e['prompt_tokens']:>10.0f} {e['completion_tokens']:>9.0f} "
+                  f"{e['cost']:>9.4f}")
+        for case, label in (("expected", "预计"), ("worst", "最坏")):
+            t = village[case]
+            print(f"  {label}：{t['rounds']:.2f} 轮，{t['calls']:.0f} 次调用，输入 {t['prompt_tokens']:.0f} tokens，"
+                  f"输出 {t['completion_tokens']:.0f} tokens，费用 {t['cost']:.4f}，耗时约 {t['wall_time'] / 60:.1f} 分钟")
+        print()
+    for case, label in (("expected", "预计"), ("worst", "最坏")):
+        t = estimate["total"][case]
+        print(f"合计（{label}）：{len(estimate['villages'])} 个村庄，{t['calls']:.0f} 次调用，"
+              f"输入 {t['prompt_tokens']:.0f} tokens，输出 {t['completion_tokens']:.0f} tokens，"
+              f"费用 {t['cost']:.4f}，耗时约 {t['wall_time'] / 60:.1f} 分钟")
+
+
+def main():
+    """
+    命令行入口：
+        python cost_estimator.py villages.json --iterations 5 --output Results/estimate.json
+        python cost_estimator.py --village 金田村 --documents Resource --model grok-3-mini-beta --price 0.3 0.5
+    """
+    from Batch_Runner import load_manifest
+
+    parser = argparse.ArgumentParser(description="试运行估算 token 用量、费用和耗时（不调用模型）")
+    parser.add_argument("manifest", nargs="?", help="村庄清单 JSON 文件，格式同 Batch_Runner")
+    parser.add_argument("--village", default="金田村", help="未指定清单时估算的村庄")
+    parser.add_argument("--documents", default="Resource", help="未指定清单时的村庄资料目录")
+    parser.add_argument("--model", default="grok-3-mini-beta", help="未指定清单时使用的模型")
+    parser.add_argument("--price", type=float, nargs=2, metavar=("INPUT", "OUTPUT"),
+                        help="模型每百万输入、输出 token 的价格（覆盖清单中的 prices）")
+    parser.add_argument("--iterations", type=int, default=5, help="村庄预算未限制轮数时规划-审核的最大轮数")
+    parser.add_argument("--history", default=os.path.join(".cache", "draft_history.sqlite"), help="方案版本历史数据库")
+    parser.add_argument("--reports-dir", default="Results", help="批量运行汇总报告所在目录")
+    parser.add_argument("--concurrency", type=int, default=20, help="所有村庄共享的大模型最大并发数")
+    parser.add_argument("--parallel-villages", type=int, default=10, help="同时运行的村庄数量")
+    parser.add_argument("--output", help="估算结果 JSON 保存路径")
+    args = parser.parse_args()
+
+    if args.manifest:
+        manifest = load_manifest(args.manifest)
+    else:
+        manifest = {"villages": [{"village_name": args.village, "documents_path": args.documents,
+                                  "model": args.model}], "prices": {}}
+    model_prices.update({model: tuple(price) for model, price in manifest["prices"].items()})
+    if args.price:
+        model_prices.update({village["model"]: tuple(args.price) for village in manifest["villages"]})
+
+    estimate = asyncio.run(estimate_villages(manifest["villages"], args.iterations, args.history, args.reports_dir,
+                                             args.concurrency, args.parallel_villages))
+    print_estimate(estimate)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(estimate, file, ensure_ascii=False, indent=2)
+        print(f"估算结果已保存：{args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import re
+from typing import Any, Dict, List
+
+
+# 块级元素
+_FENCE = re.compile(r"^\s*(```|~~~)\s*([\w+-]*)\s*$")
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_HR = re.compile(r"^\s{0,3}([-*_])(?:\s*\1){2,}\s*$")
+_LIST_ITEM = re.compile(r"^(\s*)([-*+]|\d+[.)、])\s+(.*)$")
+_QUOTE = re.compile(r"^\s{0,3}>\s?(.*)$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+
+# 行内元素：代码、图片、链接、自动链接、粗体、斜体
+_INLINE = re.compile(
+    r"(?P<code>`+)(?P<code_text>.+?)(?P=code)"
+    r"|!\[(?P<image_alt>[^\]]*)\]\((?P<image_src>[^)\s]+)(?:\s+\"[^\"]*\")?\)"
+    r"|\[(?P<link_text>[^\]]+)\]\((?P<link_href>[^)\s]+)(?:\s+\"[^\"]*\")?\)"
+    r"|<(?P<autolink>https?://[^>\s]+)>"
+    r"|(?P<strong_mark>\*\*|__)(?P<strong_text>.+?)(?P=strong_mark)"
+    r"|\*(?P<em_text>[^*\s][^*]*?)\*"
+)
+_CJK = re.compile(r"[⺀-鿿＀-￯　-〿]")
+
+
+def parse_markdown(text: str) -> List[Dict[str, Any]]:
+    """
+    把 Markdown 文本解析成块级节点列表，供各导出格式共用，只需解析一次。
+
+    节点均为字典，type 取值：
+    - heading：level、text
+    - paragraph：text（硬换行保留为 \\n）
+    - list：ordered、start、items（每项含 text 和 children 子节点列表）
+    - table：header、align、rows
+    - code：lang、text
+    - quote：children
+    - hr
+
+    text 字段保留行内标记，用 parse_inlines 解析。
+
+    :param text: Markdown 文本
+    :return: 块级节点列表
+    """
+    return _parse_blocks(text.replace("\r\n", "\n").replace("\t", "    ").split("\n"))
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _starts_block(lines: List[str], i: int) -> bool:
+    """第 i 行是否开始一个新的非段落块，用于结束段落。"""
+    line = lines[i]
+    return bool(
+        _FENCE.match(line) or _HEADING.match(line) or _HR.match(line) or _QUOTE.match(line)
+        or _LIST_ITEM.match(line) or _is_table_start(lines, i)
+    )
+
+
+def _is_table_start(lines: List[str], i: int) -> bool:
+    return "|" in lines[i] and i + 1 < len(lines) and "-" in lines[i + 1] \
+        and bool(_TABLE_SEPARATOR.match(lines[i + 1]))
+
+
+def _split_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [cell.strip().replace("\\|", "|") for cell in re.split(r"(?<!\\)\|", line)]
+
+
+def _join_lines(lines: List[str]) -> str:
+    """
+    合并段落内的多行：行尾两个空格或反斜杠是硬换行，保留为 \\n；
+    其余为软换行，两侧都是中文时直接相连，否则以空格相连。
+    """
+    text = ""
+    for i, line in enumerate(lines):
+        hard = line.endswith("  ") or line.endswith("\\")
+        content = line.strip()
+        if content.endswith("\\"):
+            content = content[:-1].rstrip()
+        if i == 0:
+            text = content
+        elif text.endswith("\n") or (text and content and _CJK.match(text[-1]) and _CJK.match(content[0])):
+            text += content
+        else:
+            text += " " + content
+        if hard and i < len(lines) - 1:
+            text += "\n"
+    return text
+
+
+def _parse_blocks(lines: List[str]) -> List[Dict[str, Any]]:
+    blocks: List[Dict[str, Any]] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+
+        fence = _FENCE.match(line)
+        if fence:
+            body = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                body.append(lines[i])
+                i += 1
+            blocks.append({"type": "code", "lang": fence.group(2), "text": "\n".join(body)})
+            i += 1
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            blocks.append({"type": "heading", "level": len(heading.group(1)), "text": heading.group(2)})
+            i += 1
+            continue
+
+        if _HR.match(line):
+            blocks.append({"type": "hr"})
+            i += 1
+            continue
+
+        if _is_table_start(lines, i):
+            header = _split_row(line)
+            align = []
+            for cell in _split_row(lines[i + 1]):
+                align.append("center" if cell.startswith(":") and cell.endswith(":")
+                             else "right" if cell.endswith(":") else "left")
+            rows = []
+            i += 2
+            while i < len(lines) and "|" in lines[i] and lines[i].strip():
+                row = _split_row(lines[i])
+                rows.append((row + [""] * len(header))[:len(header)])
+                i += 1
+            blocks.append({"type": "table", "header": header, "align": align[:len(header)], "rows": rows})
+            continue
+
+        if _QUOTE.match(line):
+            body = []
+            while i < len(lines) and lines[i].strip():
+                quote = _QUOTE.match(lines[i])
+                body.append(quote.group(1) if quote else lines[i])
+                i += 1
+            blocks.append({"type": "quote", "children": _parse_blocks(body)})
+            continue
+
+        item = _LIST_ITEM.match(line)
+        if item:
+            i = _parse_list(lines, i, blocks)
+            continue
+
+        body = [line]
+        i += 1
+        while i < len(lines) and lines[i].strip() and not _starts_block(lines, i):
+            body.append(lines[i])
+            i += 1
+        blocks.append({"type": "paragraph", "text": _join_lines(body)})
+    return blocks
+
+
+def _parse_list(lines: List[str], i: int, blocks: List[Dict[str, Any]]) -> int:
+    """解析从第 i 行开始的列表，追加到 blocks，返回列表之后的行号。"""
+    first = _LIST_ITEM.match(lines[i])
+    base = len(first.group(1))
+    ordered = first.group(2)[0].isdigit()
+    start = int(re.match(r"\d+", first.group(2)).group()) if ordered else 1
+    items = []
+    while i < len(lines):
+        item = _LIST_ITEM.match(lines[i])
+        if item is None or len(item.group(1)) != base or item.group(2)[0].isdigit() != ordered:
+            break
+        offset = len(lines[i]) - len(item.group(3))
+        body = [item.group(3)]
+        i += 1
+        # 缩进超过列表标记的行属于该项（续行或嵌套块），空行后仍缩进的行也属于该项
+        while i < len(lines):
+            if lines[i].strip():
+                if _indent(lines[i]) <= base:
+                    break
+                body.append(lines[i][min(_indent(lines[i]), offset):])
+                i += 1
+            else:
+                following = i + 1
+                while following < len(lines) and not lines[following].strip():
+                    following += 1
+                if following < len(lines) and _indent(lines[following]) > base:
+                    body.extend([""] * (following - i))
+                    i = following
+                else:
+                    break
+        children = _parse_blocks(body)
+        text = children.pop(0)["text"] if children and children[0]["type"] == "paragraph" else ""
+        items.append({"text": text, "children": children})
+        # 同一列表的项之间允许有空行
+        following = i
+        while following < len(lines) and not lines[following].strip():
+            following += 1
+        if following < len(lines) and following != i:
+            next_item = _LIST_ITEM.match(lines[following])
+            if next_item and len(next_item.group(1)) == base and next_item.group(2)[0].isdigit() == ordered:
+                i = following
+    blocks.append({"type": "list", "ordered": ordered, "start": start, "items": items})
+    return i
+
+
+def parse_inlines(text: str) -> List[Dict[str, Any]]:
+    """
+    解析行内标记。
+
+    片段均为字典，type 取值：text、code（text）、link（text、href，图片按链接处理）、
+    strong / em（children 为嵌套片段）、break（硬换行）。
+
+    :param text: 含行内标记的文本
+    :return: 行内片段列表
+    """
+    spans: List[Dict[str, Any]] = []
+
+    def add_text(value: str) -> None:
+        for j, part in enumerate(value.split("\n")):
+            if j:
+                spans.append({"type": "break"})
+            if part:
+                spans.append({"type": "text", "text": part})
+
+    position = 0
+    for match in _INLINE.finditer(text):
+        add_text(text[position:match.start()])
+        position = match.end()
+        if match.group("code"):
+            spans.append({"type": "code", "text": match.group("code_text").strip()})
+        elif match.group("image_src") is not None:
+            spans.append({"type": "link", "text": match.group("image_alt") or match.group("image_src"),
+                          "href": match.group("image_src")})
+        elif match.group("link_href") is not None:
+            spans.append({"type": "link", "text": match.group("link_text"), "href": match.group("link_href")})
+        elif match.group("autolink"):
+            spans.append({"type": "link", "text": match.group("autolink"), "href": match.group("autolink")})
+        elif match.group("strong_text") is not None:
+            spans.append({"type": "strong", "children": parse_inlines(match.group("strong_text"))})
+        else:
+            spans.append({"type": "em", "children": parse_inlines(match.group("em_text"))})
+    add_text(text[position:])
+    return spans
+
+
+def plain_text(text: str) -> str:
+    """去掉行内标记后的纯文本，用于目录、书签和搜索。"""
+    return "".join(_span_text(span) for span in parse_inlines(text))
+
+
+def _span_text(span: Dict[str, Any]) -> str:
+    if span["type"] == "break":
+        return " "
+    if "children" in span:
+        return "".join(_span_text(child) for child in span["children"])
+    return span["text"]
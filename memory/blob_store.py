@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+# 句柄前缀，句柄形如 blob:<sha256>，本身就是普通字符串，检查点可以直接序列化
+HANDLE_PREFIX = "blob:"
+
+# 短于该长度的文本直接保存在工作状态中，不值得换成句柄
+MIN_BLOB_SIZE = 1024
+
+
+def is_handle(value: Any) -> bool:
+    """判断是否为大文本句柄。"""
+    return isinstance(value, str) and value.startswith(HANDLE_PREFIX) and len(value) == len(HANDLE_PREFIX) + 64
+
+
+class BlobStore:
+    """
+    按内容寻址的大文本存储。
+
+    工作状态中的村庄资料、各方向方案等大文本只保存句柄（内容的 SHA-256），原文压缩后存入 SQLite，
+    用到时再按句柄取回。LangGraph 在节点之间传递、合并和保存检查点时只处理几十字节的句柄；
+    相同内容只存一份，续跑时检查点中的句柄仍可解析。最近取回的文本缓存在内存中。
+    """
+
+    def __init__(self, db_path: str = os.path.join(".cache", "blobs.sqlite"), cache_size: int = 256):
+        """
+        :param db_path: 数据库路径，为 ":memory:" 时只保存在内存中
+        :param cache_size: 内存中缓存的文本数量
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    def _remember(self, handle: str, text: str) -> None:
+        self._cache[handle] = text
+        self._cache.move_to_end(handle)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def put(self, text: str) -> str:
+        """
+        保存文本。
+
+        :param text: 文本
+        :return: 句柄
+        """
+        data = text.encode("utf-8")
+        handle = HANDLE_PREFIX + hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if handle not in self._cache:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)",
+                    (handle[len(HANDLE_PREFIX):], zlib.compress(data), len(data), time.time()),
+                )
+            self._remember(handle, text)
+        return handle
+
+    def get(self, handle: str) -> str:
+        """
+        按句柄取回文本。
+
+        :param handle: 句柄
+        :return: 文本
+        """
+        with self._lock:
+            text = self._cache.get(handle)
+            if text is None:
+                row = self.conn.execute("SELECT data FROM blobs WHERE hash = ?",
+                                        (handle[len(HANDLE_PREFIX):],)).fetchone()
+                if row is None:
+                    raise KeyError(f"找不到大文本 {handle}")
+                text = zlib.decompress(row[0]).decode("utf-8")
+            self._remember(handle, text)
+        return text
+
+    def stats(self) -> dict:
+        """已保存的文本数量、原始大小和压缩后大小。"""
+        with self._lock:
+            count, size, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            ).fetchone()
+        return {"blobs": count, "bytes": size, "stored_bytes": stored}
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """全局大文本存储，第一次使用时创建。"""
+    global _store
+    if _store is None:
+        _store = BlobStore()
+    return _store
+
+
+def set_blob_store(store: Optional[BlobStore]) -> None:
+    """替换全局大文本存储（测试和基准测试中使用内存数据库）。"""
+    global _store
+    _store = store
+
+
+def store_text(value: Any, min_size: int = MIN_BLOB_SIZE) -> Any:
+    """
+    把大文本换成句柄。字典和列表逐项处理；短文本、句柄和其他类型原样返回。
+
+    :param value: 文本、字典或列表
+    :param min_size: 换成句柄的最小字符数
+    :return: 换成句柄后的值
+    """
+    if isinstance(value, str):
+        if len(value) < min_size or is_handle(value):
+            return value
+        return get_blob_store().put(value)
+    if isinstance(value, dict):
+        return {key: store_text(item, min_size) for key, item in value.items()}
+    if isinstance(value, list):
+        return [store_text(item, min_size) for item in value]
+    return value
+
+
+def resolve(value: Any) -> Any:
+    """
+    把句柄换回原文。字典和列表逐项处理，其他值原样返回，因此对未换成句柄的工作状态也可以直接调用。
+
+    :param value: 句柄、文本、字典或列表
+    :return: 原文
+    """
+    if is_handle(value):
+        return get_blob_store().get(value)
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item) for item in value]
+    return value
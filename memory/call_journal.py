@@ -0,0 +1,91 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class CallJournal:
+    """
+    记录一次运行中每个大模型调用的结果，用于断点续跑。
+
+    LangGraph 的检查点只保存到节点粒度，节点执行到一半时进程退出，节点内已完成的方向也会丢失。
+    续跑时中断的节点从同一状态重新开始，各方向的提示词与上次完全相同，
+    因此按（运行 ID、图步骤、提示词哈希、同一步骤内第几次发出该提示词）查到已有结果即可直接返回，不再调用大模型。
+    键中带有步骤和次数，同一次运行中重复发出的相同提示词（格式错误后的重试、与上一轮相同的修改提示词）
+    不会拿到之前的结果，仍然请求大模型。
+    """
+
+    def __init__(self, db_path: str, run_id: str):
+        """
+        :param db_path: 数据库路径（可与 LangGraph 检查点共用同一个文件）
+        :param run_id: 运行 ID
+        """
+        self.run_id = run_id
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._occurrences: Counter = Counter()  # (步骤, 提示词哈希) -> 已发出的次数
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS call_records (
+                run_id TEXT NOT NULL,
+                call_key TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (run_id, call_key)
+            )
+        """)
+
+    @staticmethod
+    def _hash(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def key(self, model: str, prompt: str, step: int) -> str:
+        """
+        为一次调用分配键：同一步骤内相同的提示词每发出一次，次数加一。
+        续跑时中断的步骤重新执行，按相同的顺序得到相同的键。
+
+        :param model: 模型名称
+        :param prompt: 提示词
+        :param step: 调用所在的图步骤（LangGraph 的 langgraph_step）
+        :return: 调用键
+        """
+        prompt_hash = self._hash(model, prompt)
+        with self._lock:
+            occurrence = self._occurrences[(step, prompt_hash)]
+            self._occurrences[(step, prompt_hash)] += 1
+        return f"{step}:{occurrence}:{prompt_hash}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查找已记录的调用结果。
+
+        :param key: 调用键，见 key
+        :return: 模型输出，未记录时返回 None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content FROM call_records WHERE run_id = ? AND call_key = ?", (self.run_id, key),
+            ).fetchone()
+        if row is not None:
+            self.hits += 1
+            return row[0]
+        return None
+
+    def put(self, key: str, content: str) -> None:
+        """
+        记录一次调用结果。
+
+        :param key: 调用键，见 key
+        :param content: 模型输出
+        """
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO call_records VALUES (?, ?, ?, ?)",
+                (self.run_id, key, content, time.time()),
+            )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -1,6 +1,23 @@
 from typing import TypedDict, List, Dict, Any
 
 
+# 规划方向：方向名称 -> 规划任务说明，即 development_plan 的键。Executor 按此规划，
+# 报告拆分、网站生成等只读取规划报告的模块也从这里取方向名称，不必导入 Executor
+PLANNING_TASKS: Dict[str, str] = {
+    "当前核心产业": "当前核心产业与上下游布局规划",
+    "未来核心产业": "未来核心产业发展与上下游布局规划",
+    "第一产业": "第一产业发展方案",
+    "第二产业": "第二产业发展方案",
+    "第三产业": "第三产业发展方案",
+    "基础设施": "基础设施建设发展方案",
+    "生态环境": "生态环境保护发展方案",
+    "品牌建设": "品牌建设发展方案",
+    "市场营销": "市场推广和营销发展方案",
+    "检测与评价": "检测和评估体系发展方案",
+    "政策与资金": "政策支持和资金保障发展方案",
+}
+
+
 # 定义 rural_DraftState
 class rural_DraftState(TypedDict):
     """
@@ -16,10 +33,11 @@ class rural_DraftState(TypedDict):
     """
     village_name: str  # 村庄名称
     documents_path: str  # 本地文件的路径
-    document: Dict[str, str]  # 本地文件的解析结果
+    document: Dict[str, str]  # 本地文件的解析结果（大文本为句柄，用 memory.blob_store.resolve 取回原文）
     model: str  # 使用的模型名称
-    development_plan: Dict[str, Any]  # 发展规划结果
+    development_plan: Dict[str, Any]  # 发展规划结果（大文本为句柄，同上）
     review: Dict[str, Any]  # 审核结果
     passed: str  # 审核结果
     comprehensive_report: str  # 综合报告
     core_positioning: str  # 核心定位
+    polished_sections: Dict[str, str]  # 各方向润色后的正文
@@ -0,0 +1,326 @@
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# 每隔多少个版本保存一次全文，取回任意版本最多只需回放这么多个差异
+KEYFRAME_INTERVAL = 8
+
+
+def make_delta(old: str, new: str) -> List[Any]:
+    """
+    按行计算新版本相对上一版本的差异：整数对 [i, j] 表示沿用上一版的第 i 到 j 行，字符串列表表示新写的行。
+
+    :param old: 上一版本
+    :param new: 新版本
+    :return: 差异
+    """
+    old_lines, new_lines = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(new_lines[j1:j2])
+    return delta
+
+
+def apply_delta(old: str, delta: List[Any]) -> str:
+    """
+    把差异应用到上一版本。
+
+    :param old: 上一版本
+    :param delta: make_delta 的结果
+    :return: 新版本
+    """
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in delta:
+        if op and isinstance(op[0], int):
+            parts.extend(old_lines[op[0]:op[1]])
+        else:
+            parts.extend(op)
+    return "".join(parts)
+
+
+class DraftHistory:
+    """
+    各方向方案的版本历史。
+
+    Executor 每轮会覆盖 draft["development_plan"] 中未通过的方向，这里在每次审核后把变化的方案和审核结果
+    记为一个新版本，便于分析收敛过程、回退到更好的一版。每个方向的版本组成一条链，
+    每 KEYFRAME_INTERVAL 个版本保存一次压缩全文，其余只保存相对上一版本的压缩差异。
+    """
+
+    def __init__(self, db_path: str = os.path.join(".cache", "draft_history.sqlite")):
+        """
+        :param db_path: 数据库路径
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._latest: Dict[Tuple[str, str], Tuple[int, str, str]] = {}  # (运行, 方向) -> (版本, 哈希, 全文)
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS draft_history (
+                run_id TEXT NOT NULL,
+                section TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                iteration INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                data BLOB NOT NULL,
+                text_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                review TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (run_id, section, version)
+            )
+        """)
+
+    def next_iteration(self, run_id: str) -> int:
+        """下一轮的编号（从 1 开始）。续跑时接着已记录的轮次编号。"""
+        with self._lock:
+            row = self.conn.execute("SELECT MAX(iteration) FROM draft_history WHERE run_id = ?", (run_id,)).fetchone()
+        return (row[0] or 0) + 1
+
+    def _last(self, run_id: str, section: str) -> Optional[Tuple[int, str, str]]:
+        """最新版本的（版本号、哈希、全文），先查内存，续跑时从数据库恢复。"""
+        last = self._latest.get((run_id, section))
+        if last is None:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT MAX(version) FROM draft_history WHERE run_id = ? AND section = ?", (run_id, section)
+                ).fetchone()
+            if row[0] is None:
+                return None
+            text = self.materialize(run_id, section, row[0])
+            last = (row[0], hashlib.sha256(text.encode("utf-8")).hexdigest(), text)
+            self._latest[(run_id, section)] = last
+        return last
+
+    def record(self, run_id: str, iteration: int, section: str, text: str, review: Any = None) -> Optional[int]:
+        """
+        记录一个方向在某一轮的方案。与最新版本相同时不新增版本。
+
+        :param run_id: 运行 ID
+        :param iteration: 轮次
+        :param section: 方向名称
+        :param text: 方案全文
+        :param review: 本轮的审核结果
+        :return: 新版本号，未变化时返回 None
+        """
+        if not isinstance(text, str):
+            text = json.dumps(text, ensure_ascii=False)
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        last = self._last(run_id, section)
+        if last is not None and last[1] == text_hash:
+            return None
+        version = 1 if last is None else last[0] + 1
+        if last is None or (version - 1) % KEYFRAME_INTERVAL == 0:
+            kind, payload = "full", text
+        else:
+            kind, payload = "delta", json.dumps(make_delta(last[2], text), ensure_ascii=False)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO draft_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, section, version, iteration, kind, zlib.compress(payload.encode("utf-8")), text_hash,
+                 len(text.encode("utf-8")), json.dumps(review, ensure_ascii=False) if review is not None else None,
+                 time.time()),
+            )
+        self._latest[(run_id, section)] = (version, text_hash, text)
+        return version
+
+    def record_draft(self, run_id: str, iteration: int, plans: Dict[str, Any], reviews: Dict[str, Any]) -> int:
+        """
+        记录一轮审核后全部方向的方案和审核结果。
+
+        :param run_id: 运行 ID
+        :param iteration: 轮次
+        :param plans: 方向 -> 方案全文
+        :param reviews: 方向 -> 审核结果
+        :return: 新增的版本数
+        """
+        return sum(self.record(run_id, iteration, section, text, reviews.get(section)) is not None
+                   for section, text in plans.items())
+
+    def versions(self, run_id: str, section: str) -> List[Dict[str, Any]]:
+        """某个方向的全部版本：版本号、轮次、大小、存储方式和审核结果。"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT version, iteration, kind, size, LENGTH(data), review FROM draft_history "
+                "WHERE run_id = ? AND section = ? ORDER BY version", (run_id, section)
+            ).fetchall()
+        return [{"version": v, "iteration": i, "kind": k, "bytes": size, "stored_bytes": stored,
+                 "review": json.loads(review) if review else None} for v, i, k, size, stored, review in rows]
+
+    def materialize(self, run_id: str, section: str, version: Optional[int] = None) -> str:
+        """
+        取回某个版本的全文：从不晚于它的最近一个全文版本开始，依次应用差异。
+
+        :param run_id: 运行 ID
+        :param section: 方向名称
+        :param version: 版本号，为 None 时取最新版本
+        :return: 方案全文
+        """
+        with self._lock:
+            if version is None:
+                version = self.conn.execute(
+                    "SELECT MAX(version) FROM draft_history WHERE run_id = ? AND section = ?", (run_id, section)
+                ).fetchone()[0]
+            base = self.conn.execute(
+                "SELECT MAX(version) FROM draft_history WHERE run_id = ? AND section = ? AND version <= ? "
+                "AND kind = 'full'", (run_id, section, version)
+            ).fetchone()[0]
+            if base is None:
+                raise KeyError(f"{run_id} 中没有 {section} 的第 {version} 版")
+            rows = self.conn.execute(
+                "SELECT kind, data FROM draft_history WHERE run_id = ? AND section = ? "
+                "AND version BETWEEN ? AND ? ORDER BY version", (run_id, section, base, version)
+            ).fetchall()
+        text = ""
+        for kind, data in rows:
+            payload = zlib.decompress(data).decode("utf-8")
+            text = payload if kind == "full" else apply_delta(text, json.loads(payload))
+        return text
+
+    def version_at(self, run_id: str, section: str, iteration: int) -> Optional[int]:
+        """第 iteration 轮结束时某个方向所处的版本。"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(version) FROM draft_history WHERE run_id = ? AND section = ? AND iteration <= ?",
+                (run_id, section, iteration)
+            ).fetchone()
+        return row[0]
+
+    def sections(self, run_id: str) -> List[str]:
+        """有历史记录的方向，按首次记录的顺序。"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT section FROM draft_history WHERE run_id = ? GROUP BY section ORDER BY MIN(created_at)",
+                (run_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def iteration_plans(self, run_id: str, iteration: int) -> Dict[str, str]:
+        """
+        取回第 iteration 轮结束时全部方向的方案，可用于回退。
+
+        :param run_id: 运行 ID
+        :param iteration: 轮次
+        :return: 方向 -> 方案全文
+        """
+        plans = {}
+        for section in self.sections(run_id):
+            version = self.version_at(run_id, section, iteration)
+            if version is not None:
+                plans[section] = self.materialize(run_id, section, version)
+        return plans
+
+    def diff(self, run_id: str, section: str, from_iteration: int, to_iteration: int, html: bool = False) -> str:
+        """
+        对比某个方向在两轮之间的变化。
+
+        :param run_id: 运行 ID
+        :param section: 方向名称
+        :param from_iteration: 起始轮次
+        :param to_iteration: 结束轮次
+        :param html: 为 True 时输出左右对照的 HTML 表格，否则输出 unified diff
+        :return: 差异文本
+        """
+        versions = [self.version_at(run_id, section, i) for i in (from_iteration, to_iteration)]
+        old, new = [self.materialize(run_id, section, v) if v is not None else "" for v in versions]
+        labels = [f"{section} 第{i}轮（v{v}）" for i, v in zip((from_iteration, to_iteration), versions)]
+        if html:
+            return difflib.HtmlDiff(wrapcolumn=80).make_file(old.splitlines(), new.splitlines(), *labels,
+                                                             context=True)
+        return "".join(difflib.unified_diff(old.splitlines(keepends=True), new.splitlines(keepends=True), *labels))
+
+    def stats(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """版本数、全文总大小和实际存储大小。"""
+        query = "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM draft_history"
+        with self._lock:
+            if run_id is None:
+                count, size, stored = self.conn.execute(query).fetchone()
+            else:
+                count, size, stored = self.conn.execute(query + " WHERE run_id = ?", (run_id,)).fetchone()
+        return {"versions": count, "bytes": size, "stored_bytes": stored,
+                "ratio": stored / size if size else 0.0}
+
+    def section_samples(self, max_runs: int = 50) -> Dict[str, Dict[str, List[Any]]]:
+        """
+        最近若干次运行中各方向的审核结果和首版方案，供 cost_estimator 估算通过率和输出长度。
+
+        :param max_runs: 最多取最近多少次运行
+        :return: 方向 -> {"reviews": 每个版本的审核结果, "first_drafts": 每次运行的第一版全文}
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT section, version, data, review FROM draft_history WHERE run_id IN ("
+                "SELECT run_id FROM draft_history GROUP BY run_id ORDER BY MAX(created_at) DESC LIMIT ?) "
+                "ORDER BY created_at", (max_runs,)
+            ).fetchall()
+        samples: Dict[str, Dict[str, List[Any]]] = {}
+        for section, version, data, review in rows:
+            entry = samples.setdefault(section, {"reviews": [], "first_drafts": []})
+            if review:
+                entry["reviews"].append(json.loads(review))
+            # 第一版总是保存全文
+            if version == 1:
+                entry["first_drafts"].append(zlib.decompress(data).decode("utf-8"))
+        return samples
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def main():
+    """
+    查看方案的版本历史：
+        python -m memory.draft_history RUN_ID                       各方向的版本列表
+        python -m memory.draft_history RUN_ID --diff 第一产业 1 3     第 1 轮到第 3 轮的差异
+        python -m memory.draft_history RUN_ID --iteration 2          取回第 2 轮结束时的全部方案
+    """
+    parser = argparse.ArgumentParser(description="查看方案的版本历史")
+    parser.add_argument("run_id")
+    parser.add_argument("--db", default=os.path.join(".cache", "draft_history.sqlite"))
+    parser.add_argument("--diff", nargs=3, metavar=("SECTION", "FROM", "TO"), help="对比某个方向两轮之间的变化")
+    parser.add_argument("--html", help="把对比结果保存为 HTML 文件")
+    parser.add_argument("--iteration", type=int, help="输出某一轮结束时的全部方案（Markdown）")
+    args = parser.parse_args()
+
+    history = DraftHistory(args.db)
+    if args.diff:
+        section, start, end = args.diff[0], int(args.diff[1]), int(args.diff[2])
+        if args.html:
+            with open(args.html, "w", encoding="utf-8") as file:
+                file.write(history.diff(args.run_id, section, start, end, html=True))
+            print(f"对比结果已保存：{args.html}")
+        else:
+            print(history.diff(args.run_id, section, start, end))
+    elif args.iteration is not None:
+        for section, text in history.iteration_plans(args.run_id, args.iteration).items():
+            print(f"### {section}\n{text}\n")
+    else:
+        for section in history.sections(args.run_id):
+            versions = history.versions(args.run_id, section)
+            summary = ", ".join(
+                f"v{v['version']}@{v['iteration']}({(v['review'] or {}).get('score', '-') if isinstance(v['review'], dict) else '-'})"
+                for v in versions)
+            print(f"{section}：{summary}")
+        stats = history.stats(args.run_id)
+        print(f"共 {stats['versions']} 个版本，全文 {stats['bytes'] / 1024:.0f} KB，"
+              f"实际存储 {stats['stored_bytes'] / 1024:.0f} KB（{stats['ratio']:.1%}）")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def content_hash(value: Any) -> str:
+    """
+    计算任意可 JSON 序列化内容的 SHA-256 哈希，字典按键排序，保证同样的内容得到同样的哈希。
+
+    :param value: 文本、字典等
+    :return: 十六进制哈希
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class ReviewCache:
+    """
+    审核结果缓存，键为（方向文本哈希、村庄资料哈希、审核提示词版本、模型）。
+
+    方案文本与上一次审核时逐字相同（例如 Executor 沿用了上一版，或重复出现同样的错误）时，
+    直接返回上次的审核结果，同一运行内和跨运行都不会把同样的内容再送审一次。
+    """
+
+    def __init__(self, db_path: str = os.path.join(".cache", "review_cache.sqlite")):
+        """
+        :param db_path: 缓存数据库路径
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_cache (
+                key TEXT PRIMARY KEY,
+                verdict TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def make_key(section_text: Any, corpus_hash: str, prompt_version: str, model: str) -> str:
+        """
+        生成缓存键。section_text 应包含村庄名称和方向名称，避免不同方向的相同文本共用结果。
+
+        :param section_text: 待审核的方向内容
+        :param corpus_hash: 村庄资料的哈希，见 content_hash
+        :param prompt_version: 审核提示词版本
+        :param model: 审核模型
+        """
+        return content_hash([content_hash(section_text), corpus_hash, prompt_version, model])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查找审核结果。
+
+        :param key: 缓存键
+        :return: 审核结果，未命中时返回 None
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT verdict FROM review_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, verdict: Dict[str, Any]) -> None:
+        """
+        保存审核结果。
+
+        :param key: 缓存键
+        :param verdict: 审核结果
+        """
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO review_cache VALUES (?, ?, ?)",
+                (key, json.dumps(verdict, ensure_ascii=False), time.time()),
+            )
+
+    def hit_rate(self) -> float:
+        """命中率。"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计。"""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate()}
@@ -0,0 +1,259 @@
+import asyncio
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (
+    BaseDocTemplate, Frame, HRFlowable, ListFlowable, ListItem, PageTemplate, Paragraph,
+    Spacer, Table, TableStyle,
+)
+
+from markdown_ast import parse_markdown, parse_inlines, plain_text
+from process_pool import get_process_pool
+from report_assembler import unique_slug
+
+
+# 中文字体候选：(常规体路径, 粗体路径, TTC 中的字体序号)。ReportLab 只支持 TrueType 轮廓的字体，
+# 嵌入时自动按用到的字符子集化。可通过环境变量 REPORT_CJK_FONT / REPORT_CJK_FONT_BOLD 指定字体文件。
+CJK_FONT_CANDIDATES: List[Tuple[str, Optional[str], int]] = [
+    ("C:/Windows/Fonts/simhei.ttf", None, 0),
+    ("C:/Windows/Fonts/msyh.ttc", "C:/Windows/Fonts/msyhbd.ttc", 0),
+    ("C:/Windows/Fonts/simsun.ttc", None, 0),
+    ("/System/Library/Fonts/Supplemental/Songti.ttc", None, 0),
+    ("/Library/Fonts/Arial Unicode.ttf", None, 0),
+    ("/usr/share/fonts/truetype/wqy/wqy-microhei.ttc", None, 0),
+    ("/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc", None, 0),
+    ("/usr/share/fonts/truetype/arphic/uming.ttc", None, 0),
+    ("/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf", None, 0),
+]
+
+# 找不到可嵌入的字体时使用 PDF 阅读器自带的 Adobe 中文字体（不嵌入）
+_CID_FALLBACK = "STSong-Light"
+
+
+@lru_cache(maxsize=None)
+def register_cjk_fonts() -> Tuple[str, str]:
+    """
+    注册中文字体，同一进程内只加载一次，后续文档直接复用。
+
+    :return: (常规体字体名, 粗体字体名)
+    """
+    candidates = list(CJK_FONT_CANDIDATES)
+    if os.getenv("REPORT_CJK_FONT"):
+        candidates.insert(0, (os.getenv("REPORT_CJK_FONT"), os.getenv("REPORT_CJK_FONT_BOLD"), 0))
+    for regular, bold, index in candidates:
+        if not os.path.exists(regular):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont("ReportCJK", regular, subfontIndex=index))
+            bold_name = "ReportCJK"
+            if bold and os.path.exists(bold):
+                pdfmetrics.registerFont(TTFont("ReportCJK-Bold", bold, subfontIndex=index))
+                bold_name = "ReportCJK-Bold"
+            pdfmetrics.registerFontFamily("ReportCJK", normal="ReportCJK", bold=bold_name,
+                                          italic="ReportCJK", boldItalic=bold_name)
+            return "ReportCJK", bold_name
+        except Exception as e:
+            print(f"中文字体 {regular} 加载失败：{e}")
+    print(f"未找到可嵌入的中文字体，使用 {_CID_FALLBACK}（不嵌入，依赖阅读器字体）；可设置 REPORT_CJK_FONT 指定字体文件")
+    pdfmetrics.registerFont(UnicodeCIDFont(_CID_FALLBACK))
+    pdfmetrics.registerFontFamily(_CID_FALLBACK, normal=_CID_FALLBACK, bold=_CID_FALLBACK,
+                                  italic=_CID_FALLBACK, boldItalic=_CID_FALLBACK)
+    return _CID_FALLBACK, _CID_FALLBACK
+
+
+@lru_cache(maxsize=None)
+def _styles() -> Dict[str, ParagraphStyle]:
+    regular, bold = register_cjk_fonts()
+    body = ParagraphStyle("body", fontName=regular, fontSize=10.5, leading=17, wordWrap="CJK",
+                          spaceAfter=6, alignment=TA_LEFT)
+    styles = {"body": body}
+    for level, (size, before) in enumerate([(20, 12), (16, 12), (14, 10), (12, 8), (11, 6), (10.5, 6)], 1):
+        styles[f"h{level}"] = ParagraphStyle(
+            f"h{level}", parent=body, fontName=bold, fontSize=size, leading=size * 1.5,
+            spaceBefore=before, spaceAfter=6, alignment=TA_CENTER if level == 1 else TA_LEFT,
+        )
+    styles["cell"] = ParagraphStyle("cell", parent=body, fontSize=9, leading=13, spaceAfter=0)
+    styles["cell_head"] = ParagraphStyle("cell_head", parent=styles["cell"], fontName=bold)
+    styles["code"] = ParagraphStyle("code", parent=body, fontSize=9, leading=13, backColor=colors.HexColor("#f4f4f4"),
+                                    borderPadding=4, leftIndent=4, rightIndent=4)
+    styles["quote"] = ParagraphStyle("quote", parent=body, leftIndent=12, textColor=colors.HexColor("#555555"))
+    return styles
+
+
+def _markup(text: str, anchors: Set[str]) -> str:
+    """
+    把行内片段转换为 ReportLab Paragraph 支持的标记。
+
+    :param text: 含行内标记的文本
+    :param anchors: 文档内全部标题锚点，指向不存在锚点的内部链接按普通文本输出
+    """
+    return "".join(_span_markup(span, anchors) for span in parse_inlines(text))
+
+
+def _span_markup(span: Dict[str, Any], anchors: Set[str]) -> str:
+    kind = span["type"]
+    if kind == "text":
+        return escape(span["text"])
+    if kind == "break":
+        return "<br/>"
+    if kind == "code":
+        return f'<font backColor="#f0f0f0">{escape(span["text"])}</font>'
+    if kind == "link" and span["href"].startswith("#") and span["href"][1:] not in anchors:
+        return escape(span["text"])
+    if kind == "link":
+        return f'<a href="{escape(span["href"], {chr(34): "&quot;"})}" color="#1a56db">{escape(span["text"])}</a>'
+    inner = "".join(_span_markup(child, anchors) for child in span["children"])
+    return f"<b>{inner}</b>" if kind == "strong" else f"<i>{inner}</i>"
+
+
+class _ReportDocTemplate(BaseDocTemplate):
+    """带页码和书签目录的文档模板。"""
+
+    def __init__(self, path: str, title: str, **kwargs):
+        super().__init__(path, pagesize=A4, title=title, leftMargin=20 * mm, rightMargin=20 * mm,
+                         topMargin=20 * mm, bottomMargin=20 * mm, **kwargs)
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id="body")
+        self.addPageTemplates([PageTemplate(id="page", frames=[frame], onPage=self._page_number)])
+        self._outline_level = -1
+        self._bookmarks = 0
+
+    def _page_number(self, canvas, doc) -> None:
+        canvas.saveState()
+        canvas.setFont(register_cjk_fonts()[0], 9)
+        canvas.drawCentredString(A4[0] / 2, 10 * mm, f"第 {doc.page} 页")
+        canvas.restoreState()
+
+    def afterFlowable(self, flowable) -> None:
+        heading = getattr(flowable, "_heading", None)
+        if heading is None:
+            return
+        level, title = heading
+        # PDF 书签层级不能跳级
+        level = min(level, self._outline_level + 1)
+        self._outline_level = level
+        self._bookmarks += 1
+        key = f"h{self._bookmarks}"
+        self.canv.bookmarkPage(key)
+        self.canv.addOutlineEntry(title, key, level=level, closed=level > 1)
+
+
+def _heading_anchors(blocks: List[Dict[str, Any]], counts: Dict[str, int], result: List[str]) -> List[str]:
+    """按文档顺序生成全部标题的锚点，与 Markdown 目录和 HTML 中的锚点一致。"""
+    for block in blocks:
+        if block["type"] == "heading":
+            result.append(unique_slug(plain_text(block["text"]), counts))
+        elif block["type"] == "list":
+            for item in block["items"]:
+                _heading_anchors(item["children"], counts, result)
+        elif block["type"] == "quote":
+            _heading_anchors(block["children"], counts, result)
+    return result
+
+
+def _flowables(blocks: List[Dict[str, Any]], styles: Dict[str, ParagraphStyle], width: float,
+               pending: List[str], anchors: Set[str], body: str = "body") -> List[Any]:
+    """
+    把块级节点转换为 platypus 的排版元素。
+
+    :param blocks: 块级节点
+    :param styles: 样式表
+    :param width: 可用宽度
+    :param pending: 尚未使用的标题锚点，按文档顺序依次取用
+    :param anchors: 全部标题锚点
+    :param body: 段落使用的样式名
+    """
+    result = []
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            anchor = pending.pop(0)
+            paragraph = Paragraph(f'<a name="{escape(anchor)}"/>' + _markup(block["text"], anchors),
+                                  styles[f"h{block['level']}"])
+            paragraph._heading = (block["level"] - 1, plain_text(block["text"]))
+            result.append(paragraph)
+        elif kind == "paragraph":
+            result.append(Paragraph(_markup(block["text"], anchors), styles[body]))
+        elif kind == "list":
+            items = []
+            for item in block["items"]:
+                content = [Paragraph(_markup(item["text"], anchors), styles[body])] if item["text"] else []
+                content += _flowables(item["children"], styles, width - 18, pending, anchors, body)
+                items.append(ListItem(content or [Spacer(0, 0)]))
+            result.append(ListFlowable(
+                items, bulletType="1" if block["ordered"] else "bullet", start=block["start"] if block["ordered"] else None,
+                bulletFontName=styles["body"].fontName, bulletFontSize=9, leftIndent=18,
+            ))
+        elif kind == "table":
+            columns = len(block["header"])
+            align = {"left": TA_LEFT, "center": TA_CENTER, "right": TA_RIGHT}
+            cell_styles = [ParagraphStyle(f"cell{i}", parent=styles["cell"], alignment=align.get(a, TA_LEFT))
+                           for i, a in enumerate(block["align"] + ["left"] * columns)]
+            data = [[Paragraph(_markup(cell, anchors), styles["cell_head"]) for cell in block["header"]]]
+            data += [[Paragraph(_markup(cell, anchors), cell_styles[i]) for i, cell in enumerate(row)] for row in block["rows"]]
+            table = Table(data, colWidths=[width / columns] * columns, repeatRows=1)
+            table.setStyle(TableStyle([
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#999999")),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e8eef7")),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]))
+            result += [table, Spacer(0, 6)]
+        elif kind == "code":
+            result.append(Paragraph(escape(block["text"]).replace("\n", "<br/>").replace(" ", "&nbsp;"), styles["code"]))
+        elif kind == "quote":
+            result += _flowables(block["children"], styles, width, pending, anchors, body="quote")
+        elif kind == "hr":
+            result.append(HRFlowable(width="100%", color=colors.HexColor("#cccccc"), spaceBefore=4, spaceAfter=4))
+    return result
+
+
+def render_blocks_pdf(blocks: List[Dict[str, Any]], path: str, title: str = "") -> int:
+    """
+    把已解析的块级节点排版为 PDF：中文字体嵌入并子集化，段落自动换行与分页，
+    支持标题（含书签目录）、列表、表格（跨页重复表头）、链接和代码块。
+
+    :param blocks: markdown_ast.parse_markdown 的结果
+    :param path: 输出文件路径
+    :param title: 文档标题（PDF 元数据）
+    :return: 页数
+    """
+    styles = _styles()
+    doc = _ReportDocTemplate(path, title)
+    pending = _heading_anchors(blocks, {}, [])
+    doc.build(_flowables(blocks, styles, doc.width, pending, set(pending)))
+    return doc.page
+
+
+def render_markdown_pdf(text: str, path: str, title: str = "") -> int:
+    """
+    把 Markdown 文本排版为 PDF，见 render_blocks_pdf。
+
+    :param text: Markdown 文本
+    :param path: 输出文件路径
+    :param title: 文档标题
+    :return: 页数
+    """
+    return render_blocks_pdf(parse_markdown(text), path, title)
+
+
+async def render_markdown_pdf_async(text: str, path: str, title: str = "") -> int:
+    """
+    在共用的进程池（见 process_pool）中排版 PDF，大报告的排版不阻塞事件循环；
+    常驻的工作进程中字体只加载一次。
+
+    :param text: Markdown 文本
+    :param path: 输出文件路径
+    :param title: 文档标题
+    :return: 页数
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), render_markdown_pdf, text, path, title)
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+
+# 常驻工作进程数：综合报告的各导出格式可同时进行，PDF 排版用到的字体在工作进程中只加载一次
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_users = 0
+_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    报告导出和 PDF 排版共用的进程池，第一次用到时创建。
+
+    :return: 进程池
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _pool
+
+
+def _detach_pool() -> Optional[ProcessPoolExecutor]:
+    """取下当前的进程池，之后再用到时重新创建。"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    return pool
+
+
+def shutdown_process_pool() -> None:
+    """关闭进程池并等待已提交的任务完成、工作进程退出，之后再用到时重新创建。"""
+    pool = _detach_pool()
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def shutdown_process_pool_async() -> None:
+    """同 shutdown_process_pool，在线程中等待，不阻塞事件循环中的其他运行。"""
+    pool = _detach_pool()
+    if pool is not None:
+        await asyncio.to_thread(pool.shutdown, True)
+
+
+def _add_user() -> None:
+    global _users
+    with _lock:
+        _users += 1
+
+
+def _remove_user() -> bool:
+    """注销一次使用，返回是否为最后一个。"""
+    global _users
+    with _lock:
+        _users -= 1
+        return _users == 0
+
+
+@contextmanager
+def process_pool_user() -> Iterator[None]:
+    """
+    登记一次使用进程池的运行（如一次 save_dict_to_file）。批量运行时多个村庄共用进程池，
+    最后一个运行结束时才关闭，工作进程不会在进程退出前一直挂着。事件循环中请使用 process_pool_user_async。
+    """
+    _add_user()
+    try:
+        yield
+    finally:
+        if _remove_user():
+            shutdown_process_pool()
+
+
+@asynccontextmanager
+async def process_pool_user_async() -> AsyncIterator[None]:
+    """同 process_pool_user，最后一个运行结束时在线程中等待进程池关闭（如一次 ChiefEditor.run）。"""
+    _add_user()
+    try:
+        yield
+    finally:
+        if _remove_user():
+            await shutdown_process_pool_async()
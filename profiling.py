@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+
+# 事件循环空闲时停留的函数，这些采样不计入 CPU 火焰图
+_IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "poll"), ("base_events.py", "_run_once")}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def collapse_stack(frame) -> List[str]:
+    """把栈帧整理为从外到内的函数列表。"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _is_idle(frame) -> bool:
+    return frame is not None and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """
+    采样分析器：后台线程按固定间隔读取事件循环线程的调用栈，按当前节点分别累计，
+    输出 collapsed stacks 格式（flamegraph.pl、speedscope 等可直接生成火焰图）。
+    事件循环在 select 中等待 I/O 的采样记为空闲，不计入火焰图。
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        :param interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.node = "启动"  # 当前节点，由 ChiefEditor 在进入节点时设置
+        self.stacks: Dict[str, Counter] = defaultdict(Counter)
+        self.idle: Counter = Counter()
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """开始采样当前线程（应在事件循环线程中调用）。"""
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            node = self.node
+            if _is_idle(frame):
+                self.idle[node] += 1
+            else:
+                self.stacks[node][";".join(collapse_stack(frame))] += 1
+
+    def busy_seconds(self, node: str) -> float:
+        """某个节点中事件循环线程忙于 CPU 计算的估计时间。"""
+        return sum(self.stacks[node].values()) * self.interval
+
+    def write_collapsed(self, directory: str) -> List[str]:
+        """
+        每个节点保存一个 collapsed stacks 文件，另存一个包含全部节点的文件（以节点名为栈底）。
+
+        :param directory: 输出目录
+        :return: 文件路径列表
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        everything = []
+        for node, stacks in self.stacks.items():
+            path = os.path.join(directory, f"{node}.collapsed")
+            with open(path, "w", encoding="utf-8") as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+                    everything.append(f"{node};{stack} {count}\n")
+            paths.append(path)
+        path = os.path.join(directory, "all.collapsed")
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(everything)
+        paths.append(path)
+        return paths
+
+
+class LoopLagMonitor:
+    """
+    事件循环阻塞监测：事件循环中按固定间隔更新心跳，看门狗线程发现心跳超过阈值未更新时，
+    立即抓取事件循环线程当时的调用栈（即阻塞事件循环的代码，如同步的 time.sleep 或大段 CPU 计算）。
+    心跳恢复后记录这次阻塞的时长。
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02):
+        """
+        :param threshold: 记录为阻塞的最小时长（秒）
+        :param interval: 心跳间隔（秒）
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.node = "启动"
+        self.events: List[Dict[str, Any]] = []
+        self.max_lag = 0.0
+        self._beat = time.perf_counter()
+        self._origin = self._beat
+        self._pending: Optional[Dict[str, Any]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handle = None
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """开始监测当前事件循环（须在事件循环中调用）。"""
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _heartbeat(self) -> None:
+        now = time.perf_counter()
+        lag = now - self._beat - self.interval
+        self.max_lag = max(self.max_lag, lag)
+        pending, self._pending = self._pending, None
+        if lag >= self.threshold:
+            event = pending or {"node": self.node, "stack": [], "start": self._beat + self.interval - self._origin}
+            event["duration"] = lag
+            self.events.append(event)
+        self._beat = now
+        if not self._stop.is_set():
+            self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self) -> None:
+        beat = None
+        while not self._stop.wait(self.threshold / 4):
+            # 每次阻塞只抓取一次调用栈
+            if self._beat == beat or time.perf_counter() - self._beat - self.interval < self.threshold:
+                continue
+            beat = self._beat
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._pending = {"node": self.node, "start": beat + self.interval - self._origin,
+                                 "stack": collapse_stack(frame)}
+
+    def write_events(self, path: str) -> str:
+        """保存全部阻塞记录（JSON）。"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"threshold": self.threshold, "max_lag": self.max_lag, "events": self.events},
+                      file, ensure_ascii=False, indent=2)
+        return path
+
+
+class RunProfiler:
+    """
+    一次运行的性能分析：采样分析器和事件循环阻塞监测，按节点归类，运行结束时保存结果并打印汇总。
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.005, lag_threshold: float = 0.1):
+        """
+        :param output_dir: 结果目录
+        :param interval: 采样间隔（秒）
+        :param lag_threshold: 记录为阻塞的最小时长（秒）
+        """
+        self.output_dir = output_dir
+        self.sampler = SamplingProfiler(interval)
+        self.lag = LoopLagMonitor(lag_threshold)
+        self.node_time: Dict[str, float] = defaultdict(float)
+
+    def start(self) -> None:
+        self.sampler.start()
+        self.lag.start()
+
+    def stop(self) -> None:
+        self.sampler.stop()
+        self.lag.stop()
+
+    def enter(self, node: str) -> None:
+        """进入节点。"""
+        self.sampler.node = self.lag.node = node
+
+    def add_node_time(self, node: str, seconds: float) -> None:
+        self.node_time[node] += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """各节点的墙钟时间、事件循环忙碌时间，以及阻塞事件。"""
+        nodes = {}
+        for node in sorted(set(self.node_time) | set(self.sampler.stacks)):
+            busy = self.sampler.busy_seconds(node)
+            top = self.sampler.stacks[node].most_common(1)
+            nodes[node] = {
+                "wall_seconds": self.node_time.get(node, 0.0),
+                "loop_busy_seconds": busy,
+                "hottest_frame": top[0][0].rsplit(";", 1)[-1] if top else None,
+            }
+        return {
+            "nodes": nodes,
+            "lag_events": len(self.lag.events),
+            "lag_total_seconds": sum(e["duration"] for e in self.lag.events),
+            "max_lag_seconds": self.lag.max_lag,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """保存 collapsed stacks 和阻塞记录，打印汇总。"""
+        self.sampler.write_collapsed(self.output_dir)
+        self.lag.write_events(os.path.join(self.output_dir, "loop_lag.json"))
+        summary = self.summary()
+        print("性能分析汇总：")
+        for node, stats in summary["nodes"].items():
+            print(f"  {node}：墙钟 {stats['wall_seconds']:.2f} 秒，事件循环忙碌约 {stats['loop_busy_seconds']:.2f} 秒，"
+                  f"最热函数 {stats['hottest_frame']}")
+        print(f"  事件循环阻塞 {summary['lag_events']} 次（≥{self.lag.threshold * 1000:.0f} ms），"
+              f"共 {summary['lag_total_seconds']:.2f} 秒，最长 {summary['max_lag_seconds'] * 1000:.0f} ms")
+        for event in sorted(self.lag.events, key=lambda e: e["duration"], reverse=True)[:3]:
+            where = " <- ".join(reversed(event["stack"][-4:])) or "（未抓到调用栈）"
+            print(f"    {event['node']}：阻塞 {event['duration'] * 1000:.0f} ms，{where}")
+        print(f"  火焰图数据（collapsed stacks）和阻塞记录已保存到 {self.output_dir}\n")
+        return summary
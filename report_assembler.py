@@ -0,0 +1,148 @@
+import re
+from typing import Dict, List, Tuple
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# 大模型常在标题前自带的编号：“一、”“（一）”“1.”“1.2”“第一章”“Ⅰ.” 等
+_NUMBERING = re.compile(
+    r"^(?:第[一二三四五六七八九十百\d]+[章节部分篇]\s*|[（(][一二三四五六七八九十\d]+[）)]\s*|"
+    r"[一二三四五六七八九十]+[、.．]\s*|\d+(?:\.\d+)*[、.．]?\s+|[ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+[、.．]\s*)"
+)
+_CHINESE_DIGITS = "零一二三四五六七八九"
+
+
+def chinese_number(n: int) -> str:
+    """把 1 到 99 的整数写成中文数字，用于章节编号。"""
+    if n < 10:
+        return _CHINESE_DIGITS[n]
+    tens, ones = divmod(n, 10)
+    return ("" if tens == 1 else _CHINESE_DIGITS[tens]) + "十" + (_CHINESE_DIGITS[ones] if ones else "")
+
+
+def slugify(title: str) -> str:
+    """
+    生成与 GitHub / 常见 Markdown 渲染器一致的标题锚点：转小写，去掉标点，空格换成连字符。
+
+    :param title: 标题文本
+    :return: 锚点
+    """
+    slug = re.sub(r"[^\w\- ]", "", title.strip().lower())
+    return slug.replace(" ", "-")
+
+
+def unique_slug(title: str, counts: Dict[str, int]) -> str:
+    """
+    生成不重复的锚点，重名时依次追加 -1、-2，与 GitHub 的规则一致。
+
+    :param title: 标题文本
+    :param counts: 已使用的锚点计数，会被更新
+    :return: 锚点
+    """
+    slug = slugify(title)
+    count = counts.get(slug, 0)
+    counts[slug] = count + 1
+    return f"{slug}-{count}" if count else slug
+
+
+def strip_numbering(title: str) -> str:
+    """去掉标题前自带的编号。"""
+    return _NUMBERING.sub("", title.strip(), count=1).strip() or title.strip()
+
+
+def normalize_headings(text: str, section_title: str, base_level: int = 3) -> Tuple[str, List[str]]:
+    """
+    规范化单个方向润色后的标题层级：去掉与章节名重复的开头标题，
+    把文中最高一级标题对齐到 base_level，更深的标题依次下移，最深不超过六级；
+    去掉原有编号，二级小节统一按“章.节”重新编号。代码块内的内容不处理。
+
+    :param text: 润色后的方向正文
+    :param section_title: 章节名（方向名称）
+    :param base_level: 文中最高一级标题应处的层级
+    :return: (规范化后的正文, 小节标题列表)
+    """
+    lines = text.strip().splitlines()
+    # 去掉开头与章节名重复的标题
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    if lines:
+        match = _HEADING.match(lines[0])
+        if match and section_title in match.group(2):
+            lines.pop(0)
+
+    in_fence = False
+    levels = []
+    for line in lines:
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = _HEADING.match(line)
+            if match:
+                levels.append(len(match.group(1)))
+    top = min(levels) if levels else base_level
+
+    result, subsections = [], []
+    in_fence = False
+    for line in lines:
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            result.append(line)
+            continue
+        match = None if in_fence else _HEADING.match(line)
+        if match is None:
+            result.append(line)
+            continue
+        level = min(len(match.group(1)) - top + base_level, 6)
+        title = strip_numbering(match.group(2))
+        if level == base_level:
+            subsections.append(title)
+        result.append(f"{'#' * level} {title}")
+    return "\n".join(result).strip(), subsections
+
+
+def assemble_report(village_name: str, core_positioning: str, sections: Dict[str, str],
+                    order: List[str] = None) -> str:
+    """
+    把各方向润色后的正文拼接成完整报告：标题、目录、核心定位、按顺序编号的各章。
+    纯本地操作，不调用大模型。
+
+    :param village_name: 村庄名称
+    :param core_positioning: 核心定位
+    :param sections: 方向名称 -> 润色后的正文
+    :param order: 章节顺序，为 None 时按 sections 的顺序；不在其中的方向排在最后
+    :return: 完整报告的 Markdown 文本
+    """
+    order = [key for key in (order or []) if key in sections] + \
+            [key for key in sections if key not in (order or [])]
+
+    chapters = [("核心定位", core_positioning)] + [(key, sections[key]) for key in order]
+    title = f"{village_name}乡村振兴规划报告"
+    # 渲染器按全文标题的先后顺序为重名标题追加 -1、-2，目录中的锚点按同样的顺序生成
+    counts: Dict[str, int] = {}
+    for heading in (title, "目录"):
+        unique_slug(heading, counts)
+
+    toc, body = [], []
+    for i, (name, text) in enumerate(chapters, 1):
+        chapter = f"{chinese_number(i)}、{name}"
+        toc.append(f"- [{chapter}](#{unique_slug(chapter, counts)})")
+        content, _ = normalize_headings(text, name)
+        numbered = []
+        sub = 0
+        in_fence = False
+        for line in content.splitlines():
+            if _FENCE.match(line):
+                in_fence = not in_fence
+            elif not in_fence:
+                match = _HEADING.match(line)
+                if match and len(match.group(1)) == 3:
+                    sub += 1
+                    heading = f"{i}.{sub} {match.group(2)}"
+                    line = f"### {heading}"
+                    toc.append(f"  - [{heading}](#{unique_slug(heading, counts)})")
+                elif match:
+                    unique_slug(match.group(2), counts)
+            numbered.append(line)
+        body.append(f"## {chapter}\n\n" + "\n".join(numbered).strip())
+
+    return "\n\n".join([f"# {title}", "## 目录", "\n".join(toc)] + body) + "\n"
@@ -0,0 +1,324 @@
+import asyncio
+import os
+from html import escape
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import docx
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+
+from markdown_ast import parse_markdown, parse_inlines, plain_text
+from pdf_renderer import render_blocks_pdf
+from process_pool import get_process_pool, process_pool_user
+from report_assembler import unique_slug
+from report_writer import atomic_output
+
+
+# ---------------------------------------------------------------- Markdown
+
+def render_markdown(blocks: List[Dict[str, Any]]) -> str:
+    """
+    把块级节点重新输出为格式统一的 Markdown。
+
+    :param blocks: markdown_ast.parse_markdown 的结果
+    :return: Markdown 文本
+    """
+    return "\n\n".join(_markdown_block(block) for block in blocks) + "\n"
+
+
+def _markdown_block(block: Dict[str, Any], indent: str = "") -> str:
+    """输出单个块，每一行都带上 indent（嵌套在列表项中时）。"""
+    kind = block["type"]
+    if kind == "heading":
+        return f"{indent}{'#' * block['level']} {block['text']}"
+    if kind == "paragraph":
+        return indent + block["text"].replace("\n", "  \n" + indent)
+    if kind == "list":
+        lines = []
+        for i, item in enumerate(block["items"]):
+            marker = f"{block['start'] + i}. " if block["ordered"] else "- "
+            child_indent = indent + " " * len(marker)
+            lines.append(indent + marker + item["text"].replace("\n", "  \n" + child_indent))
+            for child in item["children"]:
+                if child["type"] != "list":
+                    lines.append("")
+                lines.append(_markdown_block(child, child_indent))
+        return "\n".join(lines)
+    if kind == "table":
+        separator = {"left": ":--", "center": ":-:", "right": "--:"}
+        rows = [block["header"], [separator.get(a, "---") for a in block["align"]]] + block["rows"]
+        return "\n".join(indent + "| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |" for row in rows)
+    if kind == "code":
+        body = "\n".join(indent + line for line in block["text"].split("\n"))
+        return f"{indent}```{block['lang']}\n{body}\n{indent}```"
+    if kind == "quote":
+        inner = render_markdown(block["children"]).strip().split("\n")
+        return "\n".join(f"{indent}> {line}".rstrip() for line in inner)
+    return indent + "---"
+
+
+def export_markdown(blocks: List[Dict[str, Any]], path: str, title: str = "") -> str:
+    """导出 Markdown。"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(render_markdown(blocks))
+    return path
+
+
+# ---------------------------------------------------------------- HTML
+
+_HTML_STYLE = """
+body { max-width: 860px; margin: 2em auto; padding: 0 1em; font-family: "Microsoft YaHei", "PingFang SC", sans-serif;
+       line-height: 1.75; color: #222; }
+h1 { text-align: center; }
+table { border-collapse: collapse; width: 100%; margin: 1em 0; }
+th, td { border: 1px solid #999; padding: 4px 8px; vertical-align: top; }
+th { background: #e8eef7; }
+pre { background: #f4f4f4; padding: 8px; overflow-x: auto; }
+blockquote { color: #555; border-left: 4px solid #ddd; margin: 0; padding-left: 1em; }
+a { color: #1a56db; }
+"""
+
+
+def render_html(blocks: List[Dict[str, Any]], anchors: Optional[Dict[str, int]] = None) -> str:
+    """
+    把块级节点输出为 HTML 片段，标题带锚点（与 Markdown 目录的锚点一致，重名时追加 -1、-2）。
+
+    :param blocks: 块级节点
+    :param anchors: 已使用的锚点计数，跨多次调用共享时传入
+    :return: HTML 片段
+    """
+    anchors = {} if anchors is None else anchors
+    parts = []
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            anchor = unique_slug(plain_text(block["text"]), anchors)
+            parts.append(f'<h{block["level"]} id="{escape(anchor)}">{_html_inlines(block["text"])}</h{block["level"]}>')
+        elif kind == "paragraph":
+            parts.append(f"<p>{_html_inlines(block['text'])}</p>")
+        elif kind == "list":
+            tag = "ol" if block["ordered"] else "ul"
+            start = f' start="{block["start"]}"' if block["ordered"] and block["start"] != 1 else ""
+            items = "".join(f"<li>{_html_inlines(item['text'])}{render_html(item['children'], anchors)}</li>"
+                            for item in block["items"])
+            parts.append(f"<{tag}{start}>{items}</{tag}>")
+        elif kind == "table":
+            def row(cells, cell_tag):
+                return "<tr>" + "".join(
+                    f'<{cell_tag} style="text-align:{align}">{_html_inlines(cell)}</{cell_tag}>'
+                    for cell, align in zip(cells, block["align"] + ["left"] * len(cells))
+                ) + "</tr>"
+            body = "".join(row(r, "td") for r in block["rows"])
+            parts.append(f"<table><thead>{row(block['header'], 'th')}</thead><tbody>{body}</tbody></table>")
+        elif kind == "code":
+            parts.append(f"<pre><code>{escape(block['text'])}</code></pre>")
+        elif kind == "quote":
+            parts.append(f"<blockquote>{render_html(block['children'], anchors)}</blockquote>")
+        else:
+            parts.append("<hr>")
+    return "\n".join(parts)
+
+
+def _html_inlines(text: str) -> str:
+    return "".join(_html_span(span) for span in parse_inlines(text))
+
+
+def _html_span(span: Dict[str, Any]) -> str:
+    kind = span["type"]
+    if kind == "text":
+        return escape(span["text"], quote=False)
+    if kind == "break":
+        return "<br>"
+    if kind == "code":
+        return f"<code>{escape(span['text'])}</code>"
+    if kind == "link":
+        return f'<a href="{escape(span["href"])}">{escape(span["text"])}</a>'
+    inner = "".join(_html_span(child) for child in span["children"])
+    return f"<strong>{inner}</strong>" if kind == "strong" else f"<em>{inner}</em>"
+
+
+def html_page(title: str, body: str, head: str = "") -> str:
+    """包装成完整的 HTML 页面。"""
+    return (f'<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+            f"<title>{escape(title)}</title>\n<style>{_HTML_STYLE}</style>\n{head}</head>\n"
+            f"<body>\n{body}\n</body>\n</html>\n")
+
+
+def export_html(blocks: List[Dict[str, Any]], path: str, title: str = "") -> str:
+    """导出单页 HTML。"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(html_page(title, render_html(blocks)))
+    return path
+
+
+# ---------------------------------------------------------------- Word
+
+def _docx_hyperlink(paragraph, href: str, text: str) -> None:
+    """python-docx 没有超链接接口，直接构造 w:hyperlink 元素。"""
+    relation = paragraph.part.relate_to(href, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    link = OxmlElement("w:hyperlink")
+    link.set(qn("r:id"), relation)
+    run = OxmlElement("w:r")
+    properties = OxmlElement("w:rPr")
+    color = OxmlElement("w:color")
+    color.set(qn("w:val"), "1A56DB")
+    underline = OxmlElement("w:u")
+    underline.set(qn("w:val"), "single")
+    properties.extend([color, underline])
+    run.append(properties)
+    text_element = OxmlElement("w:t")
+    text_element.text = text
+    text_element.set(qn("xml:space"), "preserve")
+    run.append(text_element)
+    link.append(run)
+    paragraph._p.append(link)
+
+
+def _docx_inlines(paragraph, text: str, bold: bool = False, italic: bool = False) -> None:
+    for span in parse_inlines(text):
+        _docx_span(paragraph, span, bold, italic)
+
+
+def _docx_span(paragraph, span: Dict[str, Any], bold: bool, italic: bool) -> None:
+    kind = span["type"]
+    if kind == "text":
+        run = paragraph.add_run(span["text"])
+        run.bold, run.italic = bold or None, italic or None
+    elif kind == "break":
+        paragraph.add_run().add_break()
+    elif kind == "code":
+        run = paragraph.add_run(span["text"])
+        run.font.name = "Consolas"
+    elif kind == "link":
+        if span["href"].startswith(("http://", "https://", "mailto:")):
+            _docx_hyperlink(paragraph, span["href"], span["text"])
+        else:
+            run = paragraph.add_run(span["text"])
+            run.font.color.rgb = RGBColor(0x1A, 0x56, 0xDB)
+    else:
+        for child in span["children"]:
+            _docx_span(paragraph, child, bold or kind == "strong", italic or kind == "em")
+
+
+def _docx_blocks(document, blocks: List[Dict[str, Any]], list_depth: int = 0) -> None:
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            heading = document.add_heading(level=min(block["level"], 9))
+            _docx_inlines(heading, block["text"])
+        elif kind == "paragraph":
+            _docx_inlines(document.add_paragraph(), block["text"])
+        elif kind == "list":
+            base = "List Number" if block["ordered"] else "List Bullet"
+            style = base if list_depth == 0 else f"{base} {min(list_depth + 1, 3)}"
+            for item in block["items"]:
+                _docx_inlines(document.add_paragraph(style=style), item["text"])
+                _docx_blocks(document, item["children"], list_depth + 1)
+        elif kind == "table":
+            table = document.add_table(rows=1, cols=len(block["header"]))
+            table.style = "Table Grid"
+            alignment = {"left": WD_ALIGN_PARAGRAPH.LEFT, "center": WD_ALIGN_PARAGRAPH.CENTER,
+                         "right": WD_ALIGN_PARAGRAPH.RIGHT}
+            for cell, text in zip(table.rows[0].cells, block["header"]):
+                _docx_inlines(cell.paragraphs[0], text, bold=True)
+            for row in block["rows"]:
+                cells = table.add_row().cells
+                for i, (cell, text) in enumerate(zip(cells, row)):
+                    _docx_inlines(cell.paragraphs[0], text)
+                    cell.paragraphs[0].alignment = alignment.get(block["align"][i] if i < len(block["align"]) else "left")
+        elif kind == "code":
+            run = document.add_paragraph().add_run(block["text"])
+            run.font.name = "Consolas"
+            run.font.size = Pt(9)
+        elif kind == "quote":
+            for child in block["children"]:
+                if child["type"] == "paragraph":
+                    _docx_inlines(document.add_paragraph(style="Quote"), child["text"])
+                else:
+                    _docx_blocks(document, [child], list_depth)
+        else:
+            document.add_paragraph("—" * 20).alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def export_docx(blocks: List[Dict[str, Any]], path: str, title: str = "") -> str:
+    """导出 Word：真实的标题层级、列表、表格和超链接，正文使用中文字体。"""
+    document = docx.Document()
+    if title:
+        document.core_properties.title = title
+    normal = document.styles["Normal"]
+    normal.font.name = "宋体"
+    normal.font.size = Pt(10.5)
+    normal.element.rPr.rFonts.set(qn("w:eastAsia"), "宋体")
+    _docx_blocks(document, blocks)
+    document.save(path)
+    return path
+
+
+# ---------------------------------------------------------------- 导出
+
+def export_pdf(blocks: List[Dict[str, Any]], path: str, title: str = "") -> str:
+    """导出 PDF，见 pdf_renderer。"""
+    render_blocks_pdf(blocks, path, title)
+    return path
+
+
+# 导出格式 -> (扩展名, 导出函数)。导出函数接收已解析的块级节点，需为模块级函数以便在子进程中执行
+EXPORTERS: Dict[str, tuple] = {
+    "markdown": ("md", export_markdown),
+    "docx": ("docx", export_docx),
+    "pdf": ("pdf", export_pdf),
+    "html": ("html", export_html),
+}
+
+def register_exporter(name: str, suffix: str, exporter: Callable[[List[Dict[str, Any]], str, str], str]) -> None:
+    """
+    注册新的导出格式。
+
+    :param name: 格式名称
+    :param suffix: 文件扩展名
+    :param exporter: 导出函数 (blocks, path, title) -> path，须为模块级函数
+    """
+    EXPORTERS[name] = (suffix, exporter)
+
+
+def _export_atomic(exporter: Callable, blocks: List[Dict[str, Any]], path: str, title: str) -> str:
+    """在子进程中导出到临时文件，成功后原子替换目标文件并保留上一版，见 report_writer。"""
+    with atomic_output(path) as temp_path:
+        exporter(blocks, temp_path, title)
+    return path
+
+
+async def export_report_async(text: str, output_dir: str, file_name: str,
+                              formats: Iterable[str] = ("markdown", "docx", "pdf", "html")) -> Dict[str, str]:
+    """
+    把报告只解析一次，再在共用的进程池（见 process_pool）中并发导出各格式，总耗时约等于最慢的一种格式。
+    每种格式都先写临时文件再原子替换，中途失败不会留下写了一半的报告。
+
+    :param text: 报告的 Markdown 文本
+    :param output_dir: 输出目录
+    :param file_name: 文件名（不含扩展名）
+    :param formats: 导出格式，见 EXPORTERS
+    :return: 格式 -> 文件路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    blocks = parse_markdown(text)
+    loop = asyncio.get_running_loop()
+    formats = list(formats)
+    futures = []
+    for name in formats:
+        suffix, exporter = EXPORTERS[name]
+        path = os.path.join(output_dir, f"{file_name}.{suffix}")
+        futures.append(loop.run_in_executor(get_process_pool(), _export_atomic, exporter, blocks, path, file_name))
+    paths = await asyncio.gather(*futures)
+    print(f"报告已导出：{', '.join(os.path.basename(path) for path in paths)}")
+    return dict(zip(formats, paths))
+
+
+def export_report(text: str, output_dir: str, file_name: str,
+                  formats: Iterable[str] = ("markdown", "docx", "pdf", "html")) -> Dict[str, str]:
+    """同步版本的 export_report_async，导出完成后关闭进程池。"""
+    with process_pool_user():
+        return asyncio.run(export_report_async(text, output_dir, file_name, formats))
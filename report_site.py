@@ -0,0 +1,339 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from html import escape
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from markdown_ast import parse_markdown, plain_text
+from report_assembler import slugify, unique_slug
+from report_exporters import html_page, render_html
+from report_writer import AtomicReportWriter
+from memory.draft import PLANNING_TASKS
+
+
+# 页面模板或渲染方式变化时递增，所有页面会重新生成
+SITE_VERSION = "1"
+
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_REPORT_NAME = re.compile(r"^(.+?)乡村振兴(综合|规划)报告\.md$")
+
+_SEARCH_SCRIPT = """
+<script src="search_index.js"></script>
+<script>
+function normalize(text) { return text.toLowerCase().replace(/\\s+/g, " ").trim(); }
+function search(query) {
+  const q = normalize(query);
+  return q ? window.SEARCH_INDEX.filter(doc => doc[3].includes(q)) : [];
+}
+function show(query) {
+  const results = search(query).slice(0, 100), list = document.getElementById("results");
+  list.innerHTML = "";
+  for (const [village, section, url, text] of results) {
+    const at = text.indexOf(normalize(query)), item = document.createElement("li"), link = document.createElement("a");
+    link.href = url; link.textContent = village + " · " + section;
+    item.appendChild(link);
+    item.appendChild(document.createTextNode(" …" + text.slice(Math.max(0, at - 30), at + 60) + "…"));
+    list.appendChild(item);
+  }
+}
+const box = document.getElementById("query");
+box.addEventListener("input", () => show(box.value));
+const initial = new URLSearchParams(location.search).get("q");
+if (initial) { box.value = initial; show(initial); }
+</script>
+"""
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _normalize(text: str) -> str:
+    """与页面中 normalize 一致：转小写，空白压缩为一个空格。"""
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def find_reports(results_dir: str) -> Dict[str, str]:
+    """
+    在结果目录中查找各村报告：优先使用综合报告，没有时使用规划报告。
+
+    :param results_dir: 结果目录
+    :return: 村庄名称 -> 报告路径
+    """
+    reports = {}
+    for filename in sorted(os.listdir(results_dir)):
+        match = _REPORT_NAME.match(filename)
+        if match and (match.group(2) == "综合" or match.group(1) not in reports):
+            reports[match.group(1)] = os.path.join(results_dir, filename)
+    return reports
+
+
+def split_sections(text: str, titles: Optional[Set[str]] = None) -> List[Tuple[str, str]]:
+    """
+    按章节拆分报告：出现两次及以上的最高一级标题作为章节标题（综合报告为二级，规划报告为三级），
+    紧跟在章节标题之后的同级标题属于该章节；第一个章节之前的内容作为标题为空的前言。代码块内的内容不处理。
+
+    :param text: 报告的 Markdown 文本
+    :param titles: 已知的章节名称（如规划报告的各方向），给出时只按这些标题拆分
+    :return: [(章节标题, 章节文本)]，章节文本包含标题行
+    """
+    lines = text.splitlines()
+    headings, in_fence = [], False
+    for i, line in enumerate(lines):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = _HEADING.match(line)
+            if match and (titles is None or plain_text(match.group(2)) in titles):
+                headings.append((i, len(match.group(1)), match.group(2)))
+    levels = [level for _, level, _ in headings]
+    repeated = [level for level in set(levels) if levels.count(level) > 1 or titles is not None]
+    if not repeated:
+        return [("", text)]
+    section_level = min(repeated)
+
+    sections, start, title = [], 0, ""
+    for i, level, heading in headings:
+        if level == section_level:
+            # 规划报告中方案自带的同级标题紧跟在方向标题之后，归入该方向，不单独成章
+            if title and not any(line.strip() for line in lines[start + 1:i]):
+                continue
+            if i > start or title:
+                sections.append((title, "\n".join(lines[start:i])))
+            start, title = i, plain_text(heading)
+    sections.append((title, "\n".join(lines[start:])))
+    return [(title, body) for title, body in sections if title or body.strip()]
+
+
+def _blocks_text(blocks: List[Dict[str, Any]]) -> str:
+    """块级节点的纯文本，用于全文检索。"""
+    parts = []
+    for block in blocks:
+        kind = block["type"]
+        if kind in ("heading", "paragraph"):
+            parts.append(plain_text(block["text"]))
+        elif kind == "list":
+            for item in block["items"]:
+                parts.append(plain_text(item["text"]))
+                parts.append(_blocks_text(item["children"]))
+        elif kind == "table":
+            parts.extend(plain_text(cell) for row in [block["header"]] + block["rows"] for cell in row)
+        elif kind == "code":
+            parts.append(block["text"])
+        elif kind == "quote":
+            parts.append(_blocks_text(block["children"]))
+    return " ".join(part for part in parts if part)
+
+
+def _render_section(body: str, counts: Dict[str, int]) -> Dict[str, Any]:
+    """
+    渲染一个章节，记录它用到的锚点及渲染前的计数。只要这些锚点的计数不变，渲染结果就可以复用。
+
+    :param body: 章节文本
+    :param counts: 已使用的锚点计数，会被更新
+    :return: 章节缓存项
+    """
+    before = dict(counts)
+    blocks = parse_markdown(body)
+    html = render_html(blocks, counts)
+    uses = {slug: count - before.get(slug, 0) for slug, count in counts.items() if count != before.get(slug, 0)}
+    return {
+        "html": html,
+        "uses": uses,
+        "before": {slug: before.get(slug, 0) for slug in uses},
+        "text": _normalize(_blocks_text(blocks)),
+    }
+
+
+def _section_anchor(title: str, counts: Dict[str, int]) -> str:
+    """章节标题的锚点（不更新计数）。"""
+    slug = slugify(title)
+    return unique_slug(title, {slug: counts.get(slug, 0)})
+
+
+def _page_name(village: str) -> str:
+    return f"{village}.html"
+
+
+class SiteBuilder:
+    """
+    把各村报告生成为静态网站：索引页、每村一个报告页（章节带锚点），以及构建时生成的全文检索索引。
+
+    增量构建：按内容哈希跳过未变化的村庄；变化的村庄中，只重新渲染内容变化的章节，其余章节复用上次的 HTML。
+    构建状态保存在站点目录的 manifest.json 中。
+    """
+
+    def __init__(self, results_dir: str = "Results", site_dir: str = None):
+        """
+        :param results_dir: 报告所在目录
+        :param site_dir: 站点输出目录，默认为 results_dir/site
+        """
+        self.results_dir = results_dir
+        self.site_dir = site_dir or os.path.join(results_dir, "site")
+        self.manifest_path = os.path.join(self.site_dir, "manifest.json")
+        self.stats = {"villages": 0, "pages_rendered": 0, "sections_rendered": 0, "sections_reused": 0}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest.get("version") == SITE_VERSION:
+                return manifest
+        return {"version": SITE_VERSION, "villages": {}, "sections": {}}
+
+    def _write(self, file_name: str, suffix: str, content: str) -> None:
+        with AtomicReportWriter(self.site_dir, file_name, suffix, keep_previous=False) as writer:
+            writer.write(content)
+
+    def build(self, force: bool = False) -> Dict[str, Any]:
+        """
+        构建站点。
+
+        :param force: 是否忽略缓存，全部重新生成
+        :return: 构建统计
+        """
+        start = time.perf_counter()
+        manifest = {"version": SITE_VERSION, "villages": {}, "sections": {}} if force else self._load_manifest()
+        old_villages, old_sections = manifest["villages"], manifest["sections"]
+        villages, sections = {}, {}
+
+        for village, path in find_reports(self.results_dir).items():
+            with open(path, "r", encoding="utf-8") as file:
+                text = file.read()
+            digest = _hash(text)
+            old = old_villages.get(village)
+            if old and old["hash"] == digest and os.path.exists(os.path.join(self.site_dir, old["page"])):
+                villages[village] = old
+                for ref in old["sections"]:
+                    body_hash, variant = ref["key"]
+                    sections.setdefault(body_hash, {})[variant] = old_sections[body_hash][variant]
+                continue
+            villages[village] = self._build_village(village, path, text, digest, old_sections, sections)
+
+        # 删除已不存在的村庄页面
+        for village, old in old_villages.items():
+            if village not in villages:
+                page = os.path.join(self.site_dir, old["page"])
+                if os.path.exists(page):
+                    os.remove(page)
+
+        # 没有村庄变化时索引页和检索索引保持不变
+        if self.stats["pages_rendered"] or set(villages) != set(old_villages) or \
+                not os.path.exists(os.path.join(self.site_dir, "search_index.js")):
+            self._write_index(villages, sections)
+        manifest = {"version": SITE_VERSION, "villages": villages, "sections": sections}
+        self._write("manifest", "json", json.dumps(manifest, ensure_ascii=False))
+
+        self.stats["villages"] = len(villages)
+        self.stats["seconds"] = time.perf_counter() - start
+        print(f"站点已生成：{self.site_dir}，{self.stats['villages']} 个村庄，重新生成 {self.stats['pages_rendered']} 页，"
+              f"渲染 {self.stats['sections_rendered']} 个章节，复用 {self.stats['sections_reused']} 个，"
+              f"耗时 {self.stats['seconds']:.2f} 秒")
+        return self.stats
+
+    def _build_village(self, village: str, path: str, text: str, digest: str,
+                       old_sections: Dict[str, Any], sections: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        生成一个村庄的报告页，内容未变化的章节复用缓存。
+
+        :return: 该村庄在 manifest 中的记录
+        """
+        counts: Dict[str, int] = {}
+        parts, toc, refs = [], [], []
+        titles = PLANNING_TASKS if path.endswith("规划报告.md") else None
+        for title, body in split_sections(text, titles):
+            body_hash = _hash(body)
+            anchor = _section_anchor(title, counts) if title else ""
+            # 同一内容在不同位置时锚点计数可能不同，按渲染前的计数区分不同的渲染结果
+            variants = {**old_sections.get(body_hash, {}), **sections.get(body_hash, {})}
+            for variant, entry in variants.items():
+                if all(counts.get(slug, 0) == before for slug, before in entry["before"].items()):
+                    for slug, used in entry["uses"].items():
+                        counts[slug] = counts.get(slug, 0) + used
+                    self.stats["sections_reused"] += 1
+                    break
+            else:
+                entry = _render_section(body, counts)
+                variant = _hash(json.dumps(entry["before"], sort_keys=True))
+                self.stats["sections_rendered"] += 1
+            sections.setdefault(body_hash, {})[variant] = entry
+            refs.append({"key": [body_hash, variant], "title": title, "anchor": anchor})
+            parts.append(entry["html"])
+            if title:
+                toc.append(f'<li><a href="#{escape(anchor)}">{escape(title)}</a></li>')
+
+        page = _page_name(village)
+        nav = (f'<nav><a href="index.html">← 全部村庄</a> · <a href="index.html?q={quote(village)}">搜索</a>'
+               f'<details><summary>章节</summary><ul>{"".join(toc)}</ul></details></nav>')
+        self._write(page[:-len(".html")], "html", html_page(f"{village}乡村振兴报告", nav + "\n".join(parts)))
+        self.stats["pages_rendered"] += 1
+        return {
+            "hash": digest,
+            "source": os.path.basename(path),
+            "page": page,
+            "updated": time.strftime("%Y-%m-%d %H:%M", time.localtime(os.path.getmtime(path))),
+            "sections": refs,
+        }
+
+    def _write_index(self, villages: Dict[str, Any], sections: Dict[str, Any]) -> None:
+        """
+        生成索引页和全文检索索引。以章节为检索单位，构建时已提取并规范化各章节的纯文本（缓存在 manifest 中，
+        未变化的章节不再解析），页面中直接做子串匹配，中文不需要分词。
+        """
+        docs, rows = [], []
+        for village in sorted(villages):
+            record = villages[village]
+            url = quote(record["page"])
+            links = []
+            for ref in record["sections"]:
+                if not ref["title"]:
+                    continue
+                body_hash, variant = ref["key"]
+                text = sections[body_hash][variant]["text"]
+                target = f"{url}#{quote(ref['anchor'])}"
+                links.append(f'<a href="{target}">{escape(ref["title"])}</a>')
+                docs.append([village, ref["title"], target, text])
+            rows.append(f'<tr><td><a href="{url}">{escape(village)}</a></td><td>{record["updated"]}</td>'
+                        f'<td>{" · ".join(links)}</td></tr>')
+
+        index = json.dumps(docs, ensure_ascii=False, separators=(",", ":"))
+        self._write("search_index", "js", f"window.SEARCH_INDEX = {index};\n")
+        body = (f"<h1>乡村振兴规划报告</h1>\n"
+                f'<p><input id="query" type="search" placeholder="全文搜索" style="width:100%;padding:6px"></p>\n'
+                f'<ol id="results"></ol>\n'
+                f"<table><thead><tr><th>村庄</th><th>更新时间</th><th>章节</th></tr></thead>"
+                f"<tbody>{''.join(rows)}</tbody></table>\n{_SEARCH_SCRIPT}")
+        self._write("index", "html", html_page("乡村振兴规划报告", body))
+
+
+def build_site(results_dir: str = "Results", site_dir: str = None, force: bool = False) -> Dict[str, Any]:
+    """
+    构建报告站点，见 SiteBuilder。
+
+    :param results_dir: 报告所在目录
+    :param site_dir: 站点输出目录，默认为 results_dir/site
+    :param force: 是否全部重新生成
+    :return: 构建统计
+    """
+    return SiteBuilder(results_dir, site_dir).build(force)
+
+
+def main():
+    """
+    命令行入口：python report_site.py Results --site-dir Results/site
+    """
+    parser = argparse.ArgumentParser(description="把各村报告生成为静态网站")
+    parser.add_argument("results_dir", nargs="?", default="Results", help="报告所在目录")
+    parser.add_argument("--site-dir", help="站点输出目录，默认为 <results_dir>/site")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，全部重新生成")
+    args = parser.parse_args()
+    build_site(args.results_dir, args.site_dir, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import glob
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# 写入缓冲区大小，报告按大块写盘，而不是每次 write 都落盘
+BUFFER_SIZE = 1 << 20
+
+# 上一版报告的保存目录（位于输出目录下）
+PREVIOUS_DIR = "previous"
+
+# mkstemp 创建的临时文件权限为 0600，替换前改为普通报告文件的权限
+REPORT_MODE = 0o644
+
+# 无法判断写入进程是否仍在运行时（Windows），超过该时长（秒）的临时文件视为残留
+STALE_TEMP_SECONDS = 24 * 3600
+
+
+def _fsync_dir(directory: str) -> None:
+    """把目录项（重命名结果）写入磁盘。Windows 不支持对目录 fsync，直接跳过。"""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _keep_previous(path: str) -> None:
+    """
+    把已有的报告保存到 previous 目录。使用硬链接，原文件在替换前始终存在；不支持硬链接时复制。
+    """
+    if not os.path.exists(path):
+        return
+    directory = os.path.join(os.path.dirname(path), PREVIOUS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    previous = os.path.join(directory, os.path.basename(path))
+    if os.path.exists(previous):
+        os.remove(previous)
+    try:
+        os.link(path, previous)
+    except OSError:
+        shutil.copy2(path, previous)
+
+
+def _temp_prefix(path: str) -> str:
+    """临时文件名前缀，带上当前进程号，便于判断残留的临时文件是否还有进程在写。"""
+    return f".{os.path.basename(path)}.{os.getpid()}."
+
+
+def _process_alive(pid: int) -> bool:
+    """判断本机进程是否仍在运行。"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_stale_temps(path: str) -> int:
+    """
+    删除之前的运行崩溃后留下的、同一目标文件的临时文件。
+    仍在运行的进程（包括当前进程）的临时文件保留；Windows 上无法安全探测进程，按修改时间判断。
+
+    :param path: 目标文件路径
+    :return: 删除的临时文件数
+    """
+    directory = os.path.dirname(path) or "."
+    removed = 0
+    for temp_path in glob.glob(os.path.join(glob.escape(directory), f".{glob.escape(os.path.basename(path))}.*.tmp")):
+        pid = os.path.basename(temp_path)[len(os.path.basename(path)) + 2:].split(".", 1)[0]
+        if os.name == "nt" or not pid.isdigit():
+            stale = time.time() - os.path.getmtime(temp_path) > STALE_TEMP_SECONDS
+        else:
+            stale = int(pid) != os.getpid() and not _process_alive(int(pid))
+        if stale:
+            try:
+                os.remove(temp_path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _replace(temp_path: str, path: str, keep_previous: bool) -> None:
+    os.chmod(temp_path, REPORT_MODE)
+    if keep_previous:
+        _keep_previous(path)
+    os.replace(temp_path, path)
+    _fsync_dir(os.path.dirname(path) or ".")
+
+
+@contextmanager
+def atomic_output(path: str, keep_previous: bool = True) -> Iterator[str]:
+    """
+    为不支持流式写入的导出器（Word、PDF 等）提供原子写入：导出到同目录下的临时文件，
+    成功后 fsync 并原子重命名为目标文件；出错时删除临时文件，目标文件保持原样。
+
+    :param path: 目标文件路径
+    :param keep_previous: 是否把被替换的旧文件保存到 previous 目录
+    :return: 供导出器写入的临时文件路径
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    remove_stale_temps(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=_temp_prefix(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        yield temp_path
+        with open(temp_path, "rb") as file:
+            os.fsync(file.fileno())
+        _replace(temp_path, path, keep_previous)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class AtomicReportWriter:
+    """
+    流式、原子的报告写入器。
+
+    内容先追加到目标目录下的临时文件（大块缓冲写入），commit 时 flush、fsync，再原子重命名为目标文件，
+    被替换的旧版本保存在 previous 目录。进程中途崩溃只会留下临时文件，已有的报告不会被写坏，
+    下一次写入同一报告时清理这些残留的临时文件。
+    可作为上下文管理器使用：正常退出时 commit，出现异常时 abort。
+    """
+
+    def __init__(self, output_dir: str, file_name: str, suffix: str = "md",
+                 buffer_size: int = BUFFER_SIZE, keep_previous: bool = True):
+        """
+        :param output_dir: 输出目录
+        :param file_name: 文件名（不含扩展名）
+        :param suffix: 扩展名
+        :param buffer_size: 写入缓冲区大小（字节）
+        :param keep_previous: 是否保留被替换的上一版
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.path = os.path.join(output_dir, f"{file_name}.{suffix}")
+        self.keep_previous = keep_previous
+        remove_stale_temps(self.path)
+        fd, self.temp_path = tempfile.mkstemp(dir=output_dir, prefix=_temp_prefix(self.path), suffix=".tmp")
+        self.file = os.fdopen(fd, "w", encoding="utf-8", buffering=buffer_size)
+        self.closed = False
+
+    def write(self, text: str) -> None:
+        """追加内容，写满缓冲区后才落盘。"""
+        self.file.write(text)
+
+    def write_section(self, key: str, value: Any) -> None:
+        """按 save_dict_to_file 的 Markdown 格式追加一节。"""
+        self.write(f"### {key}\n{value}\n\n")
+
+    def commit(self) -> str:
+        """
+        写完：flush、fsync 后原子替换目标文件。
+
+        :return: 目标文件路径
+        """
+        if self.closed:
+            return self.path
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.closed = True
+        _replace(self.temp_path, self.path, self.keep_previous)
+        return self.path
+
+    def abort(self) -> None:
+        """放弃写入，删除临时文件，目标文件保持原样。"""
+        if self.closed:
+            return
+        self.file.close()
+        self.closed = True
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self) -> "AtomicReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class OrderedSectionWriter:
+    """
+    按既定顺序流式写入各节：某一节定稿后，只要它之前的各节都已写入就立即追加到临时文件，
+    否则暂存到前面的节定稿为止。最终文件中各节的顺序与 order 一致。
+    """
+
+    def __init__(self, writer: AtomicReportWriter, order: List[str]):
+        """
+        :param writer: 底层的原子写入器
+        :param order: 各节的顺序
+        """
+        self.writer = writer
+        self.order = list(order)
+        self.next = 0  # order 中下一个待写入的位置
+        self.pending: Dict[str, Any] = {}
+        self.written: set = set()
+
+    def add(self, key: str, value: Any) -> None:
+        """
+        登记一节的定稿内容，能写的部分立即写入。重复登记同一节时忽略。
+
+        :param key: 节名称
+        :param value: 内容
+        """
+        if key in self.written or key in self.pending:
+            return
+        if key not in self.order:
+            self.order.append(key)
+        self.pending[key] = value
+        while self.next < len(self.order) and self.order[self.next] in self.pending:
+            current = self.order[self.next]
+            self.writer.write_section(current, self.pending.pop(current))
+            self.written.add(current)
+            self.next += 1
+
+    def finish(self, sections: Optional[Dict[str, Any]] = None) -> str:
+        """
+        写入剩余各节（未定稿的按 sections 中的最终内容）并提交。
+
+        :param sections: 全部节的最终内容
+        :return: 目标文件路径
+        """
+        for key, value in (sections or {}).items():
+            if key not in self.order:
+                self.order.append(key)
+        for key in self.order:
+            if key not in self.written and key not in self.pending and sections and key in sections:
+                self.pending[key] = sections[key]
+        for key in self.order:
+            if key in self.pending:
+                self.writer.write_section(key, self.pending.pop(key))
+                self.written.add(key)
+        return self.writer.commit()
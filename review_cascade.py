@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from memory.draft import PLANNING_TASKS
+from review_schema import review_passed
+from consistency_checker import find_conflicts, conflicts_by_section
+
+
+class ReviewCascade:
+    """
+    审核模型级联：先用小而快的模型审核，只有结论不确定的方向才升级到更强的模型。
+
+    需要升级的情况：
+    - 得分落在临界区间 borderline 内；
+    - 模型自评的把握（confidence）低于 min_confidence；
+    - 本地一致性检查发现了跨方向冲突；
+    - 判为通过却列出了 high 级问题，结论自相矛盾。
+    """
+
+    def __init__(self, cheap_models: List[str], strong_model: Optional[str] = None,
+                 borderline: Tuple[int, int] = (60, 85), min_confidence: float = 0.7):
+        """
+        :param cheap_models: 依次尝试的较便宜模型，从最便宜的开始
+        :param strong_model: 最终裁决的强模型，为 None 时使用 draft["model"]
+        :param borderline: 需要升级的得分区间（闭区间）
+        :param min_confidence: 低于该把握时升级
+        """
+        self.cheap_models = list(cheap_models)
+        self.strong_model = strong_model
+        self.borderline = tuple(borderline)  # 清单中为 JSON 列表，统一为元组，缓存键才一致
+        self.min_confidence = min_confidence
+        self.escalations: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def tiers(self, default_model: str) -> List[str]:
+        """
+        本次审核依次使用的模型。
+
+        :param default_model: 未指定强模型时使用的模型，即 draft["model"]
+        """
+        return self.cheap_models + [self.strong_model or default_model]
+
+    def escalation_reason(self, verdict: Dict[str, Any], has_conflicts: bool) -> Optional[str]:
+        """
+        判断是否需要升级到下一级模型。
+
+        :param verdict: 当前级别的审核结果
+        :param has_conflicts: 该方向是否存在跨方向冲突
+        :return: 升级原因，不需要升级时返回 None
+        """
+        if verdict.get("source") == "parse_error":
+            return "审核结果无法解析"
+        if has_conflicts:
+            return "存在跨方向冲突"
+        low, high = self.borderline
+        if low <= verdict["score"] <= high:
+            return "得分处于临界区间"
+        confidence = verdict.get("confidence")
+        if confidence is not None and confidence < self.min_confidence:
+            return "把握不足"
+        if review_passed(verdict) and any(issue["severity"] == "high" for issue in verdict["issues"]):
+            return "通过但有严重问题"
+        return None
+
+    def record_escalation(self, model: str, reason: str) -> None:
+        """记录一次升级。"""
+        self.escalations[model][reason] += 1
+
+    def signature(self, default_model: str) -> str:
+        """级联配置的标识，用作审核缓存键中的模型部分。"""
+        return "cascade:" + ">".join(self.tiers(default_model)) + f":{self.borderline}:{self.min_confidence}"
+
+
+async def benchmark_cascade(reviewer, draft: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    基准模式：对每个方向分别用级联和只用强模型审核，统计两者结论的一致率以及各自的耗时和费用。
+    基准测试不读写审核缓存。
+
+    :param reviewer: 配置了 cascade 的 Execute_Reviewer 实例
+    :param draft: 已有发展方案的 rural_DraftState
+    :return: 基准结果
+    """
+    cascade = reviewer.cascade
+    strong = cascade.tiers(draft["model"])[-1]
+    reviewer.section_conflicts = conflicts_by_section(find_conflicts(draft["development_plan"]))
+
+    async def run(task: str) -> Dict[str, Any]:
+        prompt, conflicts = reviewer._build_prompt(task, draft)
+        cascade_stats, strong_stats = defaultdict(float), defaultdict(float)
+        start = time.perf_counter()
+        cascade_verdict = await reviewer._run_review(task, prompt, draft["model"], bool(conflicts), cascade_stats)
+        cascade_time = time.perf_counter() - start
+        start = time.perf_counter()
+        strong_verdict = await reviewer._request_verdict(task, prompt, strong, strong_stats)
+        strong_time = time.perf_counter() - start
+        return {
+            "section": task,
+            "cascade_verdict": cascade_verdict["verdict"],
+            "cascade_model": cascade_verdict.get("model"),
+            "strong_verdict": strong_verdict["verdict"],
+            "agree": cascade_verdict["verdict"] == strong_verdict["verdict"],
+            "cascade_latency": cascade_time,
+            "strong_latency": strong_time,
+            "cascade_cost": cascade_stats["cost"],
+            "strong_cost": strong_stats["cost"],
+        }
+
+    sections = [task for task, plan in draft["development_plan"].items() if isinstance(plan, str)]
+    rows = await asyncio.gather(*[run(task) for task in sections])
+    total = len(rows) or 1
+    result = {
+        "sections": len(rows),
+        "agreement_rate": sum(r["agree"] for r in rows) / total,
+        "escalation_rate": sum(r["cascade_model"] != cascade.tiers(draft["model"])[0] for r in rows) / total,
+        "cascade_latency": sum(r["cascade_latency"] for r in rows),
+        "strong_latency": sum(r["strong_latency"] for r in rows),
+        "cascade_cost": sum(r["cascade_cost"] for r in rows),
+        "strong_cost": sum(r["strong_cost"] for r in rows),
+        "per_section": rows,
+    }
+    print(f"级联与强模型结论一致率 {result['agreement_rate']:.0%}，升级率 {result['escalation_rate']:.0%}；"
+          f"累计耗时 {result['cascade_latency']:.1f} 秒 vs {result['strong_latency']:.1f} 秒，"
+          f"费用 {result['cascade_cost']:.4f} vs {result['strong_cost']:.4f}")
+    return result
+
+
+def read_plan_markdown(file_path: str) -> Dict[str, str]:
+    """
+    读取 save_dict_to_file 保存的规划 Markdown，按“### 方向”标题拆回各方向的方案。
+
+    :param file_path: 规划文件路径
+    :return: 方向名称 -> 方案文本
+    """
+    plans, current, lines = {}, None, []
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("### ") and line[4:].strip() in PLANNING_TASKS:
+                if current is not None:
+                    plans[current] = "".join(lines).strip()
+                current, lines = line[4:].strip(), []
+            elif current is not None:
+                lines.append(line)
+    if current is not None:
+        plans[current] = "".join(lines).strip()
+    return plans
+
+
+async def main():
+    """
+    命令行入口：对已保存的规划跑一次级联基准测试。
+        python review_cascade.py Results/金田村乡村振兴规划报告.md --cheap grok-3-mini-fast --strong grok-3
+    """
+    from Execute_Reviewer import Execute_Reviewer, read_markdown_files
+    from Call_Model import model_prices
+
+    parser = argparse.ArgumentParser(description="审核模型级联基准测试")
+    parser.add_argument("plan", help="已保存的规划 Markdown 文件")
+    parser.add_argument("--cheap", nargs="+", required=True, help="较便宜的审核模型，按顺序尝试")
+    parser.add_argument("--strong", required=True, help="强模型")
+    parser.add_argument("--documents", default="Resource", help="村庄资料目录")
+    parser.add_argument("--village", default="金田村", help="村庄名称")
+    parser.add_argument("--price", nargs=3, action="append", metavar=("MODEL", "PROMPT", "COMPLETION"),
+                        default=[], help="模型单价（每百万 token）")
+    args = parser.parse_args()
+
+    for model, prompt_price, completion_price in args.price:
+        model_prices[model] = (float(prompt_price), float(completion_price))
+    draft = {
+        "village_name": args.village,
+        "document": read_markdown_files(args.documents),
+        "model": args.strong,
+        "development_plan": read_plan_markdown(args.plan),
+    }
+    reviewer = Execute_Reviewer(cascade=ReviewCascade(args.cheap, args.strong), cache_path=None)
+    await benchmark_cascade(reviewer, draft)
+
+
+if __name__ == "__main__":
+    os.system('cls')
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+import re
+from typing import Any, Dict, List
+
+
+# 列表项：无序列表（-、*、+）或有序列表（1. / 1、）
+_BULLET = re.compile(r"^\s*(?:[-*+]|\d+[.、])\s+(.*)$")
+# 数字：阿拉伯数字或常见的中文数量表达
+_NUMBER = re.compile(r"\d|[一二三四五六七八九十百千万亿两]+(?:个|项|年|亩|户|人|元|万|%)")
+# 来源标注：链接、“来源/数据来自/根据”等字样或书名号引用
+_SOURCE = re.compile(r"https?://|\]\(|来源|出处|数据来自|引自|根据|《[^》]+》")
+# 标题
+_HEADING = re.compile(r"^\s*#{1,6}\s+\S")
+
+
+def lint_section(plan: Any, min_numeric_ratio: float = 0.3, min_length: int = 200) -> List[str]:
+    """
+    对单个方向的发展方案做机械检查，返回不合格项列表（为空表示通过）。
+
+    只检查能在本地确定的问题：是否保存了出错信息而非正文、是否为有效的 Markdown、
+    列表项是否有数字支撑、是否标注了来源。语义层面的审查仍交给大模型。
+
+    :param plan: 发展方案，正常情况下是 Markdown 文本
+    :param min_numeric_ratio: 含数字的列表项所占的最低比例
+    :param min_length: 正文最短长度（字符）
+    :return: 不合格项列表
+    """
+    if isinstance(plan, dict) and "error" in plan:
+        return [f"保存的是出错信息而不是方案正文：{plan['error']}，需要重新生成完整方案。"]
+    if not isinstance(plan, str):
+        return [f"方案不是文本（类型为 {type(plan).__name__}），需要重新生成 Markdown 格式的完整方案。"]
+
+    text = plan.strip()
+    if len(text) < min_length:
+        return [f"方案过短（{len(text)} 字），内容不完整，需要重新生成完整方案。"]
+
+    issues = []
+    lines = text.splitlines()
+
+    # Markdown 格式：需要有标题或列表结构，代码块需成对出现，表格各行列数一致
+    bullets = [m.group(1) for m in (_BULLET.match(line) for line in lines) if m]
+    if not bullets and not any(_HEADING.match(line) for line in lines):
+        issues.append("报告不是 Markdown 格式：没有任何标题或列表，请使用标题和分点结构重写。")
+    if text.count("```") % 2:
+        issues.append("Markdown 代码块标记 ``` 未成对出现，请检查格式。")
+    issues.extend(_lint_tables(lines))
+
+    # 数据支撑：列表项中含数字的比例
+    if bullets:
+        numeric = sum(1 for b in bullets if _NUMBER.search(b))
+        if numeric / len(bullets) < min_numeric_ratio:
+            issues.append(
+                f"{len(bullets)} 个分点中只有 {numeric} 个含有数字，"
+                f"请为每一点补充真实数字及其来源，没有数字的给出推理过程，编造的内容需明确标注。"
+            )
+
+    # 来源标注
+    if not _SOURCE.search(text):
+        issues.append("全文没有标注任何数据来源或依据，请为关键数字注明来源（文件名、链接或调研报告）。")
+
+    return issues
+
+
+def _lint_tables(lines: List[str]) -> List[str]:
+    """检查 Markdown 表格各行的列数是否一致。"""
+    issues = []
+    table: List[int] = []
+    for line in lines + [""]:
+        stripped = line.strip()
+        if stripped.startswith("|") and stripped.endswith("|") and len(stripped) > 1:
+            table.append(stripped.count("|") - 1)
+            continue
+        if table and len(set(table)) > 1:
+            issues.append(f"Markdown 表格各行列数不一致（{sorted(set(table))}），请修正表格格式。")
+        table = []
+    return issues
+
+
+def lint_verdict(issues: List[str]) -> Dict[str, Any]:
+    """
+    把不合格项整理成结构化审核结果，格式与大模型审核结果一致，供写稿人修改。
+
+    :param issues: lint_section 返回的不合格项
+    :return: 审核结果
+    """
+    return {
+        "verdict": "fail",
+        "score": 0,
+        "issues": [
+            {"severity": "high", "location": "全文", "problem": issue, "suggestion": "按问题描述修改后重新提交"}
+            for issue in issues
+        ],
+        "source": "linter",
+    }
+
+
+def evidence_counts(plan: str) -> Dict[str, int]:
+    """
+    统计方案中的数字和来源标注数量，供本地给候选稿打分。
+
+    :param plan: 方案文本
+    :return: {"numbers": 数字出现次数, "sources": 来源标注次数}
+    """
+    return {"numbers": len(_NUMBER.findall(plan)), "sources": len(_SOURCE.findall(plan))}
@@ -0,0 +1,121 @@
+import json
+import re
+from typing import Any, Dict
+
+
+# 审核提示词版本，修改审核提示词或输出格式时需递增，使旧的审核缓存失效
+REVIEW_PROMPT_VERSION = "3"
+
+# 审核结果的 JSON 格式说明，拼接在审核提示词末尾
+REVIEW_FORMAT = '''
+    【输出格式】：
+    只输出一个 JSON 对象，不要输出其他任何内容：
+    {
+      "verdict": "pass 或 fail（满足全部审查要求时为 pass）",
+      "score": 0 到 100 的整数，表示方案整体质量,
+      "confidence": 0 到 1 之间的小数，表示你对该结论的把握,
+      "issues": [
+        {
+          "severity": "high、medium 或 low",
+          "location": "问题所在的小节标题或分点",
+          "problem": "问题描述",
+          "suggestion": "具体修改建议，告知写稿人如何修改"
+        }
+      ]
+    }
+    verdict 为 pass 时 issues 可以为空列表；为 fail 时必须列出全部问题。
+    '''
+
+SEVERITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+SEVERITY_LABEL = {"high": "高", "medium": "中", "low": "低"}
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+
+def parse_review(text: str) -> Dict[str, Any]:
+    """
+    解析并校验大模型返回的审核结果，问题按严重程度排序。
+
+    :param text: 大模型输出
+    :return: {"verdict": "pass"/"fail", "score": int, "confidence": float 或 None, "issues": [...]}
+    :raises ValueError: 输出不是符合格式的 JSON
+    """
+    fence = _FENCE.search(text)
+    candidate = fence.group(1) if fence else text
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("输出中没有 JSON 对象")
+    try:
+        data = json.loads(candidate[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON 解析失败：{e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("输出的 JSON 不是对象")
+
+    verdict = str(data.get("verdict", "")).strip().lower()
+    if verdict not in ("pass", "fail"):
+        raise ValueError(f"verdict 必须为 pass 或 fail，实际为 {data.get('verdict')!r}")
+    try:
+        score = int(data.get("score"))
+    except (TypeError, ValueError):
+        raise ValueError(f"score 必须为 0 到 100 的整数，实际为 {data.get('score')!r}")
+    if not 0 <= score <= 100:
+        raise ValueError(f"score 必须为 0 到 100 的整数，实际为 {score}")
+
+    confidence = data.get("confidence")
+    if confidence is not None:
+        try:
+            confidence = min(max(float(confidence), 0.0), 1.0)
+        except (TypeError, ValueError):
+            raise ValueError(f"confidence 必须为 0 到 1 之间的小数，实际为 {confidence!r}")
+
+    issues = data.get("issues") or []
+    if not isinstance(issues, list):
+        raise ValueError("issues 必须为列表")
+    normalized = []
+    for issue in issues:
+        if not isinstance(issue, dict):
+            raise ValueError("issues 中的每一项必须为对象")
+        severity = str(issue.get("severity", "medium")).strip().lower()
+        normalized.append({
+            "severity": severity if severity in SEVERITY_ORDER else "medium",
+            "location": str(issue.get("location", "")),
+            "problem": str(issue.get("problem", "")),
+            "suggestion": str(issue.get("suggestion", "")),
+        })
+    if verdict == "fail" and not normalized:
+        raise ValueError("verdict 为 fail 时必须列出问题")
+    normalized.sort(key=lambda issue: SEVERITY_ORDER[issue["severity"]])
+
+    return {"verdict": verdict, "score": score, "confidence": confidence, "issues": normalized}
+
+
+def review_passed(review: Any) -> bool:
+    """
+    判断审核是否通过。只认结构化审核结果中的 verdict，不再按文本是否包含“审核通过”判断。
+
+    :param review: 审核结果，尚未审核时为空字符串
+    """
+    return isinstance(review, dict) and review.get("verdict") == "pass"
+
+
+def format_review(review: Any) -> str:
+    """
+    把结构化审核结果整理成给写稿人看的审核意见。
+
+    :param review: 审核结果
+    :return: 审核意见文本
+    """
+    if not review:
+        return "无审核意见"
+    if not isinstance(review, dict):
+        return str(review)
+
+    conclusion = "通过" if review_passed(review) else "不通过"
+    lines = [f"审核结论：{conclusion}（得分 {review.get('score')}）"]
+    for i, issue in enumerate(review.get("issues", []), 1):
+        lines.append(
+            f"{i}. [{SEVERITY_LABEL.get(issue['severity'], issue['severity'])}] "
+            f"位置：{issue['location']}；问题：{issue['problem']}；修改建议：{issue['suggestion']}"
+        )
+    return "\n".join(lines)
@@ -1,7 +1,10 @@
+import asyncio
 import os
-from docx import Document
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from markdown_ast import parse_markdown
+from pdf_renderer import render_markdown_pdf_async
+from process_pool import process_pool_user
+from report_exporters import export_docx
+from report_writer import AtomicReportWriter, atomic_output
 
 def save_dict_to_file(dictionary, file_path, file_name, file_type, keys=None):
     """
@@ -23,47 +26,49 @@ def save_dict_to_file(dictionary, file_path, file_name, file_type, keys=None):
     
     # 根据文件类型选择保存方式
     if file_type.lower() == 'word':
-        # 保存为 Word 文件
-        doc = Document()
-        for key, value in dictionary.items():
-            doc.add_heading(key, level=1)
-            doc.add_paragraph(str(value))
-        doc.save(os.path.join(file_path, f"{file_name}.docx"))
+        # 按 Markdown 结构生成 Word：真实的标题、列表和表格，见 report_exporters
+        text = "".join(f"### {key}\n{value}\n\n" for key, value in dictionary.items())
+        with atomic_output(os.path.join(file_path, f"{file_name}.docx")) as temp_path:
+            export_docx(parse_markdown(text), temp_path, file_name)
         print(f"字典已保存为 Word 文件: {file_name}.docx")
     
     elif file_type.lower() == 'pdf':
-        # 保存为 PDF 文件
-        pdf_path = os.path.join(file_path, f"{file_name}.pdf")
-        c = canvas.Canvas(pdf_path, pagesize=letter)
-        width, height = letter
-        y = height - 100
-        
-        for key, value in dictionary.items():
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(50, y, key)
-            y -= 20
-            c.setFont("Helvetica", 12)
-            c.drawString(70, y, str(value))
-            y -= 30
-            if y < 50:
-                c.showPage()
-                y = height - 100
-        
-        c.save()
-        print(f"字典已保存为 PDF 文件: {file_name}.pdf")
+        # 与工作流共用同一个排版路径：在进程池中排版，用完即关闭进程池
+        with process_pool_user():
+            asyncio.run(_save_pdf(dictionary, file_path, file_name))
     
     elif file_type.lower() == 'markdown':
-        # 保存为 Markdown 文件
-        md_path = os.path.join(file_path, f"{file_name}.md")
-        with open(md_path, 'w', encoding='utf-8') as f:
+        # 保存为 Markdown 文件：先写临时文件，fsync 后原子替换，上一版保存在 previous 目录
+        with AtomicReportWriter(file_path, file_name) as writer:
             for key, value in dictionary.items():
-                f.write(f"### {key}\n")
-                f.write(f"{value}\n\n")
+                writer.write_section(key, value)
         print(f"字典已保存为 Markdown 文件: {file_name}.md")
     
     else:
         raise ValueError("不支持的文件类型，请选择 'word'、'pdf' 或 'markdown'")
 
+
+async def _save_pdf(dictionary, file_path, file_name):
+    """按 Markdown 结构排版为 PDF：中文字体、自动换行和分页，见 pdf_renderer。"""
+    text = "".join(f"### {key}\n{value}\n\n" for key, value in dictionary.items())
+    with atomic_output(os.path.join(file_path, f"{file_name}.pdf")) as temp_path:
+        pages = await render_markdown_pdf_async(text, temp_path, file_name)
+    print(f"字典已保存为 PDF 文件: {file_name}.pdf（{pages} 页）")
+
+
+async def save_dict_to_file_async(dictionary, file_path, file_name, file_type, keys=None):
+    """
+    save_dict_to_file 的异步版本，在事件循环中使用：PDF 在共用的进程池中排版（见 process_pool），
+    不阻塞事件循环；其他格式与 save_dict_to_file 相同。
+    """
+    if file_type.lower() != 'pdf':
+        return save_dict_to_file(dictionary, file_path, file_name, file_type, keys)
+    if keys:
+        dictionary = {key: dictionary[key] for key in keys if key in dictionary}
+    os.makedirs(file_path, exist_ok=True)
+    await _save_pdf(dictionary, file_path, file_name)
+
+
 # 示例用法
 if __name__ == "__main__":
     my_dict = {
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from Batch_Runner import load_manifest, apply_executor_arguments, editor_options
+from ChiefEditor import ChiefEditor, add_executor_arguments
+from memory.blob_store import BlobStore, set_blob_store
+from memory.draft import rural_DraftState
+from review_cascade import ReviewCascade
+
+RESOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Resource")
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / "villages.json"
+    path.write_text(json.dumps({
+        "defaults": {"model": "m"},
+        "villages": [
+            {"village_name": "金田村", "documents_path": "Resource", "candidates": 3},
+            {"village_name": "银田村", "documents_path": "Resource", "budget": {"max_iterations": 2}},
+        ],
+    }, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _args(*argv):
+    parser = argparse.ArgumentParser()
+    add_executor_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_manifest_settings_take_precedence_over_cli(manifest):
+    villages = load_manifest(manifest)["villages"]
+    apply_executor_arguments(villages, _args("--candidates", "2", "--outline-tasks", "第一产业", "--prediction"))
+    first, second = (editor_options(village) for village in villages)
+    assert first["candidates"] == 3 and second["candidates"] == 2
+    assert first["outline_tasks"] == ["第一产业"] and first["use_prediction"] is True
+    assert second["budget"].max_iterations == 2 and first["budget"] is None
+
+
+def test_defaults_without_cli_flags(manifest):
+    villages = load_manifest(manifest)["villages"]
+    apply_executor_arguments(villages, _args())
+    options = editor_options(villages[1])
+    assert (options["use_prediction"], options["outline_tasks"], options["candidates"]) == (False, None, 1)
+
+
+def test_chief_editor_passes_options_to_executor(tmp_path):
+    set_blob_store(BlobStore(":memory:"))
+    try:
+        draft = rural_DraftState(village_name="金田村", documents_path=RESOURCE, model="m")
+        editor = ChiefEditor(draft, output_dir=str(tmp_path), use_prediction=True,
+                             outline_tasks=["第一产业"], candidates=3)
+        executor = editor.initialize_agents()["Executor"]
+    finally:
+        set_blob_store(None)
+    assert executor.use_prediction and executor.outline_tasks == {"第一产业"} and executor.candidates == 3
+
+
+def test_default_run_ids_are_unique(tmp_path):
+    set_blob_store(BlobStore(":memory:"))
+    try:
+        draft = rural_DraftState(village_name="金田村", documents_path=RESOURCE, model="m")
+        run_ids = {ChiefEditor(dict(draft), output_dir=str(tmp_path)).run_id for _ in range(5)}
+    finally:
+        set_blob_store(None)
+    assert len(run_ids) == 5
+    assert all(run_id.startswith("金田村-") for run_id in run_ids)
+
+
+def test_cascade_from_cli_and_manifest(manifest):
+    villages = load_manifest(manifest)["villages"]
+    villages[0]["cascade"] = {"cheap_models": ["mini"], "borderline": [50, 80]}
+    apply_executor_arguments(villages, _args("--cascade", "fast", "--cascade-strong", "strong"))
+    first, second = (editor_options(village)["cascade"] for village in villages)
+    assert first.tiers("m") == ["mini", "m"] and first.borderline == (50, 80)
+    assert second.tiers("m") == ["fast", "strong"]
+    assert editor_options({"village_name": "金田村"})["cascade"] is None
+
+
+def test_chief_editor_passes_cascade_to_reviewer(tmp_path):
+    set_blob_store(BlobStore(":memory:"))
+    try:
+        draft = rural_DraftState(village_name="金田村", documents_path=RESOURCE, model="m")
+        cascade = ReviewCascade(["mini"])
+        reviewer = ChiefEditor(draft, output_dir=str(tmp_path), cascade=cascade).initialize_agents()["Execute_Reviewer"]
+    finally:
+        set_blob_store(None)
+    assert reviewer.cascade is cascade
@@ -0,0 +1,54 @@
+import pytest
+
+from memory.blob_store import BlobStore, MIN_BLOB_SIZE, HANDLE_PREFIX, is_handle, resolve, set_blob_store, store_text
+
+LONG = "金田村茶叶种植面积 1200 亩。" * 200
+
+
+@pytest.fixture
+def store():
+    store = BlobStore(":memory:")
+    set_blob_store(store)
+    yield store
+    set_blob_store(None)
+    store.conn.close()
+
+
+def test_round_trip_of_nested_state(store):
+    state = {"document": {"村情": LONG, "短": "短文本"}, "plans": [LONG + "一", 3, None]}
+    stored = store_text(state)
+    assert is_handle(stored["document"]["村情"]) and is_handle(stored["plans"][0])
+    assert stored["document"]["短"] == "短文本" and stored["plans"][1:] == [3, None]
+    assert resolve(stored) == state
+    # 已经是句柄的值不会再存一次
+    assert store_text(stored) == stored
+
+
+def test_short_text_stays_inline(store):
+    text = "字" * (MIN_BLOB_SIZE - 1)
+    assert store_text(text) == text
+    assert is_handle(store_text(text + "字"))
+    assert store.stats()["blobs"] == 1
+
+
+def test_same_content_is_stored_once(store):
+    first, second = store_text(LONG), store_text(str(LONG))
+    assert first == second
+    store._cache.clear()
+    assert store_text(LONG) == first
+    stats = store.stats()
+    assert stats["blobs"] == 1 and stats["stored_bytes"] < stats["bytes"]
+
+
+def test_cache_miss_reads_from_database(tmp_path):
+    path = str(tmp_path / "blobs.sqlite")
+    handle = BlobStore(path).put(LONG)
+    assert BlobStore(path).get(handle) == LONG
+
+
+def test_unknown_handle(store):
+    handle = HANDLE_PREFIX + "0" * 64
+    with pytest.raises(KeyError):
+        resolve(handle)
+    # 长度不对的不是句柄，原样返回
+    assert resolve(HANDLE_PREFIX + "abc") == HANDLE_PREFIX + "abc"
@@ -0,0 +1,100 @@
+import argparse
+import json
+
+from Budget_Controller import BudgetController
+from Batch_Runner import apply_budget_arguments, editor_options
+from ChiefEditor import add_budget_arguments, budget_options
+from review_schema import parse_review
+
+SECTION = "第一产业"
+
+
+def _review(verdict: str, score: int) -> dict:
+    """按审核结果的 JSON 格式构造审核结果，与 Execute_Reviewer 交给预算控制器的一致。"""
+    issues = [] if verdict == "pass" else [
+        {"severity": "medium", "location": "全文", "problem": "缺少数据来源", "suggestion": "补充来源"}]
+    return parse_review(json.dumps({"verdict": verdict, "score": score, "confidence": 0.9, "issues": issues}))
+
+
+def _run_rounds(budget: BudgetController, max_rounds: int = 10) -> int:
+    """
+    按工作流的调用顺序模拟规划-审核循环（审核始终不通过）：
+    Executor 在每轮开始时 begin_iteration 并对每个方向询问 should_revise，
+    Execute_Reviewer 审核完 end_iteration，路由在预算耗尽时结束循环。
+
+    :return: 实际生成或修改了方案的轮数
+    """
+    draft = {"development_plan": {}, "review": {}}
+    planned = 0
+    for _ in range(max_rounds):
+        budget.begin_iteration()
+        if budget.should_revise(SECTION, draft):
+            draft["development_plan"][SECTION] = f"第 {planned + 1} 稿"
+            planned += 1
+        draft["review"][SECTION] = _review("fail", 40)
+        budget.end_iteration()
+        if budget.exhausted():
+            break
+    return planned
+
+
+def test_max_iterations_allows_that_many_rounds():
+    assert _run_rounds(BudgetController(max_iterations=2)) == 2
+    assert _run_rounds(BudgetController(max_iterations=5)) == 5
+
+
+def test_single_iteration_only_plans_once():
+    budget = BudgetController(max_iterations=1)
+    assert _run_rounds(budget) == 1
+    assert budget.summary()["completed_iterations"] == 1
+
+
+def test_iteration_budget_not_exhausted_mid_round():
+    budget = BudgetController(max_iterations=2)
+    budget.begin_iteration()
+    budget.end_iteration()
+    budget.begin_iteration()
+    # 第二轮进行中，修改仍照常进行
+    assert not budget.exhausted()
+    budget.end_iteration()
+    assert budget.exhausted()
+
+
+def test_degraded_budget_keeps_sections_close_to_passing():
+    budget = BudgetController(max_tokens=1000, close_score=70)
+    budget.record(SECTION, 800, 50, 0.0)
+    assert budget.degraded() and not budget.exhausted()
+    draft = {"development_plan": {SECTION: "方案", "第二产业": "方案"},
+             "review": {SECTION: _review("fail", 75), "第二产业": _review("fail", 40)}}
+    assert not budget.should_revise(SECTION, draft)
+    assert budget.should_revise("第二产业", draft)
+    assert budget.frozen == {SECTION}
+
+
+def test_section_max_iterations_freezes_section():
+    budget = BudgetController(section_max_iterations=1)
+    draft = {"development_plan": {SECTION: "方案"}, "review": {SECTION: _review("fail", 40)}}
+    assert budget.should_revise(SECTION, draft)
+    budget.record_revision(SECTION)
+    assert not budget.should_revise(SECTION, draft)
+
+
+def _budget_args(*argv):
+    parser = argparse.ArgumentParser()
+    add_budget_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_budget_flags():
+    assert budget_options(_budget_args()) == {}
+    assert budget_options(_budget_args("--fallback-model", "mini")) == {}
+    options = budget_options(_budget_args("--section-max-tokens", "5000", "--section-max-iterations", "2",
+                                          "--max-minutes", "1.5", "--fallback-model", "mini"))
+    assert options == {"section_max_tokens": 5000, "section_max_iterations": 2, "max_wall_time": 90.0,
+                       "fallback_model": "mini"}
+
+    villages = [{"village_name": "金田村"}, {"village_name": "银田村", "budget": {"max_iterations": 3}}]
+    apply_budget_arguments(villages, _budget_args("--section-max-iterations", "2"))
+    first, second = (editor_options(village)["budget"] for village in villages)
+    assert first.section_max_iterations == 2 and first.section_round_limit() == 3
+    assert second.max_iterations == 3 and second.section_max_iterations is None
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+import Call_Model
+from Budget_Controller import BudgetController
+from Call_Model import call_model, current_budget, current_journal, current_step, _journal_response
+from memory.call_journal import CallJournal
+
+
+def _fake_model(monkeypatch):
+    """把实际请求换成按顺序编号的回复，返回记录的请求列表。"""
+    requests = []
+
+    async def fake_call_model(sem, messages, model, prediction):
+        requests.append(messages[0]["content"])
+        return _journal_response(f"回复 {len(requests)}"), 0.0
+
+    monkeypatch.setattr(Call_Model, "_call_model", fake_call_model)
+    return requests
+
+
+def _run(journal, prompts, step=1):
+    async def main():
+        token = current_journal.set(journal)
+        current_step.set(step)
+        try:
+            return [(await call_model(asyncio.Semaphore(1), p, "m")).choices[0].message.content for p in prompts]
+        finally:
+            current_journal.reset(token)
+    return asyncio.run(main())
+
+
+def test_repeated_prompt_in_fresh_run_reaches_model(tmp_path, monkeypatch):
+    requests = _fake_model(monkeypatch)
+    journal = CallJournal(str(tmp_path / "journal.sqlite"), "run-1")
+    outputs = _run(journal, ["同一个提示词", "同一个提示词"])
+    assert requests == ["同一个提示词", "同一个提示词"]
+    assert outputs == ["回复 1", "回复 2"]
+    assert journal.hits == 0
+
+
+def test_resume_replays_calls_of_interrupted_step(tmp_path, monkeypatch):
+    requests = _fake_model(monkeypatch)
+    path = str(tmp_path / "journal.sqlite")
+    first = _run(CallJournal(path, "run-1"), ["甲", "甲", "乙"], step=3)
+
+    # 续跑时中断的步骤按相同顺序重新发出相同的提示词，全部从日志中取回
+    journal = CallJournal(path, "run-1")
+    assert _run(journal, ["甲", "甲", "乙"], step=3) == first
+    assert journal.hits == 3
+    assert len(requests) == 3
+
+
+def test_same_prompt_in_later_step_is_not_replayed(tmp_path, monkeypatch):
+    requests = _fake_model(monkeypatch)
+    path = str(tmp_path / "journal.sqlite")
+    _run(CallJournal(path, "run-1"), ["甲"], step=1)
+    journal = CallJournal(path, "run-1")
+    assert _run(journal, ["甲"], step=3) == ["回复 2"]
+    assert journal.hits == 0
+    assert len(requests) == 2
+
+
+def test_runs_do_not_share_records(tmp_path, monkeypatch):
+    requests = _fake_model(monkeypatch)
+    path = str(tmp_path / "journal.sqlite")
+    _run(CallJournal(path, "run-1"), ["甲"])
+    _run(CallJournal(path, "run-2"), ["甲"])
+    assert len(requests) == 2
+
+
+def test_resume_after_crash_replays_calls_once_budget_is_degraded(tmp_path, monkeypatch):
+    calls = []
+
+    async def crashing_call_model(sem, messages, model, prediction):
+        calls.append((messages[0]["content"], model))
+        if len(calls) == 3:
+            raise ConnectionError("进程在第 3 次调用时中断")
+        return _journal_response(f"{messages[0]['content']} 的回复"), 0.0
+
+    monkeypatch.setattr(Call_Model, "_call_model", crashing_call_model)
+    path = str(tmp_path / "journal.sqlite")
+    prompts = ["甲", "乙", "丙", "丁"]
+
+    async def main(journal, budget):
+        tokens = current_journal.set(journal), current_budget.set(budget)
+        current_step.set(2)
+        try:
+            return [(await call_model(asyncio.Semaphore(1), p, "strong")).choices[0].message.content for p in prompts]
+        finally:
+            current_journal.reset(tokens[0])
+            current_budget.reset(tokens[1])
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main(CallJournal(path, "run-1"), BudgetController(max_tokens=1000, fallback_model="cheap")))
+    assert len(calls) == 3
+
+    # 续跑时预算已越过降级比例，已完成的调用仍按请求的模型从日志中取回，不再重复计费
+    budget = BudgetController(max_tokens=1000, fallback_model="cheap")
+    budget.record("", 900, 0, 0.0)
+    journal = CallJournal(path, "run-1")
+    assert asyncio.run(main(journal, budget)) == [f"{p} 的回复" for p in prompts]
+    assert journal.hits == 2
+    assert calls[3:] == [("丙", "cheap"), ("丁", "cheap")]
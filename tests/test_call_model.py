@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import BadRequestError
+
+import Call_Model
+from Call_Model import _call_model, _journal_response
+from tracing import Tracer, current_tracer
+
+
+def _bad_request(message, **body):
+    response = httpx.Response(400, request=httpx.Request("POST", "http://localhost/v1/chat/completions"))
+    return BadRequestError(message, response=response, body={"message": message, **body})
+
+
+def _fake_client(monkeypatch, error):
+    """第一次（带 prediction 的）请求返回 error，之后正常返回。"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if "prediction" in kwargs:
+            raise error
+        return _journal_response("好")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(Call_Model, "AsyncOpenAI", lambda **kwargs: client)
+    monkeypatch.setattr(Call_Model, "_prediction_unsupported", set())
+    return calls
+
+
+def _send(model):
+    messages = [{"role": "user", "content": "你好"}]
+    response, _ = asyncio.run(_call_model(asyncio.Semaphore(1), messages, model, "上一版草稿"))
+    return response
+
+
+@pytest.mark.parametrize("error", [
+    _bad_request("Argument not supported: prediction", param="prediction"),
+    _bad_request("Predicted outputs are not supported for this model"),
+    _bad_request("invalid request", code="prediction_not_supported"),
+])
+def test_prediction_rejection_falls_back(monkeypatch, error):
+    calls = _fake_client(monkeypatch, error)
+    assert _send("m").choices[0].message.content == "好"
+    assert len(calls) == 2 and "prediction" not in calls[1]
+    assert "m" in Call_Model._prediction_unsupported
+
+
+def test_other_bad_request_is_raised(monkeypatch):
+    calls = _fake_client(monkeypatch, _bad_request("This model's maximum context length is 131072 tokens",
+                                                   code="context_length_exceeded", param="messages"))
+    with pytest.raises(BadRequestError):
+        _send("m")
+    assert len(calls) == 1
+    assert "m" not in Call_Model._prediction_unsupported
+
+
+def _piece(content, finish_reason, prompt_tokens=100, completion_tokens=50):
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+                           usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+
+def _truncating_client(monkeypatch, pieces):
+    """按顺序返回预设的（可能被截断的）分段，记录每次请求的消息。"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs["messages"])
+        return pieces[len(calls) - 1]
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(Call_Model, "AsyncOpenAI", lambda **kwargs: client)
+    monkeypatch.setattr(Call_Model, "continuation_stats", {"truncated": 0, "continuations": 0, "unfinished": 0})
+    return calls
+
+
+def _call_traced(village):
+    async def main():
+        Call_Model.current_village.set(village)
+        tracer = Tracer()
+        token = current_tracer.set(tracer)
+        try:
+            response = await Call_Model.call_model(asyncio.Semaphore(1), "写一份方案", "m")
+        finally:
+            current_tracer.reset(token)
+        return response, next(s for s in tracer.spans if s.name == "call_model")
+    return asyncio.run(main())
+
+
+def test_truncated_output_is_continued_and_usage_summed(monkeypatch):
+    calls = _truncating_client(monkeypatch, [
+        _piece("第一段内容，茶园面积一千二百亩", "length", 100, 50),
+        _piece("茶园面积一千二百亩，第二段内容", "stop", 160, 30),
+    ])
+    response, call_span = _call_traced("续写测试村")
+
+    assert response.choices[0].message.content == "第一段内容，茶园面积一千二百亩，第二段内容"
+    assert len(calls) == 2
+    assert calls[1][1] == {"role": "assistant", "content": "第一段内容，茶园面积一千二百亩"}
+    assert calls[1][2]["content"] == Call_Model.CONTINUE_PROMPT
+    assert (response.usage.prompt_tokens, response.usage.completion_tokens) == (260, 80)
+    assert (call_span.attributes["prompt_tokens"], call_span.attributes["completion_tokens"]) == (260, 80)
+    stats = Call_Model.usage_stats["续写测试村"]
+    assert (stats["calls"], stats["prompt_tokens"], stats["completion_tokens"], stats["continuations"]) == (1, 260, 80, 1)
+
+
+def test_continuation_stops_at_limit(monkeypatch):
+    pieces = [_piece(f"第{i}段。", "length", 10, 10) for i in range(Call_Model.MAX_CONTINUATIONS + 2)]
+    calls = _truncating_client(monkeypatch, pieces)
+    response, _ = _call_traced("截断测试村")
+
+    assert len(calls) == Call_Model.MAX_CONTINUATIONS + 1
+    assert response.choices[0].message.content == "".join(f"第{i}段。" for i in range(len(calls)))
+    assert response.usage.completion_tokens == 10 * len(calls)
+    assert Call_Model.continuation_stats == {"truncated": 1, "continuations": Call_Model.MAX_CONTINUATIONS,
+                                             "unfinished": 1}
+
+
+@pytest.mark.parametrize("text, continuation, joined", [
+    ("前文。全村耕地面积一千二百亩", "全村耕地面积一千二百亩，其中水田八百亩", "前文。全村耕地面积一千二百亩，其中水田八百亩"),
+    ("前文。耕地", "耕地面积", "前文。耕地耕地面积"),  # 重叠过短，可能只是巧合
+    ("前文。", "全新的内容", "前文。全新的内容"),
+])
+def test_join_continuation(text, continuation, joined):
+    assert Call_Model._join_continuation(text, continuation) == joined
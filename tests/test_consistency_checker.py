@@ -0,0 +1,90 @@
+import os
+import re
+
+import pytest
+
+from consistency_checker import extract_claims, find_conflicts, conflicts_by_section
+
+REPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Results", "金田村乡村振兴规划报告.md")
+SECTIONS = ["当前核心产业", "未来核心产业", "第一产业", "第二产业", "第三产业",
+            "基础设施", "生态环境", "品牌建设", "市场营销", "检测与评价"]
+
+
+@pytest.fixture(scope="module")
+def plans():
+    """把示例规划报告按方向标题拆回各方向的方案。"""
+    with open(REPORT, "r", encoding="utf-8") as file:
+        text = file.read()
+    plans, current = {}, None
+    for line in text.splitlines():
+        match = re.match(r"^### (.+?)\s*$", line)
+        if match and match.group(1) in SECTIONS:
+            current = match.group(1)
+            plans[current] = ""
+        elif current is not None:
+            plans[current] += line + "\n"
+    assert list(plans) == SECTIONS
+    return plans
+
+
+def test_sample_report_has_no_conflicts(plans):
+    assert find_conflicts(plans) == []
+
+
+@pytest.mark.parametrize("label", ["年产值", "成本", "村民人均收入增长", "中期需", "长期需", "投资"])
+def test_generic_labels_are_not_extracted(plans, label):
+    keys = {claim["key"] for section, text in plans.items() for claim in extract_claims(section, text)}
+    assert not [key for key in keys if key.startswith(label)]
+
+
+def test_village_metrics_from_sample_report(plans):
+    claims = extract_claims("第一产业", plans["第一产业"])
+    assert {"key": "山林面积（面积/亩）", "value": 32194.0} in [
+        {"key": c["key"], "value": c["value"]} for c in claims]
+    assert {c["value"] for c in claims if c["key"] == "森林覆盖率（百分比）"} == {80.0}
+
+
+def test_changed_village_metric_is_a_conflict(plans):
+    changed = dict(plans)
+    changed["第三产业"] = changed["第三产业"].replace("森林覆盖率超80%", "森林覆盖率超60%")
+    changed["生态环境"] += "\n- 金田村山林面积约2.5万亩。\n"
+    conflicts = {c["key"]: c for c in find_conflicts(changed)}
+    assert set(conflicts) == {"森林覆盖率（百分比）", "山林面积（面积/亩）"}
+    assert set(conflicts["山林面积（面积/亩）"]["sections"]) == {"第一产业", "生态环境"}
+    assert "第三产业" in conflicts_by_section(list(conflicts.values()))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("目前金田村耕地面积为1091.5亩", [("耕地面积（面积/亩）", 1091.5)]),
+    ("全村户籍人口3200人", [("人口（人数）", 3200.0)]),
+    ("全村农民人均可支配收入15000元", [("人均收入（金额/万元）", 1.5)]),
+    ("，带动村集体收入约1万元", []),
+    ("覆盖耕地面积200亩", []),
+    ("60岁以上人口占比21.78%", []),
+    ("预期效果：森林覆盖率稳定在85%", []),
+    ("村民人均收入增长10%", []),
+    ("金田村年接待游客3.5万人次", [("游客量（人次）", 35000.0)]),
+    ("游客量增长20%", []),
+    ("力争年接待游客5万人次", []),
+    ("目前茶叶产业年产值约300万元", [("茶叶产值（金额/万元）", 300.0)]),
+    ("全村年产值约800万元", [("全村产值（金额/万元）", 800.0)]),
+    ("灵芝加工厂总投资500万元", [("灵芝加工厂总投资（金额/万元）", 500.0)]),
+    ("预期效果：实现年产值50万元以上", []),
+    ("预期效果：年产值超1000万元", []),
+    ("，短期投资约50万元", []),
+    ("总体预算在50万元内", []),
+])
+def test_extract_village_metrics(text, expected):
+    assert [(c["key"], c["value"]) for c in extract_claims("测试", text)] == expected
+
+
+def test_conflicting_visitor_and_output_figures(plans):
+    changed = dict(plans)
+    changed["第三产业"] += "\n- 金田村年接待游客约3万人次，茶叶年产值约300万元。\n"
+    changed["市场营销"] += "\n- 全村接待游客5万人次，目前茶叶产值为310万元。\n"
+    changed["品牌建设"] += "\n- 茶叶年产值约120万元，茶叶加工厂总投资200万元。\n"
+    changed["基础设施"] += "\n- 茶叶加工厂总投资200万元。\n"
+    conflicts = {c["key"]: c for c in find_conflicts(changed)}
+    assert set(conflicts) == {"游客量（人次）", "茶叶产值（金额/万元）"}
+    assert conflicts["游客量（人次）"]["sections"] == ["市场营销", "第三产业"]
+    assert set(conflicts["茶叶产值（金额/万元）"]["groups"]) == {"300万元", "120万元"}
@@ -0,0 +1,12 @@
+from cost_estimator import round_limits
+
+
+def test_round_limits_follow_budget():
+    assert round_limits({"budget": {"max_iterations": 2}}, 5) == (2, 2)
+    assert round_limits({"budget": {"max_iterations": 4, "section_max_iterations": 1}}, 5) == (4, 2)
+    assert round_limits({"budget": {"section_max_iterations": 2}}, 5) == (5, 3)
+
+
+def test_round_limits_without_budget_use_iterations():
+    assert round_limits({}, 5) == (5, 5)
+    assert round_limits({"budget": {"max_tokens": 1000}}, 3) == (3, 3)
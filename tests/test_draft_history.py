@@ -0,0 +1,70 @@
+import pytest
+
+from memory.draft_history import KEYFRAME_INTERVAL, DraftHistory, apply_delta, make_delta
+
+
+def draft(version: int) -> str:
+    """第 version 版方案：每版改写一行、追加一行，最后一行不带换行符。"""
+    lines = [f"- 第{i}点：茶园面积 {1000 + i} 亩" for i in range(20)]
+    lines[version % 20] = f"- 第{version % 20}点：第 {version} 版改写"
+    lines += [f"- 第 {v} 版补充" for v in range(version)]
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("old, new", [
+    ("", "新写\n"),
+    ("a\nb\nc\n", "a\nc\nd"),
+    ("a\nb", ""),
+    (draft(1), draft(2)),
+])
+def test_delta_round_trip(old, new):
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+@pytest.fixture
+def history():
+    history = DraftHistory(":memory:")
+    yield history
+    history.close()
+
+
+def test_keyframes_and_deltas_round_trip(history):
+    total = KEYFRAME_INTERVAL * 2 + 3
+    for version in range(1, total + 1):
+        assert history.record("run", version, "第一产业", draft(version)) == version
+
+    kinds = [v["kind"] for v in history.versions("run", "第一产业")]
+    assert [i + 1 for i, kind in enumerate(kinds) if kind == "full"] == [1, KEYFRAME_INTERVAL + 1,
+                                                                           2 * KEYFRAME_INTERVAL + 1]
+    for version in range(1, total + 1):
+        assert history.materialize("run", "第一产业", version) == draft(version)
+    assert history.materialize("run", "第一产业") == draft(total)
+
+
+def test_unchanged_plan_is_not_a_new_version(history):
+    assert history.record("run", 1, "第一产业", draft(1)) == 1
+    assert history.record("run", 2, "第一产业", draft(1)) is None
+    assert history.version_at("run", "第一产业", 2) == 1
+
+
+def test_resume_continues_chain_from_database(tmp_path):
+    db = str(tmp_path / "history.sqlite")
+    history = DraftHistory(db)
+    for version in range(1, 4):
+        history.record("run", version, "第一产业", draft(version))
+    history.close()
+
+    resumed = DraftHistory(db)
+    assert resumed.next_iteration("run") == 4
+    assert resumed.record("run", 4, "第一产业", draft(3)) is None
+    assert resumed.record("run", 4, "第一产业", draft(4)) == 4
+    assert resumed.materialize("run", "第一产业", 4) == draft(4)
+    resumed.close()
+
+
+def test_iteration_plans(history):
+    history.record_draft("run", 1, {"第一产业": draft(1), "第二产业": "二产方案"}, {"第一产业": {"verdict": "fail"}})
+    history.record_draft("run", 2, {"第一产业": draft(2), "第二产业": "二产方案"}, {})
+    assert history.iteration_plans("run", 1) == {"第一产业": draft(1), "第二产业": "二产方案"}
+    assert history.iteration_plans("run", 2)["第一产业"] == draft(2)
+    assert history.versions("run", "第一产业")[0]["review"] == {"verdict": "fail"}
@@ -0,0 +1,58 @@
+import asyncio
+import re
+
+import pytest
+
+import Executor as executor_module
+from Call_Model import _journal_response
+from Executor import Executor, MAX_OUTLINE_ITEMS, parse_outline
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. 现状分析\n2. 问题诊断\n3. 实施路径", ["现状分析", "问题诊断", "实施路径"]),
+    ("1、现状分析\n2）问题诊断\n3）实施路径\n4．保障措施", ["现状分析", "问题诊断", "实施路径", "保障措施"]),
+    ("**1. 现状分析**\n**2. 问题诊断**", ["现状分析", "问题诊断"]),
+    # 缩进的子条目和“1.1”形式的小节不是一级部分
+    ("1. 现状分析\n   1. 种植规模\n   2. 加工能力\n1.1 市场表现\n2. 问题诊断\n  - 3. 品牌薄弱\n3. 实施路径",
+     ["现状分析", "问题诊断", "实施路径"]),
+    # 正文中重新从 1 编号的列表不算
+    ("1. 现状分析\n主要问题有：\n1. 规模小\n2. 问题诊断", ["现状分析", "问题诊断"]),
+    # 有标题时按最高一级标题拆分，标题自带的编号去掉
+    ("## 一、现状分析\n1. 种植规模\n2. 加工能力\n## 二、实施路径\n### 2.1 近期", ["现状分析", "实施路径"]),
+    ("# 第一产业提纲\n1. 现状分析\n2. 实施路径", ["现状分析", "实施路径"]),
+    ("", []),
+    ("本方案分为现状、问题和路径三部分。", []),
+])
+def test_parse_outline(text, expected):
+    assert parse_outline(text) == expected
+
+
+def test_parse_outline_caps_items():
+    text = "\n".join(f"{i}. 第{i}部分" for i in range(1, 15))
+    assert len(parse_outline(text)) == MAX_OUTLINE_ITEMS
+
+
+def test_unparsable_outline_falls_back_to_single_generation(monkeypatch):
+    prompts = []
+
+    async def call_model(sem, prompt, model, *args, **kwargs):
+        prompts.append(prompt)
+        return _journal_response("完整方案" if len(prompts) > 1 else "好的，提纲如下：现状、路径。")
+
+    monkeypatch.setattr(executor_module, "call_model", call_model)
+    result = asyncio.run(Executor()._outline_and_expand("第一产业", "规划提示词", {"model": "m"}))
+    assert result == "完整方案"
+    assert prompts[1] == "规划提示词"
+
+
+def test_outline_is_expanded_in_order(monkeypatch):
+    async def call_model(sem, prompt, model, *args, **kwargs):
+        if "只输出该方案的提纲" in prompt:
+            return _journal_response("1. 现状\n   1. 规模\n2. 路径")
+        title = re.search(r"只撰写第\d+部分“(.+?)”", prompt).group(1)
+        await asyncio.sleep(0.02 if title == "现状" else 0)
+        return _journal_response(f"{title}的内容")
+
+    monkeypatch.setattr(executor_module, "call_model", call_model)
+    result = asyncio.run(Executor()._outline_and_expand("第一产业", "规划提示词", {"model": "m"}))
+    assert result == "## 现状\n\n现状的内容\n\n## 路径\n\n路径的内容"
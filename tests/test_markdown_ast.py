@@ -0,0 +1,68 @@
+from markdown_ast import parse_inlines, parse_markdown, plain_text
+from pdf_renderer import render_markdown_pdf
+
+REPORT = """# 金田村乡村振兴综合报告
+
+## 一、第一产业
+
+全村耕地 **3200 亩**，
+其中茶园 800 亩。  
+茶农 300 户。
+
+1. 扩大茶园
+   - 新建茶园 200 亩
+   - 改造低产茶园
+2. 建设加工厂
+
+| 指标 | 现状 | 目标 |
+| :--- | ---: | :---: |
+| 茶叶产值 | 1200 万元 | 2000 万元 |
+
+```text
+## 代码块中的标题不会被解析
+```
+
+> 本章未能生成规划方案：请求超时
+
+---
+"""
+
+
+def test_blocks_of_report():
+    blocks = parse_markdown(REPORT)
+    assert [block["type"] for block in blocks] == \
+        ["heading", "heading", "paragraph", "list", "table", "code", "quote", "hr"]
+    assert blocks[1] == {"type": "heading", "level": 2, "text": "一、第一产业"}
+    # 中文之间的软换行直接相连，行尾两个空格的硬换行保留为 \n
+    assert blocks[2]["text"] == "全村耕地 **3200 亩**，其中茶园 800 亩。\n茶农 300 户。"
+
+    items = blocks[3]["items"]
+    assert blocks[3]["ordered"] and [item["text"] for item in items] == ["扩大茶园", "建设加工厂"]
+    nested = items[0]["children"][0]
+    assert nested["type"] == "list" and not nested["ordered"]
+    assert [item["text"] for item in nested["items"]] == ["新建茶园 200 亩", "改造低产茶园"]
+
+    table = blocks[4]
+    assert table["header"] == ["指标", "现状", "目标"]
+    assert table["align"] == ["left", "right", "center"]
+    assert table["rows"] == [["茶叶产值", "1200 万元", "2000 万元"]]
+    assert blocks[5] == {"type": "code", "lang": "text", "text": "## 代码块中的标题不会被解析"}
+    assert blocks[6]["children"] == [{"type": "paragraph", "text": "本章未能生成规划方案：请求超时"}]
+
+
+def test_inline_spans():
+    spans = parse_inlines("详见[规划图](map.png)，**重点 *茶产业* 项目**与`代码`")
+    assert spans[1] == {"type": "link", "text": "规划图", "href": "map.png"}
+    assert spans[3]["type"] == "strong"
+    assert spans[3]["children"][1] == {"type": "em", "children": [{"type": "text", "text": "茶产业"}]}
+    assert spans[-1] == {"type": "code", "text": "代码"}
+    assert plain_text("**重点**发展[茶产业](#茶)") == "重点发展茶产业"
+
+
+def test_pdf_breaks_long_report_into_pages(tmp_path):
+    rows = "\n".join(f"| 项目 {i} | {i * 10} 万元 |" for i in range(200))
+    text = REPORT + f"\n## 二、项目清单\n\n| 项目 | 投资 |\n| --- | --- |\n{rows}\n"
+    path = tmp_path / "报告.pdf"
+    pages = render_markdown_pdf(text, str(path), "金田村乡村振兴综合报告")
+    assert pages > 1
+    assert path.read_bytes().startswith(b"%PDF")
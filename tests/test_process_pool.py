@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+import process_pool
+from process_pool import get_process_pool, process_pool_user, process_pool_user_async
+from save_to_local import save_dict_to_file, save_dict_to_file_async
+
+
+def test_pool_is_shared_and_closed_after_last_user():
+    with process_pool_user():
+        pool = get_process_pool()
+        with process_pool_user():
+            assert get_process_pool() is pool
+        # 还有一个运行在用，进程池保持打开
+        assert process_pool._pool is pool
+    assert process_pool._pool is None
+
+
+def test_pool_is_reused_until_closed_then_recreated():
+    with process_pool_user():
+        pool = get_process_pool()
+        pids = {pool.submit(os.getpid).result() for _ in range(20)}
+        assert get_process_pool() is pool
+        assert len(pids) <= process_pool.MAX_WORKERS and os.getpid() not in pids
+    with process_pool_user():
+        assert get_process_pool() is not pool
+
+
+def test_async_shutdown_waits_for_work_without_blocking_loop():
+    async def main():
+        ticks = 0
+        running = True
+
+        async def ticker():
+            nonlocal ticks
+            while running:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        async with process_pool_user_async():
+            future = get_process_pool().submit(time.sleep, 0.5)
+        # 退出时等到已提交的导出完成，期间事件循环中的其他任务照常运行
+        assert future.done() and process_pool._pool is None
+        running = False
+        await task
+        return ticks
+
+    assert asyncio.run(main()) >= 20
+
+
+def test_save_pdf_uses_pool_and_closes_it(tmp_path):
+    save_dict_to_file({"第一产业": "- 茶叶种植 500 亩"}, str(tmp_path), "报告", "pdf")
+    assert os.path.getsize(tmp_path / "报告.pdf") > 0
+    assert process_pool._pool is None
+
+
+def test_save_pdf_async_inside_event_loop(tmp_path):
+    async def main():
+        async with process_pool_user_async():
+            await save_dict_to_file_async({"第一产业": "方案"}, str(tmp_path), "报告", "pdf")
+
+    asyncio.run(main())
+    assert os.path.getsize(tmp_path / "报告.pdf") > 0
+    assert process_pool._pool is None
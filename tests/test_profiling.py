@@ -0,0 +1,55 @@
+import asyncio
+import json
+import time
+
+from profiling import RunProfiler
+
+
+def _block_loop(seconds):
+    """同步等待，阻塞事件循环。"""
+    time.sleep(seconds)
+
+
+def _burn(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_profiler_attributes_blocking_and_cpu_to_nodes(tmp_path):
+    profiler = RunProfiler(str(tmp_path), interval=0.002, lag_threshold=0.05)
+
+    async def main():
+        profiler.start()
+        try:
+            profiler.enter("Executor")
+            await asyncio.sleep(0.05)
+            _block_loop(0.3)
+            await asyncio.sleep(0.05)
+            profiler.enter("Reportor")
+            _burn(0.2)
+            await asyncio.sleep(0.05)
+            # 只等待 I/O 的节点记为空闲
+            profiler.enter("Execute_Reviewer")
+            await asyncio.sleep(0.2)
+        finally:
+            profiler.stop()
+
+    asyncio.run(main())
+    summary = profiler.report()
+
+    blocking = [event for event in profiler.lag.events if event["node"] == "Executor"]
+    assert len(blocking) == 1 and blocking[0]["duration"] >= 0.25
+    assert any("_block_loop" in frame for frame in blocking[0]["stack"])
+    assert summary["max_lag_seconds"] >= 0.25
+
+    nodes = summary["nodes"]
+    # CPU 计算时采样线程要和事件循环线程争抢 GIL，采样数偏少，只检查是否归到了正确的节点和函数
+    assert nodes["Reportor"]["loop_busy_seconds"] > 0
+    assert nodes["Reportor"]["hottest_frame"].startswith("_burn")
+    assert profiler.sampler.busy_seconds("Execute_Reviewer") < 0.05
+
+    with open(tmp_path / "loop_lag.json", encoding="utf-8") as file:
+        assert json.load(file)["events"][0]["node"] == "Executor"
+    lines = (tmp_path / "all.collapsed").read_text(encoding="utf-8").splitlines()
+    assert any(line.startswith("Reportor;") and "_burn" in line for line in lines)
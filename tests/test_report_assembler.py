@@ -0,0 +1,54 @@
+from report_assembler import assemble_report, chinese_number, normalize_headings, strip_numbering, unique_slug
+
+
+def test_chinese_number():
+    assert [chinese_number(n) for n in (1, 9, 10, 11, 20, 35)] == ["一", "九", "十", "十一", "二十", "三十五"]
+
+
+def test_strip_numbering():
+    assert strip_numbering("一、发展现状") == "发展现状"
+    assert strip_numbering("（二）主要任务") == "主要任务"
+    assert strip_numbering("1.2 茶园改造") == "茶园改造"
+    assert strip_numbering("2025年目标") == "2025年目标"
+
+
+def test_unique_slug():
+    counts = {}
+    assert [unique_slug("现状 分析", counts) for _ in range(3)] == ["现状-分析", "现状-分析-1", "现状-分析-2"]
+
+
+def test_normalize_headings_aligns_levels_and_skips_code():
+    text = "# 第一产业发展方案\n\n## 一、现状\n正文\n#### 细节\n```\n# 代码注释\n```\n## 二、目标\n"
+    content, subsections = normalize_headings(text, "第一产业")
+    assert subsections == ["现状", "目标"]
+    assert content.splitlines() == ["### 现状", "正文", "##### 细节", "```", "# 代码注释", "```", "### 目标"]
+
+
+def test_assemble_report_order_and_toc():
+    sections = {"第二产业": "## 加工\n内容B", "第一产业": "## 种植\n内容A", "其他": "内容C"}
+    report = assemble_report("金田村", "生态茶旅村", sections, order=["第一产业", "第二产业", "不存在"])
+    lines = report.splitlines()
+    assert lines[0] == "# 金田村乡村振兴规划报告"
+    chapters = [line for line in lines if line.startswith("## ")]
+    assert chapters == ["## 目录", "## 一、核心定位", "## 二、第一产业", "## 三、第二产业", "## 四、其他"]
+    assert "### 2.1 种植" in lines and "### 3.1 加工" in lines
+    assert "  - [2.1 种植](#21-种植)" in lines
+    assert report.endswith("内容C\n")
+
+
+def test_code_blocks_are_not_renumbered():
+    report = assemble_report("金田村", "定位", {"第一产业": "## 现状\n```\n### 不是标题\n```\n## 目标"})
+    assert "### 不是标题" in report.splitlines()
+    assert "### 2.2 目标" in report.splitlines()
+
+
+def test_toc_anchors_follow_duplicate_headings():
+    sections = {"第一产业": "## 现状\n#### 现状\n内容", "第二产业": "## 现状"}
+    report = assemble_report("金田村", "定位", sections)
+    toc = [line for line in report.splitlines() if line.lstrip().startswith("- [")]
+    assert "  - [2.1 现状](#21-现状)" in toc and "  - [3.1 现状](#31-现状)" in toc
+
+    # 章节标题与前文中的标题锚点相同时，按渲染器的规则加上序号
+    report = assemble_report("金田村", "## 概述\n#### 二第一产业", {"第一产业": "## 现状"})
+    assert "- [二、第一产业](#二第一产业-1)" in report.splitlines()
+    assert "  - [1.1 概述](#11-概述)" in report.splitlines()
@@ -0,0 +1,66 @@
+import json
+
+from report_site import SiteBuilder, split_sections
+
+
+def _report(village: str, industry: str = "种植茶叶 800 亩。") -> str:
+    return (f"# {village}乡村振兴综合报告\n\n"
+            f"## 一、第一产业\n\n{industry}\n\n"
+            f"## 二、第二产业\n\n建设茶叶加工厂。\n\n"
+            f"## 三、第三产业\n\n发展乡村旅游。\n")
+
+
+def _write(results, village, text):
+    (results / f"{village}乡村振兴综合报告.md").write_text(text, encoding="utf-8")
+
+
+def _search_index(site):
+    text = (site / "search_index.js").read_text(encoding="utf-8")
+    return json.loads(text[len("window.SEARCH_INDEX = "):].rstrip(";\n"))
+
+
+def test_split_sections_of_report():
+    sections = split_sections(_report("金田村"))
+    assert [title for title, _ in sections] == ["", "一、第一产业", "二、第二产业", "三、第三产业"]
+    assert sections[1][1].startswith("## 一、第一产业")
+
+
+def test_incremental_rebuild(tmp_path):
+    results, site = tmp_path / "Results", tmp_path / "site"
+    results.mkdir()
+    _write(results, "金田村", _report("金田村"))
+    _write(results, "银山村", _report("银山村"))
+
+    # 两村相同的章节按内容哈希只渲染一次
+    stats = SiteBuilder(str(results), str(site)).build()
+    assert stats["pages_rendered"] == 2
+    assert stats["sections_rendered"] == 5 and stats["sections_reused"] == 3
+    assert (site / "金田村.html").exists() and (site / "index.html").exists()
+
+    # 报告未变化：不重新生成任何页面
+    stats = SiteBuilder(str(results), str(site)).build()
+    assert stats["pages_rendered"] == 0 and stats["sections_rendered"] == 0
+
+    # 只修改一个村庄的一个章节：只重新渲染这一章，其余章节复用上次的结果
+    _write(results, "金田村", _report("金田村", "种植白茶 1200 亩。"))
+    stats = SiteBuilder(str(results), str(site)).build()
+    assert stats["pages_rendered"] == 1
+    assert stats["sections_rendered"] == 1 and stats["sections_reused"] == 3
+    assert "白茶" in (site / "金田村.html").read_text(encoding="utf-8")
+    docs = _search_index(site)
+    assert ["金田村", "一、第一产业"] in [doc[:2] for doc in docs if "白茶" in doc[3]]
+
+    # 报告删除后页面和检索记录一起删除
+    (results / "银山村乡村振兴综合报告.md").unlink()
+    SiteBuilder(str(results), str(site)).build()
+    assert not (site / "银山村.html").exists()
+    assert {doc[0] for doc in _search_index(site)} == {"金田村"}
+
+
+def test_force_rebuilds_everything(tmp_path):
+    results, site = tmp_path / "Results", tmp_path / "site"
+    results.mkdir()
+    _write(results, "金田村", _report("金田村"))
+    SiteBuilder(str(results), str(site)).build()
+    stats = SiteBuilder(str(results), str(site)).build(force=True)
+    assert stats["pages_rendered"] == 1 and stats["sections_rendered"] == 4
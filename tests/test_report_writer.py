@@ -0,0 +1,90 @@
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from report_writer import AtomicReportWriter, OrderedSectionWriter, atomic_output, PREVIOUS_DIR
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def _temps(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".tmp"))
+
+
+def test_commit_replaces_report_and_keeps_previous(tmp_path):
+    with AtomicReportWriter(str(tmp_path), "报告") as writer:
+        writer.write("第一版")
+    with AtomicReportWriter(str(tmp_path), "报告") as writer:
+        writer.write_section("第一产业", "方案")
+    assert _read(writer.path) == "### 第一产业\n方案\n\n"
+    assert _read(os.path.join(tmp_path, PREVIOUS_DIR, "报告.md")) == "第一版"
+    assert _temps(tmp_path) == []
+
+
+def test_abort_leaves_existing_report(tmp_path):
+    with AtomicReportWriter(str(tmp_path), "报告") as writer:
+        writer.write("原报告")
+    with pytest.raises(RuntimeError):
+        with AtomicReportWriter(str(tmp_path), "报告") as writer:
+            writer.write("写到一半")
+            raise RuntimeError("中断")
+    assert _read(writer.path) == "原报告"
+    assert _temps(tmp_path) == []
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX 权限")
+def test_report_mode_does_not_depend_on_umask(tmp_path):
+    old = os.umask(0o077)
+    try:
+        with AtomicReportWriter(str(tmp_path), "报告") as writer:
+            writer.write("内容")
+    finally:
+        os.umask(old)
+    assert stat.S_IMODE(os.stat(writer.path).st_mode) == 0o644
+
+
+@pytest.mark.skipif(os.name == "nt", reason="按进程号判断残留")
+def test_stale_temps_of_dead_processes_are_removed(tmp_path):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    stale = tmp_path / f".报告.md.{dead}.abc123.tmp"
+    live = tmp_path / f".报告.md.{os.getpid()}.def456.tmp"
+    other = tmp_path / f".其他.md.{dead}.abc123.tmp"
+    for path in (stale, live, other):
+        path.write_text("残留", encoding="utf-8")
+
+    writer = AtomicReportWriter(str(tmp_path), "报告")
+    assert not stale.exists()
+    assert live.exists() and other.exists()
+    writer.abort()
+
+
+def test_atomic_output_failure_keeps_target(tmp_path):
+    path = str(tmp_path / "报告.pdf")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("旧文件")
+    with pytest.raises(ValueError):
+        with atomic_output(path) as temp_path:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write("新文件")
+            raise ValueError("导出失败")
+    assert _read(path) == "旧文件"
+    assert _temps(tmp_path) == []
+
+
+def test_ordered_writer_writes_sections_in_order(tmp_path):
+    writer = AtomicReportWriter(str(tmp_path), "报告")
+    ordered = OrderedSectionWriter(writer, ["甲", "乙", "丙"])
+    ordered.add("乙", "二")
+    assert ordered.written == set()
+    ordered.add("甲", "一")
+    assert ordered.written == {"甲", "乙"}
+    ordered.add("甲", "重复")
+    path = ordered.finish({"甲": "一", "乙": "二", "丙": "三", "丁": "四"})
+    assert _read(path) == "### 甲\n一\n\n### 乙\n二\n\n### 丙\n三\n\n### 丁\n四\n\n"
@@ -0,0 +1,111 @@
+import asyncio
+
+from Reportor import Reportor
+
+PLANS = {"当前核心产业": "方案一", "未来核心产业": "方案二", "第一产业": "方案三"}
+PASSED = {task: {"verdict": "pass", "score": 90} for task in PLANS}
+
+
+def _reportor(positioning_delay=0.0):
+    reportor = Reportor(cache_path=None)
+    started = asyncio.Event()
+
+    async def extract(draft, sections=None):
+        started.set()
+        await asyncio.sleep(positioning_delay)
+        return "核心定位"
+
+    async def polish(task, draft, core_positioning):
+        return f"{core_positioning}：{draft['development_plan'][task]}"
+
+    reportor.extract_core_positioning = extract
+    reportor.polish_section = polish
+    return reportor, started
+
+
+def _draft():
+    return {"village_name": "金田村", "model": "m", "development_plan": dict(PLANS), "review": dict(PASSED)}
+
+
+def test_positioning_task_is_kept_and_awaited():
+    async def main():
+        reportor, _ = _reportor(0.05)
+        draft = _draft()
+        reportor.schedule(draft)
+        task = reportor._positioning_task
+        assert task is not None and not task.done()
+        draft = await reportor.generate_report(draft)
+        assert task.done()
+        assert reportor._positioning_task is None
+        return draft
+
+    draft = asyncio.run(main())
+    assert draft["core_positioning"] == "核心定位"
+    assert draft["polished_sections"]["第一产业"] == "核心定位：方案三"
+
+
+def test_cancel_stops_pending_tasks():
+    async def main():
+        reportor, started = _reportor(10)
+        reportor.schedule(_draft())
+        positioning = reportor._positioning_task
+        polishing = [task for _, task in reportor._polishing.values()]
+        await started.wait()
+        reportor.cancel()
+        await asyncio.gather(positioning, *polishing, return_exceptions=True)
+        assert all(task.cancelled() for task in [positioning, *polishing])
+        assert reportor._positioning_task is None and reportor._polishing == {}
+
+    asyncio.run(main())
+
+
+def test_failed_sections_keep_a_placeholder_chapter():
+    async def main():
+        reportor, _ = _reportor()
+        draft = _draft()
+        draft["development_plan"]["第一产业"] = {"error": "请求超时"}
+        draft["development_plan"]["第二产业"] = ""
+        return await reportor.generate_report(draft)
+
+    draft = asyncio.run(main())
+    lines = draft["comprehensive_report"].splitlines()
+    assert "## 四、第一产业" in lines and "> 本章未能生成规划方案：请求超时" in lines
+    assert "## 五、第二产业" in lines and "> 本章未能生成规划方案：方案为空" in lines
+    assert set(draft["polished_sections"]) == {"当前核心产业", "未来核心产业"}
+
+
+def test_passed_sections_are_polished_during_review():
+    async def main():
+        reportor, started = _reportor()
+        polished = []
+        polish = reportor.polish_section
+
+        async def counting_polish(task, draft, core_positioning):
+            polished.append(task)
+            return await polish(task, draft, core_positioning)
+
+        reportor.polish_section = counting_polish
+        draft = _draft()
+        draft["review"]["未来核心产业"] = {"verdict": "fail", "score": 50}
+
+        # 核心产业方向尚未全部通过：已通过的方向先排队，等核心定位就绪
+        reportor.schedule(draft)
+        await asyncio.sleep(0.01)
+        assert not started.is_set() and polished == []
+        assert set(reportor._polishing) == {"当前核心产业", "第一产业"}
+
+        # 下一轮核心方向修改后通过：开始提取核心定位，已排队的方向在审核期间润色完成
+        draft["development_plan"]["未来核心产业"] = "方案二（修改）"
+        draft["review"]["未来核心产业"] = {"verdict": "pass", "score": 85}
+        reportor.schedule(draft)
+        await asyncio.sleep(0.01)
+        assert sorted(polished) == sorted(PLANS)
+
+        # 方案未变化的方向不会重复润色，报告节点只收集结果
+        reportor.schedule(draft)
+        draft = await reportor.generate_report(draft)
+        assert sorted(polished) == sorted(PLANS)
+        return draft
+
+    draft = asyncio.run(main())
+    assert draft["polished_sections"]["未来核心产业"] == "核心定位：方案二（修改）"
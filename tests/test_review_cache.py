@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import Execute_Reviewer as reviewer_module
+from Call_Model import _journal_response
+from Execute_Reviewer import Execute_Reviewer
+
+PASS = {"verdict": "pass", "score": 90, "confidence": 0.9, "issues": []}
+
+
+def _fake_model(monkeypatch, answer=json.dumps(PASS)):
+    """返回固定的审核结果，记录请求的提示词。"""
+    prompts = []
+
+    async def call_model(sem, prompt, model, *args, **kwargs):
+        prompts.append(prompt)
+        return _journal_response(answer)
+
+    monkeypatch.setattr(reviewer_module, "call_model", call_model)
+    return prompts
+
+
+def _draft(plan="发展茶叶种植，新建茶园 200 亩。", document="村情资料"):
+    return {"village_name": "金田村", "document": document, "model": "m",
+            "development_plan": {"第一产业": plan, "第二产业": plan}, "review": {}}
+
+
+def _review(path, draft, task="第一产业"):
+    reviewer = Execute_Reviewer(use_linter=False, cache_path=path)
+    return reviewer, asyncio.run(reviewer.review(task, draft))
+
+
+def test_unchanged_section_is_not_reviewed_again(tmp_path, monkeypatch):
+    prompts = _fake_model(monkeypatch)
+    path = str(tmp_path / "review_cache.sqlite")
+    _, first = _review(path, _draft())
+
+    # 下一次运行中方案逐字相同：直接沿用缓存的审核结果
+    reviewer, second = _review(path, _draft())
+    assert len(prompts) == 1
+    assert second == first and reviewer.cache.stats()["hits"] == 1
+
+
+def test_changed_inputs_miss_the_cache(tmp_path, monkeypatch):
+    prompts = _fake_model(monkeypatch)
+    path = str(tmp_path / "review_cache.sqlite")
+    _review(path, _draft())
+    _review(path, _draft(plan="发展茶叶种植，新建茶园 300 亩。"))
+    _review(path, _draft(document="更新后的村情资料"))
+    # 相同文本的另一个方向不共用结果
+    _review(path, _draft(), task="第二产业")
+    assert len(prompts) == 4
+
+
+def test_unparseable_verdict_is_not_cached(tmp_path, monkeypatch):
+    prompts = _fake_model(monkeypatch, answer="这不是 JSON")
+    path = str(tmp_path / "review_cache.sqlite")
+    _, result = _review(path, _draft())
+    assert result["source"] == "parse_error"
+    calls = len(prompts)
+    _review(path, _draft())
+    assert len(prompts) == 2 * calls
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import Execute_Reviewer as reviewer_module
+from Call_Model import _journal_response
+from Execute_Reviewer import Execute_Reviewer
+from review_cascade import ReviewCascade
+from review_schema import parse_review
+
+
+def verdict(result="pass", score=90, confidence=0.9, severities=()):
+    return parse_review(json.dumps({
+        "verdict": result, "score": score, "confidence": confidence,
+        "issues": [{"severity": s, "location": "一", "problem": "问题", "suggestion": "修改"} for s in severities],
+    }))
+
+
+@pytest.mark.parametrize("review, conflicts, reason", [
+    (verdict(), False, None),
+    (verdict("fail", 30, severities=["high"]), False, None),
+    (verdict(), True, "存在跨方向冲突"),
+    (verdict(score=60), False, "得分处于临界区间"),
+    (verdict(score=85), False, "得分处于临界区间"),
+    (verdict(confidence=0.5), False, "把握不足"),
+    (verdict(severities=["high"]), False, "通过但有严重问题"),
+    ({**verdict("fail", 0, severities=["high"]), "source": "parse_error"}, False, "审核结果无法解析"),
+])
+def test_escalation_reason(review, conflicts, reason):
+    assert ReviewCascade(["cheap"]).escalation_reason(review, conflicts) == reason
+
+
+def test_tiers_and_signature():
+    cascade = ReviewCascade(["mini", "fast"], borderline=[60, 85])
+    assert cascade.tiers("strong") == ["mini", "fast", "strong"]
+    assert ReviewCascade(["mini"], "best").tiers("strong") == ["mini", "best"]
+    # 清单中的 borderline 是列表，与元组得到相同的标识
+    assert cascade.signature("strong") == ReviewCascade(["mini", "fast"]).signature("strong")
+    assert cascade.signature("strong") != ReviewCascade(["fast", "mini"]).signature("strong")
+    assert cascade.signature("strong") != cascade.signature("other")
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """按模型返回预设的审核结果，并记录请求的模型顺序。"""
+    calls = []
+    answers = {}
+
+    async def call_model(sem, prompt, model, *args, **kwargs):
+        calls.append(model)
+        return _journal_response(json.dumps(answers[model], ensure_ascii=False))
+
+    monkeypatch.setattr(reviewer_module, "call_model", call_model)
+    return SimpleNamespace(calls=calls, answers=answers)
+
+
+def _draft():
+    return {"village_name": "金田村", "document": "资料", "model": "strong",
+            "development_plan": {"第一产业": "方案"}, "review": {}}
+
+
+def test_tiers_escalate_in_order(fake_model):
+    fake_model.answers.update({"mini": verdict(score=70), "fast": verdict(confidence=0.3), "strong": verdict()})
+    reviewer = Execute_Reviewer(use_linter=False, cache_path=None, cascade=ReviewCascade(["mini", "fast"]))
+    result = asyncio.run(reviewer.review("第一产业", _draft()))
+    assert fake_model.calls == ["mini", "fast", "strong"]
+    assert result["model"] == "strong"
+    assert dict(reviewer.cascade.escalations["mini"]) == {"得分处于临界区间": 1}
+
+
+def test_confident_cheap_verdict_stops_cascade(fake_model):
+    fake_model.answers.update({"mini": verdict("fail", 20, severities=["high"])})
+    reviewer = Execute_Reviewer(use_linter=False, cache_path=None, cascade=ReviewCascade(["mini"]))
+    result = asyncio.run(reviewer.review("第一产业", _draft()))
+    assert fake_model.calls == ["mini"] and result["verdict"] == "fail"
+
+
+def test_signature_is_part_of_review_cache_key(fake_model, tmp_path):
+    fake_model.answers.update({"mini": verdict(), "fast": verdict()})
+    cache = str(tmp_path / "review_cache.sqlite")
+
+    def review(cascade):
+        reviewer = Execute_Reviewer(use_linter=False, cache_path=cache, cascade=cascade)
+        return asyncio.run(reviewer.review("第一产业", _draft()))
+
+    review(ReviewCascade(["mini"]))
+    review(ReviewCascade(["mini"]))
+    assert fake_model.calls == ["mini"]
+    # 级联配置不同时不沿用缓存，与不使用级联时也互不影响
+    review(ReviewCascade(["fast"]))
+    review(ReviewCascade(["mini"], min_confidence=0.9))
+    assert fake_model.calls == ["mini", "fast", "mini"]
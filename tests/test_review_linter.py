@@ -0,0 +1,56 @@
+from review_linter import lint_section, lint_verdict, evidence_counts
+
+GOOD_PLAN = """## 一、现状
+- 全村耕地面积 1200 亩，数据来源：村委会统计表。
+- 2023 年茶叶年产值约 350 万元。
+- 现有合作社 3 个，带动 120 户农户。
+
+## 二、目标
+1. 到 2027 年茶园面积扩大到 1800 亩。
+2. 建设加工厂 1 座，年加工能力 500 吨。
+"""
+
+
+def test_good_plan_passes():
+    assert lint_section(GOOD_PLAN, min_length=50) == []
+
+
+def test_error_dict_is_rejected():
+    issues = lint_section({"error": "超时"})
+    assert len(issues) == 1 and "超时" in issues[0]
+
+
+def test_non_text_and_short_plan_are_rejected():
+    assert "类型为 list" in lint_section(["方案"])[0]
+    assert "过短" in lint_section("## 标题\n- 1 项")[0]
+
+
+def test_plain_text_without_structure():
+    issues = lint_section("金田村发展茶叶产业，数据来源于调研。" * 20)
+    assert any("不是 Markdown 格式" in issue for issue in issues)
+
+
+def test_bullets_without_numbers_or_sources():
+    plan = "## 方案\n" + "".join(f"- 加强第{n}方面的建设，推动产业融合发展。\n" for n in "甲乙丙丁戊己") * 5
+    issues = lint_section(plan)
+    assert any("含有数字" in issue for issue in issues)
+    assert any("数据来源" in issue for issue in issues)
+
+
+def test_unbalanced_code_fence_and_table():
+    plan = GOOD_PLAN + "\n```\n未闭合\n\n| 项目 | 数量 |\n| --- | --- |\n| 茶园 | 1200 | 亩 |\n"
+    issues = lint_section(plan, min_length=50)
+    assert any("```" in issue for issue in issues)
+    assert any("表格各行列数不一致" in issue for issue in issues)
+
+
+def test_lint_verdict_matches_review_format():
+    verdict = lint_verdict(["方案过短"])
+    assert verdict["verdict"] == "fail" and verdict["source"] == "linter"
+    assert verdict["issues"][0]["problem"] == "方案过短"
+    assert verdict["issues"][0]["severity"] == "high"
+
+
+def test_evidence_counts():
+    counts = evidence_counts(GOOD_PLAN)
+    assert counts["numbers"] > 5 and counts["sources"] == 1
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from review_schema import parse_review, review_passed, format_review
+
+
+def test_parse_fenced_json_and_sort_issues():
+    text = "审核如下：\n```json\n" + json.dumps({
+        "verdict": "FAIL", "score": "72", "confidence": 1.4,
+        "issues": [
+            {"severity": "low", "location": "二", "problem": "措辞", "suggestion": "润色"},
+            {"severity": "high", "location": "一", "problem": "数据无来源", "suggestion": "补来源"},
+            {"severity": "unknown", "location": "三", "problem": "格式", "suggestion": "调整"},
+        ],
+    }, ensure_ascii=False) + "\n```"
+    review = parse_review(text)
+    assert review["verdict"] == "fail" and review["score"] == 72 and review["confidence"] == 1.0
+    assert [issue["severity"] for issue in review["issues"]] == ["high", "medium", "low"]
+
+
+def test_parse_pass_without_issues():
+    review = parse_review('{"verdict": "pass", "score": 90}')
+    assert review == {"verdict": "pass", "score": 90, "confidence": None, "issues": []}
+    assert review_passed(review)
+
+
+@pytest.mark.parametrize("text", [
+    "审核通过",
+    '{"verdict": "ok", "score": 80}',
+    '{"verdict": "pass", "score": 120}',
+    '{"verdict": "pass", "score": "高"}',
+    '{"verdict": "fail", "score": 40, "issues": []}',
+    '{"verdict": "fail", "score": 40, "issues": "太短"}',
+    '{"verdict": "pass", "score": 80,}',
+])
+def test_invalid_reviews_raise(text):
+    with pytest.raises(ValueError):
+        parse_review(text)
+
+
+def test_review_passed_only_trusts_verdict():
+    assert not review_passed("审核通过")
+    assert not review_passed("")
+    assert not review_passed({"verdict": "fail", "score": 100})
+
+
+def test_format_review():
+    review = parse_review('{"verdict": "fail", "score": 55, "issues": '
+                          '[{"severity": "high", "location": "一", "problem": "缺数据", "suggestion": "补充"}]}')
+    text = format_review(review)
+    assert text.splitlines()[0] == "审核结论：不通过（得分 55）"
+    assert "[高] 位置：一；问题：缺数据；修改建议：补充" in text
+    assert format_review("") == "无审核意见"
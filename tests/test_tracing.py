@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+import Call_Model
+from Call_Model import call_model, current_section, _journal_response
+from tracing import Tracer, annotate, current_tracer, span
+
+
+def _traced(main):
+    """开启追踪运行协程，返回追踪器。"""
+    tracer = Tracer()
+
+    async def run():
+        token = current_tracer.set(tracer)
+        try:
+            await main()
+        finally:
+            current_tracer.reset(token)
+
+    asyncio.run(run())
+    return tracer
+
+
+def test_concurrent_tasks_inherit_parent_and_get_own_lanes(tmp_path):
+    async def section(name, start):
+        await asyncio.sleep(start)
+        with span("plan", section=name):
+            await asyncio.sleep(0.03)
+            annotate(iteration=1)
+
+    async def main():
+        with span("run"):
+            await asyncio.gather(section("第一产业", 0), section("第二产业", 0.01))
+
+    tracer = _traced(main)
+    spans = {span.attributes.get("section", span.name): span for span in tracer.spans}
+    assert spans["第一产业"].parent_id == spans["第二产业"].parent_id == spans["run"].span_id
+    assert spans["第一产业"].attributes["iteration"] == 1
+
+    trace = json.loads(open(tracer.export_chrome(str(tmp_path / "trace.json")), encoding="utf-8").read())
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in events] == ["run", "plan", "plan"]
+    # 同一条时间线上的区间必须严格嵌套，时间交错的两个方向分在不同的线上
+    lanes = {event["args"]["section"]: event["tid"] for event in events if "section" in event["args"]}
+    assert lanes["第一产业"] != lanes["第二产业"]
+    assert tracer.summary()["plan"]["count"] == 2
+
+
+def test_error_attribute_and_disabled_tracing():
+    tracer = Tracer()
+    token = current_tracer.set(tracer)
+    try:
+        with pytest.raises(ValueError):
+            with span("review"):
+                raise ValueError("审核结果格式错误")
+    finally:
+        current_tracer.reset(token)
+    assert tracer.spans[0].attributes["error"] == "ValueError"
+
+    # 未开启追踪时不记录任何区间
+    with span("review") as current:
+        current.set(score=90)
+    assert len(tracer.spans) == 1
+
+
+def test_call_model_span_records_section_and_tokens(monkeypatch):
+    async def fake_call_model(sem, messages, model, prediction):
+        response = _journal_response("方案")
+        response.usage.prompt_tokens, response.usage.completion_tokens = 120, 30
+        return response, 0.0
+
+    monkeypatch.setattr(Call_Model, "_call_model", fake_call_model)
+
+    async def main():
+        current_section.set("第一产业")
+        await call_model(asyncio.Semaphore(1), "提示词", "m")
+
+    tracer = _traced(main)
+    attributes = [span.attributes for span in tracer.spans if span.name == "call_model"][0]
+    assert attributes["section"] == "第一产业"
+    assert attributes["prompt_tokens"] == 120 and attributes["completion_tokens"] == 30
@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+from Worker_Pool import JobQueue, LLMBudget
+
+VILLAGE = {"village_name": "金田村", "documents_path": "Resource/金田村", "model": "m"}
+
+
+def test_retry_keeps_run_id(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue(VILLAGE)
+    first = queue.lease("worker-1")
+    queue.fail(first["id"], "worker-1", "崩溃")
+    second = queue.lease("worker-2")
+    assert second["attempt"] == 2
+    assert second["run_id"] == first["run_id"]
+    assert queue.results()[0]["run_id"] == first["run_id"]
+
+
+def test_recreated_queue_gets_new_run_id(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    queue.enqueue(VILLAGE)
+    old = queue.lease("worker-1")
+    queue.conn.close()
+    os.remove(path)
+
+    # 重建后任务编号重新从 1 开始，运行 ID 不能与旧任务相同
+    queue = JobQueue(path)
+    queue.enqueue(VILLAGE)
+    new = queue.lease("worker-1")
+    assert new["id"] == old["id"]
+    assert new["run_id"] != old["run_id"]
+
+
+def _held_slots(budget):
+    return {row[0] for row in budget.conn.execute("SELECT slot FROM llm_slots WHERE holder IS NOT NULL")}
+
+
+def test_budget_releases_the_slot_each_block_acquired(tmp_path):
+    budget = LLMBudget(str(tmp_path / "jobs.sqlite"), poll_interval=0.01)
+    budget.configure(2)
+    first_entered, second_entered, first_done = asyncio.Event(), asyncio.Event(), asyncio.Event()
+    slots = {}
+
+    async def first():
+        async with budget:
+            slots["first"] = _held_slots(budget)
+            first_entered.set()
+            await second_entered.wait()
+        first_done.set()
+
+    async def second():
+        await first_entered.wait()
+        async with budget:
+            slots["second"] = _held_slots(budget) - slots["first"]
+            second_entered.set()
+            await first_done.wait()
+            # 先进入的调用先退出，只能释放它自己的槽位
+            slots["after_first"] = _held_slots(budget)
+
+    async def main():
+        await asyncio.gather(first(), second())
+
+    asyncio.run(main())
+    assert slots["after_first"] == slots["second"]
+    assert _held_slots(budget) == set()
@@ -0,0 +1,220 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class Span:
+    """
+    一段计时区间：名称、起止时间、父区间和属性（方向、轮次、token 数等）。
+    """
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end_time", "attributes", "thread_id", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.span_id = next(tracer._ids)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end_time: Optional[float] = None
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        """添加或更新属性。"""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        """结束计时，只有结束的区间才会导出。重复调用时忽略。"""
+        if self.end_time is None:
+            self.end_time = time.perf_counter()
+            self._tracer.spans.append(self)
+
+
+class _NoopSpan:
+    """未开启追踪时使用的空区间，所有操作都不做任何事。"""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+# 当前运行的追踪器，为 None 时追踪完全关闭
+current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("current_tracer", default=None)
+# 当前所在的区间，新区间以它为父区间；asyncio 任务创建时复制上下文，并发的子任务各自继承
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    收集一次运行中的全部区间，导出为 Chrome 追踪格式（chrome://tracing 或 https://ui.perfetto.dev 直接打开），
+    不需要额外的采集服务。
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.origin = time.perf_counter()
+        self._ids = itertools.count(1)
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        """开始一个以当前区间为父区间的新区间（不会成为当前区间），需自行调用 end。"""
+        parent = _current_span.get()
+        return Span(self, name, parent.span_id if parent is not None else None, attributes)
+
+    def _lanes(self) -> Dict[int, int]:
+        """
+        为每个区间分配一条时间线。Chrome 追踪格式要求同一条线上的区间严格嵌套，
+        而并发的协程在同一个线程中交错执行，因此优先放在父区间所在的线上，放不下时另开一条。
+
+        :return: 区间 ID -> 时间线编号
+        """
+        lanes: List[List[Span]] = []  # 每条线上尚未结束的区间栈
+        assignment: Dict[int, int] = {}
+        for span in sorted(self.spans, key=lambda s: (s.start, -s.end_time)):
+            candidates = ([assignment[span.parent_id]] if span.parent_id in assignment else []) + list(range(len(lanes)))
+            for lane in candidates:
+                stack = lanes[lane]
+                while stack and stack[-1].end_time <= span.start:
+                    stack.pop()
+                if not stack or stack[-1].end_time >= span.end_time:
+                    break
+            else:
+                lanes.append([])
+                lane = len(lanes) - 1
+            lanes[lane].append(span)
+            assignment[span.span_id] = lane
+        return assignment
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        生成 Chrome 追踪格式的数据。
+
+        :return: {"traceEvents": [...]}，时间单位为微秒
+        """
+        lanes = self._lanes()
+        events, names = [], {}
+        pid = os.getpid()
+        for span in sorted(self.spans, key=lambda s: s.start):
+            lane = lanes[span.span_id]
+            if lane not in names:
+                section = span.attributes.get("section")
+                names[lane] = f"{lane}: {section or span.name}"
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": (span.end_time - span.start) * 1e6,
+                "pid": pid,
+                "tid": lane,
+                "args": {"span_id": span.span_id, "parent_id": span.parent_id,
+                         **{key: _jsonable(value) for key, value in span.attributes.items()}},
+            })
+        for lane, name in names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": lane, "args": {"name": name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path: str) -> str:
+        """
+        保存为 Chrome 追踪格式的 JSON 文件。
+
+        :param path: 文件路径
+        :return: 文件路径
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.chrome_trace(), file, ensure_ascii=False)
+        return path
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """按区间名称汇总次数、总耗时和最长耗时（秒）。"""
+        result = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+        for span in self.spans:
+            stats = result[span.name]
+            stats["count"] += 1
+            stats["total"] += span.duration
+            stats["max"] = max(stats["max"], span.duration)
+        return dict(result)
+
+    def print_summary(self, top: int = 15) -> None:
+        """打印耗时最多的区间类型。"""
+        rows = sorted(self.summary().items(), key=lambda item: item[1]["total"], reverse=True)[:top]
+        print("追踪汇总（按总耗时排序，并发区间的耗时会重叠）：")
+        for name, stats in rows:
+            print(f"  {name}：{stats['count']} 次，共 {stats['total']:.2f} 秒，最长 {stats['max']:.2f} 秒")
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    在 with 块内记录一个区间，块内新建的区间（包括其中创建的 asyncio 任务）都以它为父区间。
+    未开启追踪时几乎没有开销。
+
+    :param name: 区间名称
+    :param attributes: 属性
+    :return: 区间，可用 set 补充属性
+    """
+    tracer = current_tracer.get()
+    if tracer is None:
+        yield _NOOP
+        return
+    current = tracer.start_span(name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def start_span(name: str, **attributes: Any) -> Any:
+    """开始一个不作为当前区间的区间（如等待信号量的时间），需自行调用 end。未开启追踪时返回空区间。"""
+    tracer = current_tracer.get()
+    return tracer.start_span(name, **attributes) if tracer is not None else _NOOP
+
+
+def annotate(**attributes: Any) -> None:
+    """给当前区间补充属性。"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(name: str, **attributes: Any) -> Callable:
+    """
+    协程函数的装饰器，每次调用记录一个区间。
+
+    :param name: 区间名称
+    :param attributes: 属性
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator